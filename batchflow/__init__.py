@@ -13,6 +13,8 @@ from .dataset import Dataset
 from .pipeline import Pipeline
 from .named_expr import NamedExpression, B, C, F, L, V, M, D, R, W, P, I
 from .dsindex import DatasetIndex, FilesIndex
+from .memmap import MemmapArray, MemmapSource
+from .chunked import ChunkedStore
 from .decorators import action, inbatch_parallel, parallel, any_action_failed, mjit, deprecated
 from .exceptions import SkipBatchException, EmptyBatchSequence
 from .sampler import Sampler, ConstantSampler, NumpySampler, HistoSampler, ScipySampler
@@ -3,7 +3,9 @@
 JOIN_ID = '#_join'
 MERGE_ID = '#_merge'
 REBATCH_ID = '#_rebatch'
+ECHO_ID = '#_echo'
 PIPELINE_ID = '#_pipeline'
+CACHE_ID = '#_cache'
 IMPORT_MODEL_ID = '#_import_model'
 TRAIN_MODEL_ID = '#_train_model'
 PREDICT_MODEL_ID = '#_predict_model'
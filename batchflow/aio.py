@@ -0,0 +1,80 @@
+""" Contains concurrent reading of files with asyncio """
+import asyncio
+import concurrent.futures as cf
+
+from .pools import DEFAULT_POOLS
+
+
+# the default number of files read at the same time
+MAX_IN_FLIGHT = 64
+
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+async def _read_all(paths, max_in_flight, executor):
+    loop = asyncio.get_event_loop()
+    semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def _read(path):
+        async with semaphore:
+            return await loop.run_in_executor(executor, _read_bytes, path)
+
+    return await asyncio.gather(*[_read(path) for path in paths])
+
+def _run_in_new_loop(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+def _loop_is_running():
+    try:
+        return asyncio.get_event_loop().is_running()
+    except RuntimeError:
+        return False
+
+
+def read_files(paths, max_in_flight=None, pools=None):
+    """ Read files concurrently
+
+    Reads are awaited in an asyncio loop and performed in a thread pool, so that at most `max_in_flight`
+    files are read at the same time. It mostly helps when reading many small files has high latency
+    (e.g. on network file systems).
+
+    Parameters
+    ----------
+    paths : sequence of str
+        file paths.
+    max_in_flight : int or None
+        the maximum number of files read at the same time. If None, :data:`MAX_IN_FLIGHT` is used.
+    pools : PoolRegistry or None
+        a registry to take a thread pool from. If None, :data:`~.pools.DEFAULT_POOLS` is used.
+
+    Returns
+    -------
+    list of bytes
+        contents of files in the order of `paths`.
+
+    Raises
+    ------
+    OSError
+        if any file cannot be read.
+    """
+    if len(paths) == 0:
+        return []
+    max_in_flight = max_in_flight or MAX_IN_FLIGHT
+    pools = pools or DEFAULT_POOLS
+    if pools.in_pool():
+        # waiting for a pool from its own worker might cause a deadlock
+        with cf.ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            return _run_in_new_loop(_read_all(paths, max_in_flight, executor))
+
+    coro = _read_all(paths, max_in_flight, pools.get('threads', max_in_flight))
+    if _loop_is_running():
+        # a loop cannot be run while another loop (e.g. in Jupyter) is running in the same thread
+        with cf.ThreadPoolExecutor(max_workers=1) as thread:
+            return thread.submit(_run_in_new_loop, coro).result()
+    return _run_in_new_loop(coro)
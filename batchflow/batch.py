@@ -27,6 +27,9 @@ except ImportError:
 from .dsindex import DatasetIndex, FilesIndex
 from .decorators import action, inbatch_parallel, any_action_failed
 from .components import create_item_class, BaseComponents
+from .chunked import ChunkedStore, open_store, NO_COMPONENTS
+from .pools import get_pools
+from .aio import read_files
 
 
 class Batch:
@@ -201,24 +204,23 @@ class Batch:
         new_data = list(None for _ in components)
         rest_data = list(None for _ in components)
         for i, comp in enumerate(components):
-            none_components_in_batches = [b.get(component=comp) is None for b in batches]
+            comp_data = [b.get(component=comp) for b in batches]
+            none_components_in_batches = [data is None for data in comp_data]
             if np.all(none_components_in_batches):
                 continue
             if np.any(none_components_in_batches):
                 raise ValueError('Component {} is None in some batches'.format(comp))
 
             if batch_size is None:
-                new_comp = [b.get(component=comp) for b in batches[:break_point]]
+                new_comp = comp_data[:break_point]
             else:
                 last_batch = batches[break_point]
                 last_batch_last_index = last_batch.get_pos(None, comp, last_batch.indices[last_batch_len - 1])
-                new_comp = [b.get(component=comp) for b in batches[:break_point]] + \
-                           [last_batch.get(component=comp)[:last_batch_last_index + 1]]
+                new_comp = comp_data[:break_point] + [comp_data[break_point][:last_batch_last_index + 1]]
             new_data[i] = cls.merge_component(comp, new_comp)
 
             if batch_size is not None:
-                rest_comp = [last_batch.get(component=comp)[last_batch_last_index + 1:]] + \
-                            [b.get(component=comp) for b in batches[break_point + 1:]]
+                rest_comp = [comp_data[break_point][last_batch_last_index + 1:]] + comp_data[break_point + 1:]
                 rest_data[i] = cls.merge_component(comp, rest_comp)
 
         new_batch = _make_batch(new_data)
@@ -814,17 +816,47 @@ class Batch:
             self._assemble_component(result, component=component, **kwargs)
         return self
 
+    def _read_files(self, paths, max_in_flight=None):
+        """ Read files of batch items concurrently (see :func:`~.aio.read_files`)
+
+        Parameters
+        ----------
+        paths : sequence of str
+            file paths in the order of batch items.
+
+        Returns
+        -------
+        dict
+            item ids as keys and file contents as values.
+        """
+        return dict(zip(self.indices, read_files(paths, max_in_flight, get_pools(self))))
+
+    def _load_blosc(self, src=None, dst=None, read_async=False, max_in_flight=None, **kwargs):
+        """ Load data from blosc packed files
+
+        If `read_async`, files of all items are read concurrently first (at most `max_in_flight` at a time)
+        and then decompressed in parallel threads. Otherwise each item is read and decompressed in turn.
+        """
+        if not read_async:
+            return self._load_blosc_item(src=src, dst=dst, **kwargs)
+        contents = self._read_files([self._get_file_name(ix, src) for ix in self.indices], max_in_flight)
+        kwargs.setdefault('target', 'threads')
+        return self._load_blosc_item(src=src, dst=dst, contents=contents, **kwargs)
+
     @inbatch_parallel('indices', post='_assemble', target='f', dst_default='components')
-    def _load_blosc(self, ix, src=None, dst=None):
+    def _load_blosc_item(self, ix, src=None, dst=None, contents=None):
         """ Load data from a blosc packed file """
-        file_name = self._get_file_name(ix, src)
-        with open(file_name, 'rb') as f:
-            data = dill.loads(blosc.decompress(f.read()))
-            components = tuple(dst or self.components)
-            try:
-                item = tuple(data[i] for i in components)
-            except Exception as e:
-                raise KeyError('Cannot find components in corresponfig file', e)
+        if contents is None:
+            with open(self._get_file_name(ix, src), 'rb') as f:
+                packed = f.read()
+        else:
+            packed = contents[ix]
+        data = dill.loads(blosc.decompress(packed))
+        components = tuple(dst or self.components)
+        try:
+            item = tuple(data[i] for i in components)
+        except Exception as e:
+            raise KeyError('Cannot find components in corresponfig file', e)
         return item
 
     @inbatch_parallel('indices', target='f')
@@ -841,6 +873,29 @@ class Batch:
             data = dict(zip(components, item))
             f.write(blosc.compress(dill.dumps(data)))
 
+    def _load_chunked(self, src, dst=None):
+        """ Load data from a columnar chunked storage """
+        store = src if isinstance(src, ChunkedStore) else open_store(src)
+        pools = get_pools(self)
+        if self.components is None:
+            self._data = store.read(self.indices, NO_COMPONENTS, pools)[NO_COMPONENTS]
+        else:
+            components = dst or [comp for comp in self.components if comp in store.components]
+            components = (components,) if isinstance(components, str) else components
+            data = store.read(self.indices, components, pools)
+            for comp in components:
+                setattr(self, comp, data[comp])
+
+    def _dump_chunked(self, dst, components=None):
+        """ Append batch items to a columnar chunked storage """
+        store = dst if isinstance(dst, ChunkedStore) else open_store(dst, mode='a')
+        if self.components is None:
+            data = {NO_COMPONENTS: self.data}
+        else:
+            components = tuple(components or self.components)
+            data = {comp: self.get(component=comp) for comp in components}
+        store.append(data, ids=self.indices)
+
     def _load_table(self, src, fmt, dst=None, post=None, *args, **kwargs):
         """ Load a data frame from table formats: csv, hdf5, feather """
         if fmt == 'csv':
@@ -925,7 +980,7 @@ class Batch:
             a source (e.g. an array or a file name)
 
         fmt : str
-            a source format, one of None, 'blosc', 'csv', 'hdf5', 'feather'
+            a source format, one of None, 'blosc', 'chunked', 'csv', 'hdf5', 'feather'
 
         dst : None or str or tuple of str
             components to load `src` to
@@ -966,6 +1021,15 @@ class Batch:
         Load data from a CSV file columns into components `features` and `labels`::
 
             batch.load(fmt='csv', src='/path/to/file.csv', dst=('features', 'labels`), index_col=0)
+
+        Load items from a columnar chunked storage (see :class:`~.ChunkedStore`) written with `dump(fmt='chunked')`::
+
+            batch.load(fmt='chunked', src='/path/to/dir')
+
+        Formats which keep each item in its own file (e.g. 'blosc') might read files of all batch items
+        concurrently before decoding them, which helps with high-latency storages (e.g. network file systems)::
+
+            batch.load(fmt='blosc', src='/path/to/dir', read_async=True, max_in_flight=128)
         """
         _ = args
 
@@ -976,6 +1040,8 @@ class Batch:
             self._load_from_source(src=src, dst=dst)
         elif fmt == 'blosc':
             self._load_blosc(src=src, dst=dst, **kwargs)
+        elif fmt == 'chunked':
+            self._load_chunked(src=src, dst=dst)
         elif fmt in ['csv', 'hdf5', 'feather']:
             self._load_table(src=src, fmt=fmt, dst=dst, **kwargs)
         else:
@@ -992,7 +1058,7 @@ class Batch:
             a destination (e.g. an array or a file name)
 
         fmt : str
-            a destination format, one of None, 'blosc', 'csv', 'hdf5', 'feather'
+            a destination format, one of None, 'blosc', 'chunked', 'csv', 'hdf5', 'feather'
 
         components : None or str or tuple of str
             components to load
@@ -1002,6 +1068,11 @@ class Batch:
 
         *kwargs :
             other parameters are passed to format-specific writers
+
+        Notes
+        -----
+        With `fmt='chunked'` batch items are appended to a storage in a `dst` directory,
+        so all batches of a dataset might be dumped into one storage.
         """
         components = [components] if isinstance(components, str) else components
         if fmt is None:
@@ -1011,6 +1082,8 @@ class Batch:
             dst[self.indices] = self.get(component=components)
         elif fmt == 'blosc':
             self._dump_blosc(dst, components=components)
+        elif fmt == 'chunked':
+            self._dump_chunked(dst, components=components)
         elif fmt in ['csv', 'hdf5', 'feather']:
             self._dump_table(dst, fmt, components, *args, **kwargs)
         else:
@@ -1,4 +1,5 @@
 """ Contains Batch classes for images """
+import io
 import os
 import warnings
 from numbers import Number
@@ -17,6 +18,7 @@ import PIL.ImageEnhance
 from .batch import Batch
 from .decorators import action, inbatch_parallel
 from .dsindex import FilesIndex
+from .named_expr import P
 
 
 def get_scipy_transforms():
@@ -50,7 +52,7 @@ def get_scipy_transforms():
     return scipy_transformations
 
 
-def transform_actions(prefix='', suffix='', wrapper=None):
+def transform_actions(prefix='', suffix='', wrapper=None, dense_prefix=None):
     """ Transforms classmethods that have names like <prefix><name><suffix> to pipeline's actions executed in parallel.
 
     First, it finds all *class methods* which names have the form <prefix><method_name><suffix>
@@ -65,6 +67,10 @@ def transform_actions(prefix='', suffix='', wrapper=None):
     suffix : str
     wrapper : str
         name of the wrapper inside ``Batch`` class
+    dense_prefix : str or None
+        if given, a method named <dense_prefix><method_name> (if exists) is tried first.
+        It transforms a dense array of all batch items at once (see :meth:`.ImagesBatch._apply_dense`)
+        and returns ``NotImplemented`` to fall back to ``wrapper``.
 
     Examples
     --------
@@ -95,16 +101,24 @@ def transform_actions(prefix='', suffix='', wrapper=None):
         for method_name, method in cls.__dict__.copy().items():
             if method_name.startswith(prefix) and method_name.endswith(suffix) and\
                not method_name.startswith('__') and not method_name.endswith('__'):
+                name_slice = slice(len(prefix), -len(suffix))
+                wrapped_method_name = method_name[name_slice]
                 def _wrapper():
                     #pylint: disable=cell-var-from-loop
                     wrapped_method = method
+                    dense_method = None
+                    if dense_prefix is not None:
+                        dense_method = cls.__dict__.get(dense_prefix + wrapped_method_name)
                     @wraps(wrapped_method)
                     def _func(self, *args, src='images', target='for', **kwargs):
+                        if dense_method is not None:
+                            # pylint: disable=protected-access
+                            res = self._apply_dense(dense_method, *args, src=src, **kwargs)
+                            if res is not NotImplemented:
+                                return res
                         return getattr(cls, wrapper)(self, wrapped_method, src=src,
                                                      use_self=True, target=target, *args, **kwargs)
                     return _func
-                name_slice = slice(len(prefix), -len(suffix))
-                wrapped_method_name = method_name[name_slice]
                 setattr(cls, wrapped_method_name, action(_wrapper()))
         return cls
     return _decorator
@@ -207,9 +221,11 @@ class BaseImagesBatch(Batch):
             Format of the file to download.
         dst : str, sequence
             components to download.
+        kwargs
+            other parameters passed to a format-specific loader (e.g. :meth:`.ImagesBatch._load_image`).
         """
         if fmt == 'image':
-            return self._load_image(src, fmt=fmt, dst=dst)
+            return self._load_image(src, fmt=fmt, dst=dst, **kwargs)
         return super().load(src=src, fmt=fmt, dst=dst, *args, **kwargs)
 
 
@@ -262,7 +278,7 @@ class BaseImagesBatch(Batch):
 
 
 @transform_actions(prefix='_', suffix='_all', wrapper='apply_transform_all')
-@transform_actions(prefix='_', suffix='_', wrapper='apply_transform')
+@transform_actions(prefix='_', suffix='_', wrapper='apply_transform', dense_prefix='_dense_')
 @add_methods(transformations={**get_scipy_transforms(),
                               'pad': np.pad,
                               'resize': resize}, prefix='_sp_', suffix='_')
@@ -283,7 +299,16 @@ class ImagesBatch(BaseImagesBatch):
         Y v
 
     Pixel's position is defined as (x, y)
+
+    When images are stored as a dense array of shape (N, H, W, C), `flip`, `invert`, `clip`, `add`,
+    `multiply`, `crop`, `salt` and `posterize` transform all images at once with numpy operations
+    instead of processing each image separately.
+
+    Images loaded with ``load(fmt='image', shape=...)`` are decoded in parallel straight into such an array.
     """
+    # PIL modes with 8-bit channels which can be loaded into a dense uint8 array
+    dense_modes = ('L', 'LA', 'RGB', 'RGBA', 'CMYK', 'YCbCr', 'LAB', 'HSV')
+
     @classmethod
     def _get_image_shape(cls, image):
         if isinstance(image, PIL.Image.Image):
@@ -300,9 +325,13 @@ class ImagesBatch(BaseImagesBatch):
             return self.images[0].shape
         raise RuntimeError('Images have different shapes')
 
-    @inbatch_parallel(init='indices', post='_assemble')
-    def _load_image(self, ix, src=None, fmt=None, dst="images"):
-        """ Loads image
+    def _load_image(self, src=None, fmt=None, dst="images", shape=None, mode=None, crop=False,
+                    resample=PIL.Image.BILINEAR, dense=False, read_async=False, max_in_flight=None, **kwargs):
+        """ Loads images.
+
+        Images are decoded in parallel. By default, each image is stored as `PIL.Image`.
+        If `shape` is given or `dense` is True, all images are decoded straight into one array
+        of shape (N, H, W, C) and dtype uint8.
 
         .. note:: Please note that ``dst`` must be ``str`` only, sequence is not allowed here.
 
@@ -314,8 +343,100 @@ class ImagesBatch(BaseImagesBatch):
             Component to write images to.
         fmt : str
             Format of an image.
+        shape : sequence of two ints
+            Shape (rows, columns) of the output images. Images of a different shape are resized to `shape`
+            (JPEG images are downscaled while decoding) or cropped around their centers if `crop` is True.
+            If None and `dense` is True, all images should have the same shape.
+        mode : str
+            PIL mode to convert images to, e.g. 'RGB' (default for dense images) or 'L' for grayscale.
+        crop : bool
+            Whether to crop images instead of resizing them.
+        resample : int
+            PIL resampling filter for resizing.
+        dense : bool
+            Whether to store images in a dense array even if `shape` is None.
+        read_async : bool
+            Whether to read files of all images concurrently before decoding them,
+            which helps with high-latency storages (e.g. network file systems).
+        max_in_flight : int or None
+            The maximum number of files read at the same time if `read_async` is True.
+        kwargs
+            parallel execution options (e.g. `n_workers`).
+
+        Examples
+        --------
+        ::
+
+            batch.load(fmt='image', dst='images', shape=(224, 224))
         """
-        return PIL.Image.open(self._make_path(ix, src))
+        dst = dst or 'images'
+        contents = None
+        if read_async:
+            contents = self._read_files([self._make_path(ix, src) for ix in self.indices], max_in_flight)
+        if shape is None and not dense:
+            return self._load_pil_image(src, fmt=fmt, dst=dst, mode=mode, contents=contents, **kwargs)
+
+        mode = mode or 'RGB'
+        if mode not in self.dense_modes:
+            raise ValueError("Dense images can be loaded in modes %s only, but given %s" % (self.dense_modes, mode))
+        fit = 'crop' if crop else 'resize'
+        if shape is None:
+            with PIL.Image.open(self._open_image_file(self.indices[0], src, contents)) as image:
+                shape = image.size[::-1]
+            fit = None
+        n_channels = len(PIL.Image.new(mode, (1, 1)).getbands())
+
+        images = np.empty((len(self), *shape, n_channels), dtype=np.uint8)
+        self._decode_image(images, src=src, dst=dst, mode=mode, fit=fit, resample=resample, contents=contents,
+                           **kwargs)
+        setattr(self, dst, images)
+        return self
+
+    def _open_image_file(self, ix, src=None, contents=None):
+        """ Return a path to an image file or its contents read beforehand """
+        if contents is None:
+            return self._make_path(ix, src)
+        return io.BytesIO(contents[ix])
+
+    @inbatch_parallel(init='indices', post='_assemble')
+    def _load_pil_image(self, ix, src=None, fmt=None, dst="images", mode=None, contents=None):
+        """ Load and decode an image as `PIL.Image` """
+        _ = fmt, dst
+        image = PIL.Image.open(self._open_image_file(ix, src, contents))
+        # decode now in a worker thread rather than in the first transform, and release the file
+        image.load()
+        if mode is not None and image.mode != mode:
+            image = image.convert(mode)
+        return image
+
+    def _raise_first_error(self, all_results, *args, **kwargs):
+        """ Re-raise the first exception of a parallel action, so that a failed item is reported as is """
+        _ = args, kwargs
+        errors = self.get_errors(all_results)
+        if errors is not None:
+            raise errors[0]
+        return self
+
+    @inbatch_parallel(init='indices', post='_raise_first_error')
+    def _decode_image(self, ix, out, src=None, dst='images', mode='RGB', fit='resize', resample=PIL.Image.BILINEAR,
+                      contents=None):
+        """ Decode an image into its place in `out` array """
+        size = out.shape[2], out.shape[1]
+        with PIL.Image.open(self._open_image_file(ix, src, contents)) as image:
+            if image.size != size:
+                if fit is None:
+                    raise ValueError("Image %s has shape %s, while %s is expected. Specify `shape` to resize images."
+                                     % (ix, image.size[::-1], size[::-1]))
+                if fit == 'crop':
+                    left, top = (image.size[0] - size[0]) // 2, (image.size[1] - size[1]) // 2
+                    image = image.crop((left, top, left + size[0], top + size[1]))
+                else:
+                    # JPEG images are decoded at the smallest scale which is not less than the size needed
+                    image.draft(mode if mode in ('RGB', 'L') else None, size)
+                    image = image.resize(size, resample, reducing_gap=3.)
+            if image.mode != mode:
+                image = image.convert(mode)
+            out[self.get_pos(None, dst, ix)] = np.asarray(image).reshape(out.shape[1:])
 
     @inbatch_parallel(init='indices')
     def _dump_image(self, ix, src='images', dst=None, fmt=None):
@@ -358,6 +479,63 @@ class ImagesBatch(BaseImagesBatch):
                 array_result[:] = result
                 setattr(self, component, array_result)
 
+    def _apply_dense(self, func, *args, src='images', dst=None, p=None, **kwargs):
+        """ Apply a transform to a dense array of images at once.
+
+        Parameters
+        ----------
+        func : callable
+            a method which gets an array of shape (N, H, W, C) and returns a transformed array
+            or ``NotImplemented`` if given arguments are not supported.
+        src : str
+            Component to get images from.
+        dst : str
+            Component to write images to. Default is `src`.
+        p : float
+            Probability of applying the transform to each image.
+
+        Returns
+        -------
+        self or NotImplemented
+            ``NotImplemented`` if images are not a dense array or arguments are evaluated for each item,
+            so the transform should be applied to each image separately.
+        """
+        _ = kwargs.pop('n_workers', None), kwargs.pop('chunk_size', None)
+        dst = src if dst is None else dst
+        if not isinstance(src, str) or not isinstance(dst, str):
+            return NotImplemented
+        if any(isinstance(arg, P) for arg in (p, *args, *kwargs.values())):
+            return NotImplemented
+        images = getattr(self, src)
+        if not isinstance(images, np.ndarray) or images.ndim != 4 or images.dtype == object:
+            return NotImplemented
+
+        if p is None:
+            mask = None
+        else:
+            mask = np.random.binomial(1, p, len(images)).astype(bool)
+            if mask.all():
+                mask = None
+
+        if mask is None:
+            result = func(self, images, *args, **kwargs)
+        elif mask.any():
+            result = func(self, images[mask], *args, **kwargs)
+            if result is not NotImplemented:
+                if result.shape[1:] != images.shape[1:]:
+                    # transformed and untouched images cannot be stacked together
+                    return NotImplemented
+                transformed = result
+                result = images.astype(np.result_type(images, transformed))
+                result[mask] = transformed
+        else:
+            result = images.copy()
+
+        if result is NotImplemented:
+            return NotImplemented
+        setattr(self, dst, result)
+        return self
+
     def _to_array_(self, image, dtype=None, channels='last'):
         """converts images in Batch to np.ndarray format
 
@@ -1032,6 +1210,69 @@ class ImagesBatch(BaseImagesBatch):
         """
         return PIL.ImageOps.posterize(image, bits)
 
+    # Batch-level versions of transforms for dense arrays of images of shape (N, H, W, C).
+    # They should give the same result as the corresponding per-image transforms.
+
+    def _dense_flip(self, images, mode='lr'):
+        return np.ascontiguousarray(np.flip(images, axis=2 if mode == 'lr' else 1))
+
+    def _dense_invert(self, images, channels='all'):
+        if images.dtype != np.uint8:
+            return NotImplemented
+        if channels == 'all':
+            return 255 - images
+        images = images.copy()
+        channels = (channels,) if isinstance(channels, Number) else list(channels)
+        images[..., channels] = 255 - images[..., channels]
+        return images
+
+    def _dense_clip(self, images, low=0, high=255):
+        if images.dtype != np.uint8:
+            return NotImplemented
+        return np.clip(images, np.asarray(low), np.asarray(high)).astype(np.uint8)
+
+    def _dense_multiply(self, images, multiplier=1., clip=False, preserve_type=False):
+        return self._multiply_(images, multiplier=multiplier, clip=clip, preserve_type=preserve_type)
+
+    def _dense_add(self, images, term=1., clip=False, preserve_type=False):
+        return self._add_(images, term=term, clip=clip, preserve_type=preserve_type)
+
+    def _dense_crop(self, images, origin, shape, crop_boundaries=False):
+        if isinstance(origin, str) and origin == 'random':
+            # each image would get its own origin
+            return NotImplemented
+        image_size = np.asarray(images.shape[2:0:-1])
+        origin = self._calc_origin(shape, origin, image_size)
+        right_bottom = origin + shape
+
+        if crop_boundaries:
+            origin = np.maximum(origin, 0)
+            right_bottom = np.minimum(right_bottom, image_size)
+
+        # a cropping box might go beyond an image, and that area is filled with zeros as PIL does
+        crop_size = np.maximum(right_bottom - origin, 0)
+        result = np.zeros((len(images), crop_size[1], crop_size[0], images.shape[-1]), dtype=images.dtype)
+        from_ = np.maximum(origin, 0)
+        to = np.minimum(right_bottom, image_size)
+        if (to > from_).all():
+            shift = from_ - origin
+            result[:, shift[1]:shift[1] + to[1] - from_[1], shift[0]:shift[0] + to[0] - from_[0]] = \
+                images[:, from_[1]:to[1], from_[0]:to[0]]
+        return result
+
+    def _dense_salt(self, images, p_noise=.015, color=255, size=(1, 1)):
+        if callable(color) or not (isinstance(size, (tuple, int)) and size in [1, (1, 1)]):
+            return NotImplemented
+        mask_salt = np.random.binomial(1, p_noise, size=images.shape[:3]).astype(bool)
+        images = images.copy()
+        images[mask_salt] = color
+        return images
+
+    def _dense_posterize(self, images, bits=4):
+        if images.dtype != np.uint8:
+            return NotImplemented
+        return images & np.uint8(~(2 ** (8 - bits) - 1) & 0xFF)
+
     def _cutout_(self, image, origin, shape, color):
         """ Fills given areas with color
 
@@ -0,0 +1,153 @@
+""" Contains a cache of batch components for deterministic parts of pipelines """
+import importlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .chunked import ChunkedStore, NO_COMPONENTS
+
+
+class BatchCache:
+    """ Store components of batch items by item ids
+
+    Parameters
+    ----------
+    components : str, sequence of str or None
+        components to store. If None, all components of batches are stored.
+    size : int or None
+        the maximum number of items kept in memory. When it is exceeded, least recently used items are evicted.
+        If None, the number of items is not limited.
+    path : str or None
+        a directory to store items in with :class:`~.ChunkedStore` instead of memory.
+        Items already stored there are used as well, and they are never evicted.
+
+    Examples
+    --------
+    ::
+
+        cache = BatchCache(size=10000)
+        cached, cached_data = cache.get(batch.indices)
+        if not cached.all():
+            cache.put(batch.indices[~cached], data)
+    """
+    def __init__(self, components=None, size=None, path=None):
+        self.components = (components,) if isinstance(components, str) else components
+        self.size = size
+        self.path = path
+        self._batch_class = None
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self._store = None
+        self._stored_ids = None
+        if path is not None:
+            self._store = ChunkedStore(path, mode='a')
+            self._stored_ids = set(self._store.ids.tolist())
+            if len(self._store) > 0:
+                self.components = tuple(None if comp == NO_COMPONENTS else comp
+                                        for comp in self._store.components)
+                self._batch_class = _locate_class(self._store.attrs.get('batch_class'))
+
+    @property
+    def batch_class(self):
+        """ type or None : a class of cached batches. It is None while it is unknown,
+        e.g. when it is stored on disk, but cannot be imported """
+        return self._batch_class
+
+    @batch_class.setter
+    def batch_class(self, value):
+        self._batch_class = value
+        if self._store is not None:
+            name = value.__module__ + ':' + value.__qualname__
+            if self._store.attrs.get('batch_class') != name:
+                self._store.set_attrs(batch_class=name)
+
+    def __len__(self):
+        if self._store is not None:
+            return len(self._store)
+        return len(self._items)
+
+    def get(self, ids, pools=None):
+        """ Return a boolean mask of cached items and a list of components data for them
+
+        Items stored on disk are read with a thread pool from `pools` (:data:`~.pools.DEFAULT_POOLS` if None).
+        """
+        if self._store is not None:
+            with self._lock:
+                cached = np.array([ix in self._stored_ids for ix in ids], dtype=bool)
+            if not cached.any():
+                return cached, None
+            columns = [NO_COMPONENTS if comp is None else comp for comp in self.components]
+            data = self._store.read(np.asarray(ids)[cached], columns, pools)
+            return cached, [data[column] for column in columns]
+
+        with self._lock:
+            cached = np.array([ix in self._items for ix in ids], dtype=bool)
+            if not cached.any():
+                return cached, None
+            items = []
+            for ix in np.asarray(ids)[cached]:
+                self._items.move_to_end(ix)
+                items.append(self._items[ix])
+        return cached, [_stack([item[i] for item in items]) for i in range(len(self.components))]
+
+    def put(self, ids, data):
+        """ Store items
+
+        Parameters
+        ----------
+        ids : sequence
+            item ids.
+        data : sequence of np.ndarray
+            components data in the order of `components`.
+        """
+        with self._lock:
+            if self._store is not None:
+                # items might be computed concurrently by several prefetching threads
+                new = np.array([ix not in self._stored_ids for ix in ids], dtype=bool)
+                if new.any():
+                    columns = [NO_COMPONENTS if comp is None else comp for comp in self.components]
+                    self._store.append(dict(zip(columns, [value[new] for value in data])), ids=np.asarray(ids)[new])
+                    self._stored_ids.update(np.asarray(ids)[new].tolist())
+                return
+
+            # actions after the cache might change batch data inplace
+            data = [value.copy() for value in data]
+            for i, ix in enumerate(ids):
+                self._items[ix] = tuple(value[i] for value in data)
+                self._items.move_to_end(ix)
+            if self.size is not None:
+                while len(self._items) > self.size:
+                    self._items.popitem(last=False)
+
+    def clear(self):
+        """ Remove all items from memory (items stored on disk are kept) """
+        with self._lock:
+            self._items.clear()
+
+
+def _locate_class(name):
+    """ Import a class by its name in the form 'module:qualname' or return None if it cannot be imported """
+    if name is None:
+        return None
+    module, _, qualname = name.partition(':')
+    try:
+        value = importlib.import_module(module)
+        for attr in qualname.split('.'):
+            value = getattr(value, attr)
+    except (ImportError, AttributeError):
+        return None
+    return value if isinstance(value, type) else None
+
+
+def _stack(items):
+    """ Stack items back into an array, keeping items of different shapes in an object array """
+    if len(items) > 0 and isinstance(items[0], np.ndarray) and items[0].dtype != object and \
+       all(isinstance(item, np.ndarray) and item.shape == items[0].shape for item in items):
+        return np.stack(items)
+    if len(items) > 0 and not isinstance(items[0], np.ndarray) and not isinstance(items[0], (list, tuple)):
+        return np.array(items)
+    data = np.empty(len(items), dtype=object)
+    for i, item in enumerate(items):
+        data[i] = item
+    return data
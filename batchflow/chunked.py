@@ -0,0 +1,418 @@
+""" Contains a columnar chunked on-disk storage for batch data """
+import os
+import json
+import threading
+
+import dill
+try:
+    import blosc
+except ImportError:
+    blosc = None
+import numpy as np
+
+from .pools import DEFAULT_POOLS
+from .dsindex import build_positions
+
+
+IDS_COLUMN = '__ids__'
+NO_COMPONENTS = '__data__'
+
+
+def _encode(data):
+    """ Compress a chunk of a column """
+    data = np.asarray(data) if not isinstance(data, np.ndarray) else data
+    if data.dtype.hasobject:
+        items = list(data) if data.ndim > 0 else [data.item()]
+        return blosc.compress(dill.dumps(items)), dict(kind='object')
+    data = np.ascontiguousarray(data)
+    payload = blosc.compress(data.tobytes(), typesize=max(1, min(data.dtype.itemsize, 255)))
+    spec = dict(kind='array', dtype=data.dtype.str, shape=list(data.shape[1:]))
+    if data.ndim == 1 and data.dtype.kind in 'iuf' and len(data) > 0 and not np.isnan(data).any():
+        # value ranges allow to skip chunks when reading items with values in a given range
+        spec.update(min=data.min().item(), max=data.max().item())
+    return payload, spec
+
+def _decode(payload, spec, n_items):
+    """ Decompress a chunk of a column """
+    payload = blosc.decompress(payload)
+    if spec['kind'] == 'object':
+        return _object_array(dill.loads(payload))
+    return np.frombuffer(payload, dtype=np.dtype(spec['dtype'])).reshape(n_items, *spec['shape']).copy()
+
+def _concat(parts):
+    """ Concatenate chunks of a column """
+    if len(parts) == 0:
+        return np.array([])
+    if any(part.dtype.hasobject for part in parts):
+        return _object_array([item for part in parts for item in part])
+    return np.concatenate(parts)
+
+def _object_array(items):
+    """ Make a 1-d object array even if items are sequences of the same length """
+    data = np.empty(len(items), dtype=object)
+    for i, item in enumerate(items):
+        data[i] = item
+    return data
+
+
+class ChunkedStore:
+    """ A columnar on-disk storage of batch components
+
+    Each component is stored in its own file as a sequence of blosc-compressed chunks,
+    while a small metadata file keeps chunk offsets and data types.
+    Item ids are stored in the same way as a separate column.
+    So reading a batch takes a few range reads and chunks are decompressed in parallel.
+
+    Parameters
+    ----------
+    path : str
+        a directory to store files in.
+    mode : {'r', 'a', 'w'}
+        'r' - read only, 'a' - read and append (a storage is created if it does not exist),
+        'w' - create a new storage (an existing one is removed).
+    chunk_size : int
+        the maximum number of items in a chunk when appending data.
+    n_workers : int or None
+        the number of threads to decompress chunks with. If None, the number of CPUs is used.
+    log_meta : bool
+        whether records of appended chunks are added to a log file instead of rewriting the metadata file.
+        The log is merged into the metadata when it gets as long as the metadata itself,
+        so frequent small appends take constant time on average.
+
+    Examples
+    --------
+    ::
+
+        store = ChunkedStore('/path/to/data', mode='a')
+        store.append(dict(images=images, labels=labels), ids=index.indices)
+        data = store.read(batch.indices, components=['images'])
+
+    Usually it is used through batch loading and dumping::
+
+        pipeline.dump(dst='/path/to/data', fmt='chunked')
+        pipeline.load(src='/path/to/data', fmt='chunked')
+    """
+    META_FILE = 'meta.json'
+    LOG_FILE = 'meta.log'
+
+    def __init__(self, path, mode='r', chunk_size=1024, n_workers=None, log_meta=False):
+        if blosc is None:
+            raise ImportError('blosc is required to use ChunkedStore')
+        if mode not in ('r', 'a', 'w'):
+            raise ValueError("mode should be one of 'r', 'a', 'w', but given %s" % mode)
+        self.path = path
+        self.mode = mode
+        self.chunk_size = chunk_size
+        self.n_workers = n_workers or os.cpu_count()
+        self.log_meta = log_meta
+        self._lock = threading.Lock()
+        self._ids = None
+        self._id_map = None
+        self._n_logged = 0
+        self._log_broken = False
+
+        meta_path = os.path.join(path, self.META_FILE)
+        if mode == 'w' and os.path.exists(meta_path):
+            columns = self._read_meta()['columns']
+            for name in [self.META_FILE, self.LOG_FILE, *(self._column_file(column) for column in columns)]:
+                file_name = os.path.join(path, name)
+                if os.path.exists(file_name):
+                    os.remove(file_name)
+
+        if os.path.exists(meta_path):
+            self.meta = self._read_meta()
+        elif mode == 'r':
+            raise FileNotFoundError('Chunked storage is not found at %s' % path)
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.meta = dict(version=1, n_items=0, columns=[], chunks=[])
+            # so that the same empty storage is shared by all threads which open it
+            self._meta_mtime = self._get_meta_mtime()
+
+    def _get_meta_mtime(self):
+        """ Versions of the metadata and its log, which change whenever the storage is appended to
+
+        Modification times alone might not change on fast appends, so inodes and sizes are also compared.
+        """
+        paths = [os.path.join(self.path, name) for name in (self.META_FILE, self.LOG_FILE)]
+        result = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                result.append(None)
+            else:
+                result.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+        return tuple(result)
+
+    def _read_meta(self):
+        with open(os.path.join(self.path, self.META_FILE), 'r') as f:
+            meta = json.load(f)
+        n_merged = len(meta['chunks'])
+        log_path = os.path.join(self.path, self.LOG_FILE)
+        if os.path.exists(log_path):
+            with open(log_path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # a writer has crashed in the middle of a record
+                        self._log_broken = True
+                        break
+                    # records might be already merged if a writer has crashed before removing the log
+                    if record['no'] == len(meta['chunks']):
+                        meta['chunks'].append(record['chunk'])
+                        meta['n_items'] += record['chunk']['n_items']
+        self._n_logged = len(meta['chunks']) - n_merged
+        self._meta_mtime = self._get_meta_mtime()
+        return meta
+
+    def _write_meta(self):
+        meta_path = os.path.join(self.path, self.META_FILE)
+        tmp_path = meta_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, meta_path)
+        log_path = os.path.join(self.path, self.LOG_FILE)
+        if os.path.exists(log_path):
+            os.remove(log_path)
+        self._n_logged = 0
+        self._log_broken = False
+        self._meta_mtime = self._get_meta_mtime()
+
+    def _log_chunks(self, start):
+        """ Add records of chunks starting from a given one to the log """
+        with open(os.path.join(self.path, self.LOG_FILE), 'a') as f:
+            for no in range(start, len(self.meta['chunks'])):
+                f.write(json.dumps(dict(no=no, chunk=self.meta['chunks'][no])) + '\n')
+        self._n_logged += len(self.meta['chunks']) - start
+        self._meta_mtime = self._get_meta_mtime()
+
+    @staticmethod
+    def _column_file(column):
+        return column + '.bin'
+
+    @property
+    def components(self):
+        """ tuple : names of stored components """
+        return tuple(column for column in self.meta['columns'] if column != IDS_COLUMN)
+
+    def __len__(self):
+        return self.meta['n_items']
+
+    @property
+    def attrs(self):
+        """ dict : attributes of the storage kept in its metadata """
+        return self.meta.get('attrs', {})
+
+    def set_attrs(self, **attrs):
+        """ Update attributes of the storage """
+        if self.mode == 'r':
+            raise ValueError('Cannot change a storage opened in read-only mode')
+        with self._lock:
+            self.meta.setdefault('attrs', {}).update(attrs)
+            self._write_meta()
+
+    def append(self, data, ids=None):
+        """ Append items to the storage
+
+        Parameters
+        ----------
+        data : dict
+            components as keys and sequences of items as values.
+        ids : sequence or None
+            item ids. If None, ids continue a range of positions.
+        """
+        if self.mode == 'r':
+            raise ValueError('Cannot append to a storage opened in read-only mode')
+        data = {column: value if isinstance(value, np.ndarray) else np.asarray(value) for column, value in data.items()}
+        n_items = len(next(iter(data.values())))
+        if any(len(value) != n_items for value in data.values()):
+            raise ValueError('All components should have the same number of items')
+
+        with self._lock:
+            if ids is None:
+                ids = np.arange(len(self), len(self) + n_items)
+            data[IDS_COLUMN] = np.asarray(ids)
+            if len(data[IDS_COLUMN]) != n_items:
+                raise ValueError('The number of ids should be equal to the number of items')
+
+            columns = sorted(data)
+            first_chunk = len(self.meta['chunks'])
+            if self.meta['columns'] and sorted(self.meta['columns']) != columns:
+                raise ValueError('Components %s do not match stored components %s' %
+                                 (columns, self.meta['columns']))
+
+            files = {column: open(os.path.join(self.path, self._column_file(column)), 'ab') for column in columns}
+            try:
+                for start in range(0, n_items, self.chunk_size):
+                    stop = min(start + self.chunk_size, n_items)
+                    chunk = dict(n_items=stop - start, columns={})
+                    for column in columns:
+                        payload, spec = _encode(data[column][start:stop])
+                        f = files[column]
+                        chunk['columns'][column] = dict(offset=f.tell(), nbytes=len(payload), **spec)
+                        f.write(payload)
+                    self.meta['chunks'].append(chunk)
+            finally:
+                for f in files.values():
+                    f.close()
+
+            n_merged = first_chunk - self._n_logged
+            can_log = self.log_meta and self.meta['columns'] and not self._log_broken
+            self.meta['columns'] = columns
+            self.meta['n_items'] += n_items
+            if can_log and len(self.meta['chunks']) - n_merged <= n_merged:
+                self._log_chunks(first_chunk)
+            else:
+                self._write_meta()
+            self._ids = None
+            self._id_map = None
+        return self
+
+    def _read_chunk(self, column, chunk_no):
+        chunk = self.meta['chunks'][chunk_no]
+        spec = chunk['columns'][column]
+        with open(os.path.join(self.path, self._column_file(column)), 'rb') as f:
+            f.seek(spec['offset'])
+            payload = f.read(spec['nbytes'])
+        return _decode(payload, spec, chunk['n_items'])
+
+    def _read_chunks(self, tasks, pools=None):
+        """ Read and decompress (column, chunk number) pairs in parallel """
+        pools = DEFAULT_POOLS if pools is None else pools
+        if len(tasks) < 2 or pools.in_pool():
+            return [self._read_chunk(*task) for task in tasks]
+        executor = pools.get('threads', self.n_workers)
+        futures = [executor.submit(self._read_chunk, *task) for task in tasks]
+        return [future.result() for future in futures]
+
+    def find_chunks(self, column, low=None, high=None):
+        """ Return numbers of chunks which might contain values of a numeric column within [low, high]
+
+        Chunks without value ranges (e.g. of non-numeric columns) are always returned.
+        """
+        result = []
+        for chunk_no, chunk in enumerate(self.meta['chunks']):
+            spec = chunk['columns'][column]
+            if 'min' in spec and ((low is not None and spec['max'] < low) or
+                                  (high is not None and spec['min'] > high)):
+                continue
+            result.append(chunk_no)
+        return result
+
+    def read_chunks(self, chunks=None, components=None, pools=None):
+        """ Read all items of given chunks
+
+        Parameters
+        ----------
+        chunks : sequence of int or None
+            chunk numbers. If None, all chunks are read.
+        components : sequence of str or None
+            components to read. If None, all components are read.
+        pools : PoolRegistry or None
+            a registry to take a thread pool from. If None, :data:`~.pools.DEFAULT_POOLS` is used.
+
+        Returns
+        -------
+        dict
+            components as keys and arrays of items of all chunks in the order of `chunks` as values.
+        """
+        chunks = range(len(self.meta['chunks'])) if chunks is None else chunks
+        components = self.components if components is None else components
+        if isinstance(components, str):
+            components = (components,)
+        tasks = [(column, chunk_no) for column in components for chunk_no in chunks]
+        data = dict(zip(tasks, self._read_chunks(tasks, pools)))
+        return {column: _concat([data[column, chunk_no] for chunk_no in chunks]) for column in components}
+
+    @property
+    def chunk_starts(self):
+        """ np.ndarray : positions of the first items of chunks """
+        sizes = [chunk['n_items'] for chunk in self.meta['chunks']]
+        return np.cumsum([0] + sizes)[:-1]
+
+    @property
+    def ids(self):
+        """ np.ndarray : ids of all stored items """
+        return self._get_ids()
+
+    def _get_ids(self, pools=None):
+        if self._ids is None:
+            n_chunks = len(self.meta['chunks'])
+            chunks = self._read_chunks([(IDS_COLUMN, i) for i in range(n_chunks)], pools)
+            self._ids = np.concatenate(chunks) if chunks else np.array([])
+        return self._ids
+
+    def get_pos(self, ids, pools=None):
+        """ Return positions of items with given ids """
+        if len(self) == 0:
+            raise KeyError('The storage is empty')
+        if self._id_map is None:
+            self._id_map = build_positions(self._get_ids(pools))
+        return np.atleast_1d(self._id_map(ids))
+
+    def read(self, ids=None, components=None, pools=None):
+        """ Read items with given ids
+
+        Parameters
+        ----------
+        ids : sequence or None
+            item ids. If None, all items are read.
+        components : sequence of str or None
+            components to read. If None, all components are read.
+        pools : PoolRegistry or None
+            a registry to take a thread pool from. If None, :data:`~.pools.DEFAULT_POOLS` is used.
+
+        Returns
+        -------
+        dict
+            components as keys and arrays of items in the order of `ids` as values.
+        """
+        components = self.components if components is None else components
+        if isinstance(components, str):
+            components = (components,)
+        missing = set(components) - set(self.components)
+        if missing:
+            raise KeyError('Components %s are not found in the storage' % sorted(missing))
+
+        starts = self.chunk_starts
+        positions = np.arange(len(self)) if ids is None else self.get_pos(ids, pools)
+        chunk_nums = np.searchsorted(starts, positions, side='right') - 1
+        needed = np.unique(chunk_nums)
+
+        tasks = [(column, chunk_no) for column in components for chunk_no in needed]
+        chunks = dict(zip(tasks, self._read_chunks(tasks, pools)))
+
+        result = {}
+        for column in components:
+            if len(needed) == 1:
+                data = chunks[column, needed[0]][positions - starts[needed[0]]]
+            else:
+                # chunks of the same column might differ in dtype or shape, so they are concatenated first
+                parts = [chunks[column, chunk_no] for chunk_no in needed]
+                merged = _concat(parts)
+                offsets = np.zeros(len(starts), dtype=np.int64)
+                offsets[needed] = np.cumsum([0] + [len(part) for part in parts])[:-1]
+                data = merged[offsets[chunk_nums] + positions - starts[chunk_nums]]
+            result[column] = data
+        return result
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def open_store(path, mode='r'):
+    """ Return a storage for a path, reusing an opened one unless its files have been changed by someone else """
+    key = os.path.abspath(path), mode
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is not None:
+            # the storage lock is held while it is being appended to, so its metadata is consistent here
+            with store._lock:                       # pylint: disable=protected-access
+                if store._meta_mtime != store._get_meta_mtime():   # pylint: disable=protected-access
+                    store = None
+        if store is None:
+            store = ChunkedStore(path, mode=mode)
+            _stores[key] = store
+    return store
@@ -7,6 +7,7 @@ except ImportError:
     import _fake as pd
 
 from .utils import is_iterable
+from .dsindex import build_positions
 
 
 class AdvancedDict(dict):
@@ -103,12 +104,14 @@ class BaseComponents:
         return type(self)(self.components, self, item, crop=False)
 
     def find_in_index(self, item):
-        """ Return a posiition of an item in the index """
-        if isinstance(self._indices, list):
-            return self._indices.index(item)
-        if isinstance(self._indices, np.ndarray):
-            return np.where(self._indices == item)[0][0]
-        raise TypeError("Unknown index type: %s" % type(self._indices))
+        """ Return a position of an item (or positions of several items) in the index """
+        if not isinstance(self._indices, (list, np.ndarray)):
+            raise TypeError("Unknown index type: %s" % type(self._indices))
+        positions = self.__dict__.get('_positions')
+        if positions is None:
+            positions = build_positions(self._indices)
+            self.__dict__['_positions'] = positions
+        return positions(item)
 
     def get_pos(self, component, indices):
         """ Return positions of given indices """
@@ -117,13 +120,14 @@ class BaseComponents:
             # a cropped numpy array needs a position as an index
             if isinstance(self.data[component], np.ndarray):
                 if is_iterable(indices):
-                    items = [self.find_in_index(i) for i in indices]
+                    items = self.find_in_index(list(indices) if not isinstance(indices, np.ndarray) else indices)
                 else:
                     items = self.find_in_index(indices)
         return items
 
     def _get(self, component, indices=None, cropped=True):
-        indices = indices if indices is not None else self._indices
+        # cropped data already contains only the items needed
+        indices = indices if indices is not None else self.indices
 
         if self.data is None:
             return None
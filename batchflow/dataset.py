@@ -75,6 +75,8 @@ class Dataset(Baseset):
         self._attrs = None
         kwargs['_copy'] = kwargs.get('_copy', copy)
         self.n_splits = None
+        self._cv_splits = None
+        self._cv_source = None
 
         cv_kwargs = {item: kwargs.pop(item) for item in ['method', 'n_splits', 'shuffle'] if item in kwargs}
         if cv_kwargs.get('n_splits') is not None:
@@ -108,6 +110,14 @@ class Dataset(Baseset):
 
     def __getattr__(self, name):
         if name[:2] == 'cv' and name[2:].isdigit():
+            # fold datasets are created on first access
+            if self.__dict__.get('_cv_source') is not None:
+                source, part = self._cv_source
+                fold = getattr(getattr(source, name), part)
+                setattr(self, name, fold)
+                return fold
+            if self.__dict__.get('_cv_splits') is not None and int(name[2:]) < self.n_splits:
+                return self._create_fold(int(name[2:]))
             raise AttributeError("To access cross-validation call cv_split() first.")
         if self.batch_class.components is not None and name in self.batch_class.components:
             return getattr(self.data, name)
@@ -186,13 +196,17 @@ class Dataset(Baseset):
                index1.indices.shape == index2.indices.shape and \
                np.all(index1.indices == index2.indices)
 
-    def create_subset(self, index):
+    def create_subset(self, index, pos=False):
         """ Create a dataset based on the given subset of indices
 
             Parameters
             ----------
             index : DatasetIndex or np.array
 
+            pos : bool
+                whether `index` contains positions of items in the dataset index.
+                Positions are not checked, so a subset is created without any lookups.
+
             Returns
             -------
             Dataset
@@ -205,9 +219,13 @@ class Dataset(Baseset):
                 If the index lies out of the source dataset index's range, the IndexError is raised.
 
         """
+        if pos:
+            return type(self).from_dataset(self, self.index.create_subset(index, pos=True))
         indices = index.indices if isinstance(index, DatasetIndex) else index
-        if not np.isin(indices, self.indices).all():
-            raise IndexError
+        try:
+            self.index.get_pos(np.asarray(indices))
+        except KeyError:
+            raise IndexError("Index contains items which are not in the dataset") from None
         return type(self).from_dataset(self, self.index.create_subset(index))
 
     def create_batch(self, index, pos=False, *args, **kwargs):
@@ -332,19 +350,17 @@ class Dataset(Baseset):
         """
         if self.n_splits is not None:
             for i in range(self.n_splits):
-                cv_attr = 'cv'+str(i)
-                delattr(self, cv_attr)
-                if self.train is not None:
-                    delattr(self.train, cv_attr)
-                if self.test is not None:
-                    delattr(self.test, cv_attr)
+                for dataset in [self, self.train, self.test]:
+                    if dataset is not None:
+                        dataset.__dict__.pop('cv' + str(i), None)
 
         self.n_splits = n_splits
 
         order = self.index.shuffle(shuffle)
 
         if method == 'kfold':
-            splits = self._split_kfold(n_splits, order)
+            # folds are kept as positions and fold datasets are created only when they are accessed
+            self._cv_splits = self._split_kfold(n_splits, order)
         else:
             raise ValueError("Unknown split method:", method)
 
@@ -353,29 +369,26 @@ class Dataset(Baseset):
 
         self.train.n_splits = self.n_splits
         self.test.n_splits = self.n_splits
-
-        for i in range(n_splits):
-            test_indices = splits[i]
-            train_splits = list(set(range(n_splits)) - {i})
-            train_indices = np.concatenate(np.asarray(splits)[train_splits])
-
-            setattr(self, 'cv'+str(i), self.copy())
-            cv_dataset = getattr(self, 'cv'+str(i))
-            cv_dataset.train = self.create_subset(train_indices)
-            cv_dataset.test = self.create_subset(test_indices)
-            setattr(self.train, 'cv'+str(i), cv_dataset.train)
-            setattr(self.test, 'cv'+str(i), cv_dataset.test)
+        self.train._cv_source = self, 'train'       # pylint: disable=protected-access
+        self.test._cv_source = self, 'test'         # pylint: disable=protected-access
 
     def _split_kfold(self, n_splits, order):
-        split_sizes = np.full(n_splits, len(order) // n_splits, dtype=np.int)
+        """ Return positions of items in each fold """
+        split_sizes = np.full(n_splits, len(order) // n_splits, dtype=np.int64)
         split_sizes[:len(order) % n_splits] += 1
-        current = 0
-        splits = []
-        for split_size in split_sizes:
-            start, stop = current, current + split_size
-            splits.append(self.indices[order[start:stop]])
-            current = stop
-        return splits
+        bounds = np.cumsum([0, *split_sizes])
+        return [order[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def _create_fold(self, i):
+        """ Create a dataset for the `i`-th fold with train and test subsets """
+        test_pos = self._cv_splits[i]
+        train_pos = np.concatenate(self._cv_splits[:i] + self._cv_splits[i+1:])
+
+        cv_dataset = self.copy()
+        cv_dataset.train = self.create_subset(train_pos, pos=True)
+        cv_dataset.test = self.create_subset(test_pos, pos=True)
+        setattr(self, 'cv' + str(i), cv_dataset)
+        return cv_dataset
 
     def __getstate__(self):
         return self.__dict__
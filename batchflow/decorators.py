@@ -7,12 +7,15 @@ import asyncio
 import functools
 import logging
 import inspect
+import math
 try:
     from numba import jit
 except ImportError:
     jit = None
 
 from .named_expr import P
+from .pools import get_pools
+from .profiler import active_profiler
 
 
 def _workers_count():
@@ -24,6 +27,61 @@ def _workers_count():
     return cpu_count * 4
 
 
+def _get_executor(batch, kind, n_workers=None):
+    """ Return a shared pool from a batch pipeline registry, its size and whether it is a temporary one """
+    pools = get_pools(batch)
+    n_workers = n_workers or pools.n_workers or _workers_count()
+    if kind == 'threads' and pools.in_pool():
+        # a nested parallel call within a pool worker waiting for the pool would cause a deadlock
+        return cf.ThreadPoolExecutor(max_workers=n_workers), n_workers, True
+    return pools.get(kind, n_workers), n_workers, False
+
+
+# the number of chunks per worker when a chunk size is chosen automatically
+CHUNKS_PER_WORKER = 4
+
+def _get_chunk_size(chunk_size, n_items, n_workers):
+    if chunk_size == 'auto':
+        return max(1, math.ceil(n_items / (n_workers * CHUNKS_PER_WORKER)))
+    if isinstance(chunk_size, int) and chunk_size > 0:
+        return chunk_size
+    raise ValueError("chunk_size should be a positive int or 'auto', but given %s" % chunk_size)
+
+def _run_chunk(method, calls):
+    """ Call a method for each (args, kwargs) pair and return a list of results or exceptions """
+    results = []
+    for margs, mkwargs in calls:
+        try:
+            results.append(method(*margs, **mkwargs))
+        except Exception as e:  # pylint: disable=broad-except
+            results.append(e)
+    return results
+
+def _submit_chunks(executor, method, calls, chunk_size, n_workers):
+    """ Submit contiguous chunks of calls, so that each task processes several items """
+    chunk_size = _get_chunk_size(chunk_size, len(calls), n_workers)
+    return [(executor.submit(_run_chunk, method, calls[i:i + chunk_size]), len(calls[i:i + chunk_size]))
+            for i in range(0, len(calls), chunk_size)]
+
+def _traced(method, batch):
+    """ Wrap a method to record its calls if a pipeline is being traced """
+    context = active_profiler()
+    if context is None:
+        return method
+    profiler, iter_no = context
+    return profiler.wrap(method, iter_no, -1 if batch is None else id(batch))
+
+def _gather_chunks(chunks):
+    """ Return a flat list of results in the original order """
+    results = []
+    for future, size in chunks:
+        try:
+            results.extend(future.result())
+        except Exception as e:  # pylint: disable=broad-except
+            results.extend([e] * size)
+    return results
+
+
 def _make_action_wrapper_with_args(use_lock=None):    # pylint: disable=redefined-outer-name
     return functools.partial(_make_action_wrapper, _use_lock=use_lock)
 
@@ -88,9 +146,27 @@ def any_action_failed(results):
     return any(isinstance(res, Exception) for res in results)
 
 def inbatch_parallel(init, post=None, target='threads', _use_self=None, **dec_kwargs):
-    """ Decorator for parallel methods in :class:`~dataset.Batch` classes"""
+    """ Decorator for parallel methods in :class:`~dataset.Batch` classes
+
+    Parameters
+    ----------
+    init : str or callable
+        a method (or its name) which returns a list of arguments for each parallel invocation.
+    post : str or callable
+        a method (or its name) which gets a list of results.
+    target : {'threads', 'mpc', 'async', 'for'}
+        a parallelization engine.
+    chunk_size : int, 'auto' or None
+        the number of items processed by one task in 'threads' and 'mpc' targets.
+        If 'auto', items are split into ``4 * n_workers`` contiguous chunks.
+        If None (default), each item is submitted as a separate task.
+        Might be overridden with `chunk_size` argument of a method call.
+    dec_kwargs
+        other arguments passed to `init` and `post`.
+    """
     if target not in ['nogil', 'threads', 'mpc', 'async', 'for', 't', 'm', 'a', 'f']:
         raise ValueError("target should be one of 'threads', 'mpc', 'async', 'for'")
+    default_chunk_size = dec_kwargs.pop('chunk_size', None)
 
     def inbatch_parallel_decorator(method):
         """ Return a decorator which run a method in parallel """
@@ -215,39 +291,62 @@ def inbatch_parallel(init, post=None, target='threads', _use_self=None, **dec_kw
             """ Run a method in parallel """
             init_fn, post_fn = _check_functions(self)
 
-            n_workers = kwargs.pop('n_workers', _workers_count())
-            with cf.ThreadPoolExecutor(max_workers=n_workers) as executor:
+            n_workers = kwargs.pop('n_workers', None)
+            chunk_size = kwargs.pop('chunk_size', default_chunk_size)
+            executor, n_workers, temporary = _get_executor(self, 'threads', n_workers)
+            traced_method = _traced(method, self)
+            try:
                 futures = []
                 args, kwargs, params = _prepare_args(self, args, kwargs)
                 full_kwargs = {**dec_kwargs, **kwargs}
-                for iteration, arg in enumerate(_call_init_fn(init_fn, args, full_kwargs)):
-                    margs, mkwargs = _make_args(self, iteration, arg, args, kwargs, params)
-                    one_ft = executor.submit(method, *margs, **mkwargs)
-                    futures.append(one_ft)
+                calls = (_make_args(self, iteration, arg, args, kwargs, params)
+                         for iteration, arg in enumerate(_call_init_fn(init_fn, args, full_kwargs)))
+                if chunk_size is None:
+                    for margs, mkwargs in calls:
+                        one_ft = executor.submit(traced_method, *margs, **mkwargs)
+                        futures.append(one_ft)
+                else:
+                    chunks = _submit_chunks(executor, traced_method, list(calls), chunk_size, n_workers)
+                    futures = [future for future, _ in chunks]
 
                 timeout = kwargs.get('timeout', None)
                 cf.wait(futures, timeout=timeout, return_when=cf.ALL_COMPLETED)
+            finally:
+                if temporary:
+                    executor.shutdown()
 
+            if chunk_size is not None:
+                futures = _gather_chunks(chunks)
             return _call_post_fn(self, post_fn, futures, args, full_kwargs)
 
         def wrap_with_mpc(self, args, kwargs):
             """ Run a method in parallel """
             init_fn, post_fn = _check_functions(self)
 
-            n_workers = kwargs.pop('n_workers', _workers_count())
-            with cf.ProcessPoolExecutor(max_workers=n_workers) as executor:
-                futures = []
-                mpc_func = method(self, *args, **kwargs)
-                args, kwargs, params = _prepare_args(self, args, kwargs)
-                full_kwargs = {**dec_kwargs, **kwargs}
-                for iteration, arg in enumerate(_call_init_fn(init_fn, args, full_kwargs)):
-                    margs, mkwargs = _make_args(None, iteration, arg, args, kwargs, params)
+            n_workers = kwargs.pop('n_workers', None)
+            chunk_size = kwargs.pop('chunk_size', default_chunk_size)
+            # worker processes stay alive between calls
+            executor, n_workers, _ = _get_executor(self, 'mpc', n_workers)
+            futures = []
+            mpc_func = method(self, *args, **kwargs)
+            args, kwargs, params = _prepare_args(self, args, kwargs)
+            full_kwargs = {**dec_kwargs, **kwargs}
+            calls = (_make_args(None, iteration, arg, args, kwargs, params)
+                     for iteration, arg in enumerate(_call_init_fn(init_fn, args, full_kwargs)))
+            if chunk_size is None:
+                for margs, mkwargs in calls:
                     one_ft = executor.submit(mpc_func, *margs, **mkwargs)
                     futures.append(one_ft)
+            else:
+                # a function is sent to a worker once per chunk rather than once per item
+                chunks = _submit_chunks(executor, mpc_func, list(calls), chunk_size, n_workers)
+                futures = [future for future, _ in chunks]
 
-                timeout = kwargs.pop('timeout', None)
-                cf.wait(futures, timeout=timeout, return_when=cf.ALL_COMPLETED)
+            timeout = kwargs.pop('timeout', None)
+            cf.wait(futures, timeout=timeout, return_when=cf.ALL_COMPLETED)
 
+            if chunk_size is not None:
+                futures = _gather_chunks(chunks)
             return _call_post_fn(self, post_fn, futures, args, full_kwargs)
 
         @asyncio.coroutine
@@ -277,6 +376,7 @@ def inbatch_parallel(init, post=None, target='threads', _use_self=None, **dec_kw
 
             init_fn, post_fn = _check_functions(self)
 
+            _ = kwargs.pop('chunk_size', None)
             futures = []
             args, kwargs, params = _prepare_args(self, args, kwargs)
             full_kwargs = {**dec_kwargs, **kwargs}
@@ -295,14 +395,16 @@ def inbatch_parallel(init, post=None, target='threads', _use_self=None, **dec_kw
             """ Run a method sequentially (without parallelism) """
             init_fn, post_fn = _check_functions(self)
 
-            _ = kwargs.pop('n_workers', _workers_count())
+            _ = kwargs.pop('n_workers', None)
+            _ = kwargs.pop('chunk_size', None)
+            traced_method = _traced(method, self)
             futures = []
             args, kwargs, params = _prepare_args(self, args, kwargs)
             full_kwargs = {**dec_kwargs, **kwargs}
             for iteration, arg in enumerate(_call_init_fn(init_fn, args, full_kwargs)):
                 margs, mkwargs = _make_args(self, iteration, arg, args, kwargs, params)
                 try:
-                    one_ft = method(*margs, **mkwargs)
+                    one_ft = traced_method(*margs, **mkwargs)
                 except Exception as e:   # pylint: disable=broad-except
                     one_ft = e
                 futures.append(one_ft)
@@ -1,13 +1,103 @@
 """ DatasetIndex """
 import os
 import math
-import glob
+import copy as cp
 from collections.abc import Iterable
 import warnings
 import numpy as np
 
 from .base import Baseset
 from .utils import create_bar, update_bar
+from .paths import PathTable, scan_glob
+
+
+class _Positions:
+    """ Base class for a lookup of positions of items in an index """
+    def __call__(self, items):
+        items = np.asarray(items)
+        if items.size == 0:
+            return np.zeros(items.shape, dtype=np.int64)
+        pos = self.find(items)
+        return pos[()] if pos.ndim == 0 else pos
+
+    def find(self, items):
+        """ Return an array of positions of given items """
+        raise NotImplementedError()
+
+
+class _RangePositions(_Positions):
+    """ Positions of items in an arithmetic progression of integers """
+    def __init__(self, start, step, size):
+        self.start, self.step, self.size = start, step, size
+
+    def find(self, items):
+        if items.dtype.kind not in 'iu':
+            if items.size > 0 and (items.dtype.kind != 'f' or (items != np.round(items)).any()):
+                raise KeyError(items)
+            items = items.astype(np.int64)
+        offset = items - self.start
+        pos = offset // self.step
+        if ((offset % self.step != 0) | (pos < 0) | (pos >= self.size)).any():
+            raise KeyError(items[(offset % self.step != 0) | (pos < 0) | (pos >= self.size)])
+        return pos
+
+
+class _SortedPositions(_Positions):
+    """ Positions of items found with a binary search """
+    def __init__(self, indices):
+        if (indices[1:] > indices[:-1]).all():
+            self.sorter = None
+            self.sorted = indices
+        else:
+            self.sorter = np.argsort(indices, kind='stable')
+            self.sorted = indices[self.sorter]
+
+    def find(self, items):
+        try:
+            if items.dtype.hasobject:
+                # casting to the index dtype would truncate longer strings
+                items = np.asarray(items.tolist())
+            if (items.dtype.kind in 'US') != (self.sorted.dtype.kind in 'US'):
+                raise TypeError
+            pos = np.searchsorted(self.sorted, items)
+        except (TypeError, ValueError):
+            raise KeyError(items) from None
+        pos = np.minimum(pos, len(self.sorted) - 1)
+        missing = self.sorted[pos] != items
+        if np.any(missing):
+            raise KeyError(items[missing] if np.ndim(missing) else items)
+        return pos if self.sorter is None else self.sorter[pos]
+
+
+class _DictPositions(_Positions):
+    """ Positions of arbitrary hashable items """
+    def __init__(self, indices):
+        # python objects are hashed faster than numpy scalars
+        self.pos = dict(zip(indices.tolist(), range(len(indices))))
+
+    def find(self, items):
+        items = items.astype(object)
+        if items.ndim == 0:
+            return np.asarray(self.pos[items.item()], dtype=np.int64)
+        return np.array([self.pos[item] for item in items.tolist()], dtype=np.int64)
+
+
+def build_positions(indices):
+    """ Return a function which finds positions of given items in `indices` in one vectorized call
+
+    Integer ranges are resolved arithmetically, other numeric and string indices with a binary search,
+    while objects are looked up in a dict.
+    """
+    indices = np.asarray(indices)
+    if indices.dtype.kind in 'iu' and len(indices) > 1:
+        start, step = int(indices[0]), int(indices[1]) - int(indices[0])
+        if step > 0 and indices[-1] == start + step * (len(indices) - 1) and (np.diff(indices) == step).all():
+            return _RangePositions(start, step, len(indices))
+    if indices.dtype.kind in 'iu' and len(indices) == 1:
+        return _RangePositions(int(indices[0]), 1, 1)
+    if indices.dtype.kind in 'iufUSMm' and not (indices.dtype.kind == 'f' and np.isnan(indices).any()):
+        return _SortedPositions(indices)
+    return _DictPositions(indices)
 
 
 class DatasetIndex(Baseset):
@@ -29,7 +119,7 @@ class DatasetIndex(Baseset):
     """
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self._pos = self.build_pos()
+        self._positions = None
         self._random_state = None
 
     @classmethod
@@ -123,6 +213,13 @@ class DatasetIndex(Baseset):
             return dict()
         return dict(zip(self.indices, np.arange(len(self))))
 
+    @property
+    def positions(self):
+        """ callable : a function which returns positions of given items (it is created on first use) """
+        if self._positions is None:
+            self._positions = build_positions(self.indices)
+        return self._positions
+
     def get_pos(self, index):
         """ Return position of an item in the index.
 
@@ -150,15 +247,15 @@ class DatasetIndex(Baseset):
         >>> DatasetIndex(['image_0', 'image_1']).get_pos('image_1')
         """
         if isinstance(index, slice):
-            start = self._pos[index.start] if index.start is not None else None
-            stop = self._pos[index.stop] if index.stop is not None else None
+            start = self.positions(index.start) if index.start is not None else None
+            stop = self.positions(index.stop) if index.stop is not None else None
             pos = slice(start, stop, index.step)
         elif isinstance(index, str):
-            pos = self._pos[index]
+            pos = self.positions(index)
         elif isinstance(index, Iterable):
-            pos = np.asarray([self._pos[ix] for ix in index])
+            pos = self.positions(index if isinstance(index, np.ndarray) else list(index))
         else:
-            pos = self._pos[index]
+            pos = self.positions(index)
         return pos
 
     def subset_by_pos(self, pos):
@@ -176,10 +273,31 @@ class DatasetIndex(Baseset):
         """
         return self.index[pos]
 
-    def create_subset(self, index):
-        """ Return a new index object based on the subset of indices given. """
+    def create_subset(self, index, pos=False):
+        """ Return a new index object based on the subset of indices given.
+
+        Parameters
+        ----------
+        index : DatasetIndex or array-like
+            items of the subset.
+        pos : bool
+            whether `index` contains positions of items in this index.
+            Then items are neither checked nor looked up, so a subset is made with a single gather.
+        """
+        if pos:
+            return self._create_subset_by_pos(index)
         return type(self)(index)
 
+    def _create_subset_by_pos(self, positions):
+        """ Return a copy of the index which contains only items at given positions """
+        subset = cp.copy(self)
+        subset._index = self.indices[positions]                  # pylint: disable=protected-access
+        subset._positions = None                                 # pylint: disable=protected-access
+        subset._random_state = None                              # pylint: disable=protected-access
+        subset.train, subset.test, subset.validation = None, None, None
+        subset.reset('iter')
+        return subset
+
     def split(self, shares=0.8, shuffle=False):
         """ Split index into train, test and validation subsets.
 
@@ -578,6 +696,12 @@ class FilesIndex(DatasetIndex):
 
     >>> path = fi.get_fullpath(some_id)
 
+    Directories are scanned in parallel threads and paths are stored compactly (see :class:`~.paths.PathTable`).
+    A large index might be saved and then loaded without scanning directories again:
+
+    >>> fi.save('/path/to/index.npz')
+    >>> fi = FilesIndex.load('/path/to/index.npz')
+
     Split into train / test / validation in 80/15/5 ratio
 
     >>> fi.split([0.8, 0.15])
@@ -611,9 +735,12 @@ class FilesIndex(DatasetIndex):
         DatasetIndex
             Contains one common index.
         """
-        paths = {}
-        for index in index_list:
-            paths.update(index.paths)
+        if all(isinstance(index.paths, PathTable) for index in index_list):
+            paths = PathTable.concat([index.paths for index in index_list])
+        else:
+            paths = {}
+            for index in index_list:
+                paths.update(index.paths)
         return type(index_list[0])(index=np.concatenate([i.index for i in index_list]), paths=paths)
 
     def build_index(self, index=None, path=None, *args, **kwargs):
@@ -623,7 +750,8 @@ class FilesIndex(DatasetIndex):
         else:
             _index = self.build_from_path(path, *args, **kwargs)
 
-        if len(_index) != len(self._paths):
+        if len(_index) != len(self._paths) or (isinstance(self._paths, PathTable) and
+                                                len(np.unique(_index)) != len(_index)):
             raise ValueError("Index contains non-unique elements, which leads to path collision")
         return _index
 
@@ -634,15 +762,32 @@ class FilesIndex(DatasetIndex):
         else:
             index = DatasetIndex(index).indices
 
-        if isinstance(paths, dict):
+        if isinstance(paths, PathTable):
+            self._paths = paths.subset(index)
+            index = self._paths.ids
+        elif isinstance(paths, dict):
             self._paths = dict((file, paths[file]) for file in index)
         else:
             self._paths = dict((file, paths[pos]) for pos, file in np.ndenumerate(index))
         self.dirs = dirs
         return index
 
-    def build_from_path(self, path, dirs=False, no_ext=False, sort=False):
-        """ Build index from a path/glob or a sequence of paths/globs. """
+    def build_from_path(self, path, dirs=False, no_ext=False, sort=False, n_workers=None):
+        """ Build index from a path/glob or a sequence of paths/globs.
+
+        Parameters
+        ----------
+        path : str or sequence of str
+            glob patterns, `**` matches any number of nested directories.
+        dirs : bool
+            whether to index directories instead of files.
+        no_ext : bool
+            whether to drop file extensions from index items.
+        sort : bool
+            whether to sort index items.
+        n_workers : int or None
+            the number of threads to scan directories with.
+        """
         if isinstance(path, str):
             paths = [path]
         else:
@@ -651,38 +796,38 @@ class FilesIndex(DatasetIndex):
         if len(paths) == 0:
             raise ValueError("`path` cannot be empty. Got '{}'.".format(path))
 
-        _all_index = None
-        _all_paths = dict()
-        for one_path in paths:
-            _index, _paths = self.build_from_one_path(one_path, dirs, no_ext)
-            if _all_index is None:
-                _all_index = _index
-            else:
-                _all_index = np.concatenate((_all_index, _index))
-            _all_paths.update(_paths)
+        tables = [self.build_from_one_path(one_path, dirs, no_ext, n_workers=n_workers)[1] for one_path in paths]
+        table = tables[0] if len(tables) == 1 else PathTable.concat(tables)
+        _all_index = table.ids
 
         if sort:
-            _all_index.sort()
-        self._paths = _all_paths
+            order = np.argsort(_all_index, kind='stable')
+            table = table.take(order)
+            _all_index = table.ids
+        self._paths = table
         self.dirs = dirs
 
         return _all_index
 
-    def build_from_one_path(self, path, dirs=False, no_ext=False):
-        """ Build index from a path/glob. """
+    def build_from_one_path(self, path, dirs=False, no_ext=False, n_workers=None):
+        """ Build index from a path/glob.
+
+        Returns
+        -------
+        index : np.ndarray
+            index items.
+        paths : PathTable
+            paths of index items.
+        """
         if not isinstance(path, str):
             raise TypeError('Each path must be a string, instead got {}'.format(path))
 
-        check_fn = os.path.isdir if dirs else os.path.isfile
-        pathlist = glob.iglob(path, recursive=True)
-        _full_index = np.asarray([self.build_key(fname, no_ext) for fname in pathlist if check_fn(fname)])
-        if len(_full_index):
-            _index = _full_index[:, 0]
-            _paths = _full_index[:, 1]
-        else:
+        groups = scan_glob(path, dirs=dirs, n_workers=n_workers)
+        names = [name for _, group_names in groups for name in group_names]
+        if len(names) == 0:
             warnings.warn("No items to index in %s" % path)
-            _index, _paths = np.empty(0), np.empty(0)
-        _paths = dict(zip(_index, _paths))
+        _index = np.array([self.build_key(name, no_ext)[0] for name in names] if no_ext else names, dtype=str)
+        _paths = PathTable.from_groups(groups, ids=_index)
         return _index, _paths
 
     @staticmethod
@@ -698,8 +843,35 @@ class FilesIndex(DatasetIndex):
 
     def get_fullpath(self, key):
         """ Return the full path name for an item in the index. """
+        if isinstance(self._paths, PathTable) and self._paths.ids is self.indices:
+            return self._paths.path_at(self.get_pos(key))
         return self._paths[key]
 
-    def create_subset(self, index):
-        """ Return a new FilesIndex based on the subset of indices given. """
+    def save(self, path):
+        """ Save the index into a `.npz` file so that it can be loaded without scanning directories again. """
+        paths = self._paths
+        if not isinstance(paths, PathTable):
+            paths = PathTable.from_paths(self.indices, [paths[key] for key in self.indices])
+        np.savez(path, index=self.indices, is_dirs=np.array(bool(self.dirs)), **paths.to_arrays())
+
+    @classmethod
+    def load(cls, path):
+        """ Load an index saved with :meth:`.save`. """
+        with np.load(path) as data:
+            paths = PathTable.from_arrays(data)
+            return cls(index=data['index'], paths=paths, dirs=bool(data['is_dirs']))
+
+    def create_subset(self, index, pos=False):
+        """ Return a new FilesIndex based on the subset of indices (or positions if `pos` is True) given. """
+        if pos:
+            return self._create_subset_by_pos(index)
         return type(self).from_index(index=index, paths=self._paths, dirs=self.dirs)
+
+    def _create_subset_by_pos(self, positions):
+        subset = super()._create_subset_by_pos(positions)
+        if isinstance(self._paths, PathTable) and self._paths.ids is self.indices:
+            subset._paths = self._paths.take(positions)          # pylint: disable=protected-access
+            subset._index = subset._paths.ids                    # pylint: disable=protected-access
+        else:
+            subset._paths = {file: self._paths[file] for file in subset.indices}   # pylint: disable=protected-access
+        return subset
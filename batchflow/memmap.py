@@ -0,0 +1,196 @@
+""" Contains memory-mapped data sources """
+import os
+import glob
+
+import numpy as np
+
+
+class MemmapArray:
+    """ An array stored in a file which is read only when items are requested
+
+    Items requested by indices are returned as views if they are stored contiguously (or with a constant step),
+    otherwise they are gathered in the file order and then rearranged as requested.
+
+    Parameters
+    ----------
+    path : str
+        a path to an `.npy` file or to a raw binary file.
+    dtype : str or np.dtype
+        data type for a raw file. If None, `path` should point to an `.npy` file.
+    shape : tuple
+        shape of an array in a raw file.
+    offset : int
+        a position (in bytes) of the array in a raw file.
+    mode : {'r', 'r+', 'c'}
+        a file access mode (see `numpy.memmap`).
+        Views returned in the default 'r' mode are read-only, so a batch should assign new arrays to components
+        instead of changing them in place.
+    index : DatasetIndex or None
+        an index to convert item ids into positions in the array. If None, ids are positions.
+
+    Examples
+    --------
+    ::
+
+        images = MemmapArray('/path/to/images.npy')
+        images[[5, 6, 7]]    # a view into the file
+        images[[7, 2, 5]]    # a copy of 3 items
+    """
+    def __init__(self, path, dtype=None, shape=None, offset=0, mode='r', index=None):
+        self.path = path
+        self.mode = mode
+        self.index = index
+        if dtype is None:
+            self.array = np.load(path, mmap_mode=mode)
+            self._open_kwargs = dict()
+        else:
+            self.array = np.memmap(path, dtype=dtype, mode=mode, shape=shape, offset=offset)
+            self._open_kwargs = dict(dtype=dtype, shape=self.array.shape, offset=offset)
+
+    @property
+    def shape(self):
+        """ tuple : shape of the array """
+        return self.array.shape
+
+    @property
+    def dtype(self):
+        """ np.dtype : data type of the array """
+        return self.array.dtype
+
+    def __len__(self):
+        return len(self.array)
+
+    def __array__(self, dtype=None):
+        return np.asarray(self.array, dtype=dtype)
+
+    def get_pos(self, indices):
+        """ Return positions of given item ids """
+        if self.index is None:
+            return indices
+        return self.index.get_pos(indices)
+
+    def __getitem__(self, indices):
+        if isinstance(indices, slice):
+            return self.array[indices]
+        positions = self.get_pos(indices)
+        if np.isscalar(positions):
+            return self.array[positions]
+
+        positions = np.asarray(positions)
+        if positions.dtype == bool:
+            return self.array[positions]
+        if len(positions) == 0:
+            return self.array[:0]
+
+        positions = positions.astype(np.int64, copy=False)
+        positions = np.where(positions < 0, positions + len(self.array), positions)
+        start = positions[0]
+        step = positions[1] - start if len(positions) > 1 else 1
+        if step > 0 and (np.diff(positions) == step).all():
+            # items with a constant step make a view
+            return self.array[start:positions[-1] + 1:step]
+
+        # reading items in the file order is faster than random access
+        order = np.argsort(positions, kind='stable')
+        items = self.array[positions[order]]
+        result = np.empty_like(items)
+        result[order] = items
+        return result
+
+    def __getstate__(self):
+        # a file is reopened in another process instead of sending the whole array
+        state = self.__dict__.copy()
+        state.pop('array')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        kwargs = state['_open_kwargs']
+        if kwargs:
+            self.array = np.memmap(self.path, mode=self.mode, **kwargs)
+        else:
+            self.array = np.load(self.path, mmap_mode=self.mode)
+
+    def __repr__(self):
+        return '%s(%r, shape=%s, dtype=%s)' % (type(self).__name__, self.path, self.shape, self.dtype)
+
+
+class MemmapSource(dict):
+    """ Dataset components stored in memory-mapped files (one file per component)
+
+    It can be passed as `preloaded` to :class:`~.Dataset` or as `src` to :meth:`~.Batch.load`,
+    so that each batch reads only its own items from disk.
+    Batches of consecutive items (e.g. when a dataset is not shuffled) get views without copying data at all.
+
+    Parameters
+    ----------
+    src : str or dict
+        a directory with `<component>.npy` files or a dict with components as keys and
+        paths to `.npy` files, :class:`.MemmapArray` or dicts of `MemmapArray` arguments (for raw files) as values.
+    components : sequence of str
+        components to load from a directory. If None, all `.npy` files are used.
+    mode : {'r', 'r+', 'c'}
+        a file access mode (see `numpy.memmap`).
+    index : DatasetIndex or None
+        an index to convert item ids into positions in arrays. If None, ids are positions.
+
+    Examples
+    --------
+    ::
+
+        MemmapSource.save('/path/to/data', dict(images=images, labels=labels))
+        source = MemmapSource('/path/to/data')
+        dataset = Dataset(source.n_items, batch_class=ImagesBatch, preloaded=source)
+
+    Raw binary files are also supported::
+
+        source = MemmapSource(dict(images=dict(path='/path/to/images.raw', dtype='uint8', shape=(-1, 28, 28)),
+                                   labels='/path/to/labels.npy'))
+    """
+    def __init__(self, src, components=None, mode='r', index=None):
+        super().__init__()
+        if isinstance(src, str):
+            if components is None:
+                files = sorted(glob.glob(os.path.join(src, '*.npy')))
+                src = {os.path.splitext(os.path.basename(path))[0]: path for path in files}
+            else:
+                src = {comp: os.path.join(src, comp + '.npy') for comp in components}
+        elif components is not None:
+            src = {comp: src[comp] for comp in components}
+
+        for comp, value in src.items():
+            if isinstance(value, MemmapArray):
+                array = value
+            elif isinstance(value, dict):
+                array = MemmapArray(**{'mode': mode, 'index': index, **value})
+            else:
+                array = MemmapArray(value, mode=mode, index=index)
+            self[comp] = array
+
+    @property
+    def components(self):
+        """ tuple : components names """
+        return tuple(self.keys())
+
+    @property
+    def n_items(self):
+        """ int : the number of items """
+        lengths = set(len(array) for array in self.values())
+        if len(lengths) > 1:
+            raise ValueError('Components have different lengths: %s' % lengths)
+        return lengths.pop() if lengths else 0
+
+    @staticmethod
+    def save(path, data):
+        """ Save components into `.npy` files in a given directory
+
+        Parameters
+        ----------
+        path : str
+            a directory to save files to.
+        data : dict
+            components as keys and arrays as values.
+        """
+        os.makedirs(path, exist_ok=True)
+        for comp, array in data.items():
+            np.save(os.path.join(path, comp + '.npy'), np.asarray(array))
@@ -13,30 +13,169 @@ class _DummyBatch:
 
 
 def eval_expr(expr, **kwargs):
-    """ Evaluate a named expression recursively """
+    """ Evaluate a named expression recursively
+
+    Containers without named expressions are returned as is, without rebuilding.
+    Config options and algebraic expressions over them are memoized during a pipeline run
+    (see :func:`is_run_constant`).
+    """
     if isinstance(expr, NamedExpression):
+        cache = _get_run_cache(expr, kwargs)
+        if cache is not None:
+            entry = cache.get(id(expr))
+            if entry is not None and entry[0] is expr:
+                if entry[1] is not _NOT_CACHEABLE:
+                    return entry[1]
+                cache = None
+
         _expr = expr.get(**kwargs)
         if isinstance(expr, W):
-            expr = _expr
+            value = _expr
         elif isinstance(_expr, NamedExpression):
-            expr = eval_expr(_expr, **kwargs)
+            value = eval_expr(_expr, **kwargs)
         else:
-            expr = _expr
-    elif isinstance(expr, (list, tuple)):
-        _expr = []
-        for val in expr:
-            _expr.append(eval_expr(val, **kwargs))
-        expr = type(expr)(_expr)
-    elif isinstance(expr, dict):
+            value = _expr
+
+        if cache is not None:
+            cache[id(expr)] = (expr, value if _is_cacheable(expr, _expr, cache) else _NOT_CACHEABLE)
+        return value
+
+    if isinstance(expr, (list, tuple)):
+        _expr = [eval_expr(val, **kwargs) for val in expr]
+        if all(new is old for new, old in zip(_expr, expr)):
+            return expr
+        return type(expr)(_expr)
+
+    if isinstance(expr, dict):
         _expr = type(expr)()
+        changed = False
         for key, val in expr.items():
-            key = eval_expr(key, **kwargs)
-            val = eval_expr(val, **kwargs)
-            _expr.update({key: val})
-        expr = _expr
+            new_key = eval_expr(key, **kwargs)
+            new_val = eval_expr(val, **kwargs)
+            changed = changed or new_key is not key or new_val is not val
+            _expr.update({new_key: new_val})
+        return _expr if changed else expr
     return expr
 
 
+def has_named_expr(expr):
+    """ Check whether an expression contains named expressions which should be evaluated """
+    if isinstance(expr, NamedExpression):
+        return True
+    if isinstance(expr, (list, tuple)):
+        return any(has_named_expr(val) for val in expr)
+    if isinstance(expr, dict):
+        return any(has_named_expr(key) or has_named_expr(val) for key, val in expr.items())
+    return False
+
+
+def prepare_expr(expr, copy=False):
+    """ Analyze an expression once, so that only its parts which can change are evaluated later
+
+    Parameters
+    ----------
+    expr
+        a named expression or a (nested) container with named expressions.
+    copy : bool
+        whether lists and dicts should be rebuilt on each call even if they are constant,
+        so that a callee which changes them in place does not affect further calls.
+
+    Returns
+    -------
+    callable or None
+        None if an expression contains no named expressions (and no lists or dicts if `copy` is True)
+        and thus does not need evaluation, or a function which takes the same keyword arguments
+        as :func:`eval_expr` and walks only the branches of the expression which contain named expressions.
+    """
+    if isinstance(expr, NamedExpression):
+        return partial(eval_expr, expr)
+
+    if isinstance(expr, (list, tuple)):
+        items = [prepare_expr(val, copy) for val in expr]
+        if all(item is None for item in items) and not (copy and isinstance(expr, list)):
+            return None
+        container = type(expr)
+        items = list(zip(items, expr))
+
+        def _eval_sequence(**kwargs):
+            return container([val if item is None else item(**kwargs) for item, val in items])
+        return _eval_sequence
+
+    if isinstance(expr, dict):
+        items = [(prepare_expr(key), key, prepare_expr(val, copy), val) for key, val in expr.items()]
+        if not copy and all(key_item is None and val_item is None for key_item, _, val_item, _ in items):
+            return None
+        container = type(expr)
+
+        def _eval_dict(**kwargs):
+            _expr = container()
+            for key_item, key, val_item, val in items:
+                key = key if key_item is None else key_item(**kwargs)
+                _expr[key] = val if val_item is None else val_item(**kwargs)
+            return _expr
+        return _eval_dict
+
+    return None
+
+
+# ops which might call arbitrary code, so their results are never memoized
+_IMPURE_OPS = ('#call', '#attr')
+
+_NOT_CACHEABLE = object()
+
+def is_run_constant(expr):
+    """ Check whether an expression value does not change during a pipeline run
+
+    These are config options with constant names and algebraic expressions
+    with constant operands or such config options, except for attribute access and calls.
+
+    Notes
+    -----
+    Config changes made with :meth:`~.Pipeline.set_config` or ``C(...)`` assignment are tracked,
+    while in-place changes of config values during a run are not.
+    """
+    const = expr.__dict__.get('_run_constant')
+    if const is None:
+        if expr.__dict__.get('params') is not None:
+            const = False
+        elif isinstance(expr, AlgebraicNamedExpression):
+            const = expr.op not in _IMPURE_OPS and \
+                    all(is_run_constant(operand) if isinstance(operand, NamedExpression)
+                        else not has_named_expr(operand)
+                        for operand in (expr.a, expr.b, expr.c))
+        elif type(expr) is C:  # pylint: disable=unidiomatic-typecheck
+            const = not isinstance(expr.name, NamedExpression)
+        else:
+            const = False
+        expr.__dict__['_run_constant'] = const
+    return const
+
+def _get_run_cache(expr, kwargs):
+    if not is_run_constant(expr):
+        return None
+    batch = kwargs.get('batch')
+    pipeline = batch.pipeline if batch is not None else kwargs.get('pipeline')
+    cache = vars(pipeline).get('_expr_cache') if hasattr(pipeline, '__dict__') else None
+    return cache if isinstance(cache, dict) else None
+
+def _is_cacheable(expr, raw_value, cache):
+    if isinstance(expr, AlgebraicNamedExpression):
+        for operand in (expr.a, expr.b, expr.c):
+            if isinstance(operand, NamedExpression):
+                entry = cache.get(id(operand))
+                if entry is None or entry[0] is not operand or entry[1] is _NOT_CACHEABLE:
+                    return False
+        return True
+    # a config option might hold a named expression which is evaluated each time
+    return not isinstance(raw_value, NamedExpression)
+
+def clear_run_cache(pipeline):
+    """ Drop values memoized during a pipeline run """
+    cache = vars(pipeline).get('_expr_cache') if hasattr(pipeline, '__dict__') else None
+    if isinstance(cache, dict):
+        cache.clear()
+
+
 def swap(op):
     """ Swap args """
     def _op_(a, b):
@@ -393,6 +532,7 @@ class C(PipelineNamedExpression):
         name, pipeline, _ = self._get(**kwargs)
         config = pipeline.config or {}
         config[name] = value
+        clear_run_cache(pipeline)
 
 
 class V(PipelineNamedExpression):
@@ -0,0 +1,282 @@
+""" Contains a compact storage of file paths and a parallel file system scanner """
+import os
+import re
+import fnmatch
+from collections.abc import Mapping
+
+import numpy as np
+
+from .pools import DEFAULT_POOLS
+
+
+class PathTable(Mapping):
+    """ A compact mapping from item ids to file paths
+
+    Instead of a dict of full path strings it keeps a table of unique directories
+    and a single buffer of file names, so each path takes a few bytes besides its own name.
+    Subsets share the directories table and the names buffer with the original table.
+
+    Parameters
+    ----------
+    ids : np.ndarray
+        item ids.
+    dirs : np.ndarray
+        unique directories.
+    dir_ids : np.ndarray
+        positions of item directories in `dirs`.
+    names : np.ndarray
+        a uint8 buffer with encoded file names.
+    starts : np.ndarray
+        positions of item names in `names`.
+    lengths : np.ndarray
+        lengths of encoded item names.
+
+    Examples
+    --------
+    ::
+
+        table = PathTable.from_paths(['a', 'b'], ['/data/a.png', '/data/b.png'])
+        table['b']           # '/data/b.png'
+        table.paths_at([1])  # ['/data/b.png']
+    """
+    def __init__(self, ids, dirs, dir_ids, names, starts, lengths):
+        self.ids = np.asarray(ids)
+        self.dirs = np.asarray(dirs)
+        self.dir_ids = dir_ids
+        self.names = names
+        self.starts = starts
+        self.lengths = lengths
+        self._positions = None
+
+    @classmethod
+    def from_names(cls, ids, dirs, dir_ids, names):
+        """ Create a table from a list of file names and positions of their directories in `dirs` """
+        encoded = [os.fsencode(name) for name in names]
+        lengths = np.fromiter(map(len, encoded), dtype=np.uint16, count=len(encoded))
+        starts = np.zeros(len(encoded), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=starts[1:])
+        names = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        dirs = np.array(dirs, dtype=str)
+        return cls(ids, dirs, np.asarray(dir_ids, dtype=_int_type(len(dirs))), names, starts, lengths)
+
+    @classmethod
+    def from_groups(cls, groups, ids=None):
+        """ Create a table from a sequence of (directory, names) pairs
+
+        If `ids` is None, file names are used as ids.
+        """
+        groups = [(dirname, names) for dirname, names in groups if len(names) > 0]
+        dir_ids = np.repeat(np.arange(len(groups)), [len(names) for _, names in groups])
+        names = [name for _, names in groups for name in names]
+        ids = np.array(names, dtype=str) if ids is None else ids
+        return cls.from_names(ids, [dirname for dirname, _ in groups], dir_ids, names)
+
+    @classmethod
+    def from_paths(cls, ids, paths):
+        """ Create a table from full paths """
+        dirnames, names = zip(*(os.path.split(path) for path in paths)) if len(paths) > 0 else ((), ())
+        dirs, dir_ids = np.unique(np.array(dirnames, dtype=str), return_inverse=True)
+        return cls.from_names(ids, dirs, dir_ids, names)
+
+    @classmethod
+    def concat(cls, tables):
+        """ Concatenate tables """
+        dirs, dir_ids, names, starts = [], [], [], []
+        n_dirs, n_bytes = 0, 0
+        for table in tables:
+            dirs.append(table.dirs)
+            dir_ids.append(table.dir_ids.astype(np.int64) + n_dirs)
+            names.append(table.names)
+            starts.append(table.starts + n_bytes)
+            n_dirs += len(table.dirs)
+            n_bytes += len(table.names)
+        dirs = np.concatenate(dirs)
+        return cls(np.concatenate([table.ids for table in tables]), dirs,
+                   np.concatenate(dir_ids).astype(_int_type(len(dirs))), np.concatenate(names),
+                   np.concatenate(starts), np.concatenate([table.lengths for table in tables]))
+
+    def take(self, positions):
+        """ Return a table with items at given positions """
+        return type(self)(self.ids[positions], self.dirs, self.dir_ids[positions], self.names,
+                          self.starts[positions], self.lengths[positions])
+
+    def subset(self, ids):
+        """ Return a table with given items """
+        ids = np.asarray(ids)
+        if ids.dtype.kind == self.ids.dtype.kind and ids.shape == self.ids.shape and (ids == self.ids).all():
+            return self
+        return self.take(np.atleast_1d(self.get_pos(ids)))
+
+    def get_pos(self, ids):
+        """ Return positions of given items """
+        if self._positions is None:
+            # pylint: disable=import-outside-toplevel, cyclic-import
+            from .dsindex import build_positions
+            self._positions = build_positions(self.ids)
+        return self._positions(ids)
+
+    def path_at(self, pos):
+        """ Return a path of an item at a given position """
+        start = self.starts[pos]
+        name = os.fsdecode(self.names[start:start + self.lengths[pos]].tobytes())
+        return os.path.join(self.dirs[self.dir_ids[pos]], name)
+
+    def paths_at(self, positions):
+        """ Return a list of paths of items at given positions """
+        return [self.path_at(pos) for pos in positions]
+
+    def __getitem__(self, key):
+        pos = self.get_pos(key)
+        if not np.isscalar(pos) and np.ndim(pos) > 0:
+            raise KeyError(key)
+        return self.path_at(pos)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def compact(self):
+        """ Return a table which keeps only names and directories of its own items """
+        lengths = self.lengths.astype(np.int64)
+        starts = np.zeros(len(lengths), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=starts[1:])
+        names = self.names[np.repeat(self.starts - starts, lengths) + np.arange(lengths.sum())]
+        used_dirs, dir_ids = np.unique(self.dir_ids, return_inverse=True)
+        return type(self)(self.ids, self.dirs[used_dirs], dir_ids.astype(self.dir_ids.dtype), names,
+                          starts, self.lengths)
+
+    def _is_sparse(self):
+        return 2 * int(self.lengths.sum()) < len(self.names) or 2 * len(self) < len(self.dirs)
+
+    def to_arrays(self):
+        """ Return a dict of arrays the table is made of (e.g. to save them with `np.savez`) """
+        if int(self.lengths.sum()) != len(self.names):
+            return self.compact().to_arrays()
+        return dict(ids=self.ids, dirs=self.dirs, dir_ids=self.dir_ids, names=self.names,
+                    starts=self.starts, lengths=self.lengths)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        """ Create a table from arrays returned by :meth:`.to_arrays` """
+        return cls(*(arrays[name] for name in ('ids', 'dirs', 'dir_ids', 'names', 'starts', 'lengths')))
+
+    def __getstate__(self):
+        # a subset shares the buffers of a large table, which should not be sent to other processes
+        state = (self.compact() if self._is_sparse() else self).__dict__.copy()
+        state['_positions'] = None
+        return state
+
+    def __repr__(self):
+        return '%s(%d paths in %d dirs)' % (type(self).__name__, len(self), len(self.dirs))
+
+
+def _int_type(size):
+    return np.int32 if size < 2 ** 31 else np.int64
+
+
+_MAGIC = re.compile('[*?[]')
+
+def has_magic(pattern):
+    """ Check whether a path contains glob wildcards """
+    return _MAGIC.search(pattern) is not None
+
+
+def _scan(path, pattern=None, kind=None):
+    """ Return names of entries in a directory which match a pattern
+
+    Parameters
+    ----------
+    pattern : str or None
+        a glob pattern. Hidden entries are matched only if the pattern starts with a dot.
+    kind : {'file', 'dir'} or None
+        a type of entries. If None, entries of any type are returned.
+    """
+    try:
+        with os.scandir(path or os.curdir) as entries:
+            entries = list(entries)
+    except OSError:
+        return []
+    if pattern is None or not pattern.startswith('.'):
+        entries = [entry for entry in entries if not entry.name.startswith('.')]
+    if pattern is not None and pattern != '*':
+        matched = set(fnmatch.filter([entry.name for entry in entries], pattern))
+        entries = [entry for entry in entries if entry.name in matched]
+    if kind == 'dir':
+        entries = [entry for entry in entries if entry.is_dir()]
+    elif kind == 'file':
+        entries = [entry for entry in entries if entry.is_file()]
+    return [entry.name for entry in entries]
+
+
+def _map(func, items, n_workers=None):
+    """ Apply a function to items in a thread pool """
+    if len(items) < 2 or DEFAULT_POOLS.in_pool():
+        return [func(item) for item in items]
+    return list(DEFAULT_POOLS.get('threads', n_workers).map(func, items))
+
+
+def _walk_dirs(roots, n_workers=None):
+    """ Return given directories with all their non-hidden subdirectories """
+    result = list(roots)
+    level = list(roots)
+    while level:
+        children = _map(lambda path: [os.path.join(path, name) for name in _scan(path, kind='dir')],
+                        level, n_workers)
+        level = [path for paths in children for path in paths]
+        result.extend(level)
+    return result
+
+
+def scan_glob(pattern, dirs=False, n_workers=None):
+    """ Find files or directories which match a glob pattern (as `glob.glob(pattern, recursive=True)` does)
+
+    Directories are listed with `os.scandir` in parallel threads, so entries types are mostly known
+    without extra system calls.
+
+    Parameters
+    ----------
+    pattern : str
+        a glob pattern, `**` matches any number of nested directories.
+    dirs : bool
+        whether to find directories instead of files.
+    n_workers : int or None
+        the number of threads.
+
+    Returns
+    -------
+    list of tuples
+        pairs of a directory and a list of matching names in it.
+    """
+    kind = 'dir' if dirs else 'file'
+    check = os.path.isdir if dirs else os.path.isfile
+    if not has_magic(pattern):
+        dirname, name = os.path.split(pattern)
+        return [(dirname, [name])] if pattern and check(pattern) else []
+
+    parts = pattern.split(os.sep)
+    first = next(i for i, part in enumerate(parts) if has_magic(part))
+    base = os.sep.join(parts[:first])
+    if not base and pattern.startswith(os.sep):
+        base = os.sep
+
+    current = [base]
+    for part in parts[first:-1]:
+        if part == '**':
+            current = _walk_dirs(current, n_workers)
+        elif has_magic(part):
+            found = _map(lambda path, part=part: [os.path.join(path, name) for name in _scan(path, part, 'dir')],
+                         current, n_workers)
+            current = [path for paths in found for path in paths]
+        else:
+            current = [os.path.join(path, part) for path in current if os.path.isdir(os.path.join(path, part))]
+
+    last = parts[-1]
+    if last == '**':
+        current = _walk_dirs(current, n_workers)
+        last = None
+    elif not has_magic(last):
+        return [(path, [last]) for path in current if check(os.path.join(path, last))]
+    names = _map(lambda path: _scan(path, last, kind), current, n_workers)
+    return list(zip(current, names))
@@ -1,26 +1,30 @@
 """ Contains pipeline class """
 import sys
 import time
+import inspect
+import copy as cp
 from functools import partial
-import traceback
+from contextlib import ExitStack
 import threading
 import concurrent.futures as cf
 import asyncio
 import logging
 import warnings
-from cProfile import Profile
-from pstats import Stats
 import queue as q
 import numpy as np
-import pandas as pd
 
 from .base import Baseset
 from .config import Config
 from .batch import Batch
 from .decorators import deprecated
 from .exceptions import SkipBatchException, EmptyBatchSequence
-from .named_expr import NamedExpression, V, eval_expr
+from .named_expr import NamedExpression, V, eval_expr, prepare_expr, clear_run_cache
 from .once_pipeline import OncePipeline
+from .prefetch import ProcessBatchExecutor, PrefetchStats
+from .pools import PoolRegistry, get_pools
+from .rebatcher import Rebatcher
+from .cache import BatchCache
+from .profiler import PipelineProfiler, BATCH_NAME, WAIT_NAME
 from .model_dir import ModelDirectory
 from .variables import VariableDirectory
 from .models.metrics import (ClassificationMetrics, SegmentationMetricsByPixels,
@@ -62,6 +66,7 @@ class Pipeline:
             self.config = config or {}
             self._actions = actions or []
             self._lazy_run = None
+            self.pools = PoolRegistry()
             self.models = ModelDirectory()
             self.variables = VariableDirectory()
             self.before = OncePipeline(self)
@@ -81,6 +86,7 @@ class Pipeline:
                     if self.get_last_action_proba() is None:
                         self._actions[-1]['repeat'] = mult_option(repeat, self.get_last_action_repeat())
             self._lazy_run = pipeline._lazy_run
+            self.pools = PoolRegistry(n_workers=pipeline.pools.n_workers)
             self.variables = pipeline.variables.copy()
             self.models = pipeline.models.copy()
             self._namespaces = pipeline._namespaces
@@ -91,22 +97,23 @@ class Pipeline:
 
         self._dataset = None
         self.config = Config(self.config)
-        self._stop_flag = False
+        self._stop_event = None
         self._executor = None
         self._service_executor = None
         self._prefetch_count = None
-        self._prefetch_queue = None
         self._batch_queue = None
+        self.prefetch_stats = None
         self._batch_generator = None
         self._rest_batch = None
         self._iter_params = None
         self._not_init_vars = True
+        self._plan = None
+        self._expr_cache = {}
+        self._caches = {}
 
-        self._profile = None
+        self._profile = False
         self._profiler = None
-        self.profile_info = None
         self.elapsed_time = 0.0
-        self._profile_info_lock = threading.Lock()
 
     def __enter__(self):
         """ Create a context and return an empty pipeline non-bound to any dataset """
@@ -166,7 +173,7 @@ class Pipeline:
             other = other.pipeline
         if not isinstance(other, Pipeline):
             raise TypeError("Both operands should be Pipelines")
-        if len(other._actions) > 0 and other._actions[0]['name'] == REBATCH_ID:
+        if len(other._actions) > 0 and other._actions[0]['name'] in [REBATCH_ID, ECHO_ID]:
             new_p = self.from_pipeline(other)
             new_p._actions[0]['pipeline'] = self + new_p._actions[0]['pipeline']
             return new_p
@@ -307,6 +314,7 @@ class Pipeline:
         if clear:
             self.config = {}
         self.config.update(config)
+        clear_run_cache(self)
         return self
 
     def update_config(self, config):
@@ -653,57 +661,101 @@ class Pipeline:
             raise AttributeError("Method '%s' has not been found in the %s class" % (name, type(batch).__name__))
         return action_method, action_spec
 
-    def _exec_one_action(self, batch, action, args, kwargs):
+    def _call_action_method(self, batch, name, args, kwargs, methods=None):
+        """ Call an action method, which is looked up once per batch class if `methods` cache is given """
+        method = methods.get(type(batch)) if methods is not None else None
+        if method is not None:
+            return method(batch, *args, **kwargs)
+
+        action_method, _ = self._get_action_method(batch, name)
+        if methods is not None:
+            method = getattr(type(batch), name, None)
+            if inspect.isfunction(method) and hasattr(method, 'action') and name not in vars(batch):
+                methods[type(batch)] = method
+        return action_method(*args, **kwargs)
+
+    def _exec_one_action(self, batch, action, args, kwargs, methods=None):
         if self._needs_exec(batch, action):
             repeat = self._eval_expr(action['repeat'], batch=batch) or 1
             for _ in range(repeat):
                 batch.pipeline = self
-                action_method, _ = self._get_action_method(batch, action['name'])
-                batch = action_method(*args, **kwargs)
+                batch = self._call_action_method(batch, action['name'], args, kwargs, methods)
                 batch.pipeline = self
         return batch
 
-    def _exec_nested_pipeline(self, batch, action):
+    def _exec_nested_pipeline(self, batch, action, plan=None):
         if self._needs_exec(batch, action):
             repeat = self._eval_expr(action['repeat'], batch=batch) or 1
+            if plan is None:
+                plan = self._compile_actions(action['pipeline']._actions)  # pylint: disable=protected-access
             for _ in range(repeat):
-                batch = self._exec_all_actions(batch, action['pipeline']._actions)  # pylint: disable=protected-access
+                batch = self._exec_plan(batch, plan)
         return batch
 
-    def _add_profile_info(self, batch, action, exec_time, **kwargs):
-        name = self.get_action_name(action, add_index=True)
-        iter_no = self._iter_params['_n_iters']
+    def _exec_cache(self, batch, action, plan):
+        cache = self._caches.get(id(action))
+        if cache is None:
+            cache = self._caches.setdefault(id(action), BatchCache(**action['cache_args']))
 
-        start_time = time.time()
-        stats = Stats(self._profiler)
-        self._profiler.clear()
-
-        indices, values = [], []
-        for key, value in stats.stats.items():
-            for k, v in value[4].items():
-                # action name, method_name, file_name, line_no, callee
-                indices.append((name, '{}::{}::{}::{}'.format(key[2], *k)))
-                row_dict = {
-                    'iter': iter_no, 'total_time': exec_time, 'pipeline_time': stats.total_tt, # base stats
-                    'ncalls': v[0], 'tottime': v[2], 'cumtime': v[3], # detailed stats
-                    'batch_id': id(batch), **kwargs
-                }
-                values.append(row_dict)
-
-
-        multiindex = pd.MultiIndex.from_tuples(indices, names=['action', 'id'])
-        df = pd.DataFrame(values, index=multiindex,
-                          columns=['iter', 'total_time', 'pipeline_time',
-                                   'ncalls', 'tottime', 'cumtime',
-                                   'batch_id', *list(kwargs.keys())])
-        df['total_time'] += time.time() - start_time
-
-        if self.profile_info is None:
-            with self._profile_info_lock:
-                self.profile_info = df
+        if cache.batch_class is not None:
+            cached, cached_data = cache.get(batch.indices, get_pools(batch))
+        else:
+            # a class of batches stored on disk might be unknown, so the prefix is executed to find it out
+            cached, cached_data = np.zeros(len(batch), dtype=bool), None
+        if cached.all():
+            return self._make_cached_batch(batch, cache, cached_data)
+
+        if cached.any():
+            missing = batch.indices[~cached]
+            sub_index = batch.index.create_batch(np.where(~cached)[0], pos=True)
+            sub_batch = type(batch)(sub_index, dataset=batch.dataset, pipeline=self,
+                                    preloaded=batch._preloaded, copy=batch._copy,   # pylint: disable=protected-access
+                                    **batch.get_attrs())
         else:
-            with self._profile_info_lock:
-                self.profile_info = self.profile_info.append(df)
+            missing, sub_batch = batch.indices, batch
+        new_batch = self._exec_plan(sub_batch, plan)
+        if len(new_batch) != len(missing) or (new_batch.indices != missing).any():
+            raise ValueError("Actions before cache should not change batch items")
+
+        if cache.components is None:
+            cache.components = new_batch.components or (None,)
+        cache.batch_class = type(new_batch)
+        data = [new_batch.get(component=comp) for comp in cache.components]
+        if any(value is None for value in data):
+            raise ValueError("Cannot cache empty components")
+        cache.put(missing, data)
+        if not cached.any():
+            return new_batch
+
+        result = []
+        for value, cached_value in zip(data, cached_data):
+            if object in (value.dtype, cached_value.dtype):
+                full = np.empty(len(batch), dtype=object)
+            else:
+                full = np.empty((len(batch), *value.shape[1:]), dtype=np.result_type(value, cached_value))
+            full[~cached] = value
+            full[cached] = cached_value
+            result.append(full)
+        return self._make_cached_batch(batch, cache, result)
+
+    def _make_cached_batch(self, batch, cache, data):
+        new_batch = cache.batch_class(batch.index, dataset=batch.dataset, pipeline=self, **batch.get_attrs())
+        if cache.components == (None,):
+            new_batch._data = data[0]                       # pylint: disable=protected-access
+        else:
+            new_batch.components = tuple(cache.components)
+            new_batch._data = tuple(data)                   # pylint: disable=protected-access
+        return new_batch
+
+    @property
+    def profile_info(self):
+        """ pandas.DataFrame or None : action timings collected in a run with `profile` enabled
+
+        For a run with ``profile='detailed'`` it contains cProfile stats for each action.
+        """
+        if self._profiler is None:
+            return None
+        return self._profiler.to_dataframe(detailed=self._profiler.detailed)
 
     def show_profile_info(self, per_iter=False, detailed=False,
                           groupby=None, columns=None, sortby=None, limit=10):
@@ -715,6 +767,7 @@ class Pipeline:
             Whether to make an aggregation over iters or not.
         detailed : bool
             Whether to use information from :class:`cProfiler` or not.
+            It is available only after a run with ``profile='detailed'``.
         groupby : str or sequence of str
             Used only when `per_iter` is True, directly passed to pandas.
         columns : sequence of str
@@ -727,94 +780,174 @@ class Pipeline:
         parse : bool
             Allows to re-create underlying dataframe from scratches.
         """
+        if self._profiler is None:
+            raise ValueError("No profiling info. Run a pipeline with `profile=True` first.")
+        profile_info = self._profiler.to_dataframe(detailed=detailed)
+
         if per_iter is False and detailed is False:
-            columns = columns or ['total_time', 'pipeline_time']
+            columns = columns or ['total_time', 'cpu_time']
             sortby = sortby or ('total_time', 'sum')
             aggs = {key: ['sum', 'mean', 'max'] for key in columns}
-            result = (self.profile_info.groupby(['action', 'iter'])[columns].mean().groupby('action').agg(aggs)
-                      .sort_values(sortby, ascending=False))
+            grouped = profile_info.groupby('action')
+            result = grouped[columns].agg(aggs)
+            result[('items_per_sec', 'mean')] = grouped['n_items'].sum() / grouped['total_time'].sum()
+            result = result.sort_values(sortby, ascending=False)
 
         elif per_iter is False and detailed is True:
             columns = columns or ['ncalls', 'tottime', 'cumtime']
             sortby = sortby or ('tottime', 'sum')
             aggs = {key: ['sum', 'mean', 'max'] for key in columns}
-            result = (self.profile_info.reset_index().groupby(['action', 'id']).agg(aggs)
+            result = (profile_info.reset_index().groupby(['action', 'id']).agg(aggs)
                       .sort_values(['action', sortby], ascending=[True, False])
-                      .groupby(level=0).apply(lambda df: df[:limit]).droplevel(0))
+                      .groupby(level=0).head(limit))
 
         elif per_iter is True and detailed is False:
             groupby = groupby or ['iter', 'action']
-            columns = columns or ['action', 'total_time', 'pipeline_time', 'batch_id']
+            columns = columns or ['total_time', 'cpu_time', 'items_per_sec']
             sortby = sortby or 'total_time'
-            result = (self.profile_info.reset_index().groupby(groupby)[columns].mean()
+            result = (profile_info.reset_index().groupby(groupby)[columns].mean()
                       .sort_values(['iter', sortby], ascending=[True, False]))
 
         elif per_iter is True and detailed is True:
             groupby = groupby or ['iter', 'action', 'id']
             columns = columns or ['ncalls', 'tottime', 'cumtime']
             sortby = sortby or 'tottime'
-            result = (self.profile_info.reset_index().set_index(groupby)[columns]
+            result = (profile_info.reset_index().set_index(groupby)[columns]
                       .sort_values(['iter', 'action', sortby], ascending=[True, True, False])
-                      .groupby(level=[0, 1]).apply(lambda df: df[:limit]).droplevel([0, 1]))
+                      .groupby(level=[0, 1]).head(limit))
         return result
 
+    def save_trace(self, path):
+        """ Save a timeline of the last profiled run in the Chrome trace event format
+
+        The file can be opened in `Perfetto UI <https://ui.perfetto.dev>`_ or `chrome://tracing`.
+        After a run with ``profile=True`` it contains only actions and waiting in a prefetch queue,
+        while ``profile='trace'`` adds generation of batches, items of parallel actions and model calls.
+
+        Parameters
+        ----------
+        path : str
+            a path to a JSON file.
+        """
+        if self._profiler is None:
+            raise ValueError("No profiling info. Run a pipeline with `profile='trace'` first.")
+        self._profiler.save_trace(path)
+
+
+    def _compile_actions(self, actions):
+        """ Prepare actions for execution
+
+        Dispatch is resolved once: service methods are bound, nested pipelines are compiled,
+        and arguments are analyzed so that only the parts which contain named expressions are evaluated
+        for each batch, while other lists and dicts are just copied and other constants are passed as is.
+
+        Returns
+        -------
+        list of dicts
+        """
+        plan = []
+        for action in actions:
+            name = action['name']
+            step = dict(action=action, kind='action', method=None, plan=None, methods={})
+
+            if action.get('#dont_run', False) or name in [REBATCH_ID, ECHO_ID]:
+                step['kind'] = 'skip'
+            elif name in [JOIN_ID, MERGE_ID]:
+                step['kind'] = 'join'
+            elif name == PIPELINE_ID:
+                step['kind'] = 'pipeline'
+                step['plan'] = self._compile_actions(action['pipeline']._actions) # pylint: disable=protected-access
+            elif name == CACHE_ID:
+                # actions before the cache are executed only for items which are not cached yet
+                step['kind'] = 'cache'
+                step['plan'], plan = plan, []
+            elif name in ACTIONS:
+                step['kind'] = 'service'
+                step['method'] = getattr(self, ACTIONS[name])
+
+            step['args'] = action.get('args', ())
+            step['kwargs'] = action.get('kwargs', {})
+            # constant lists and dicts are rebuilt for each batch, as actions might change their arguments
+            step['args_fn'] = prepare_expr(step['args'], copy=True)
+            step['kwargs_fn'] = prepare_expr(step['kwargs'], copy=True)
+            plan.append(step)
+        return plan
+
+    def _get_plan(self):
+        if self._plan is None:
+            self._plan = self._compile_actions(self._actions)
+        return self._plan
+
+    def _eval_step_args(self, batch, step):
+        """ Evaluate dynamic arguments of an action """
+        args, kwargs = step['args'], step['kwargs']
+        if step['args_fn'] is not None:
+            args = step['args_fn'](batch=batch, pipeline=self)
+        if step['kwargs_fn'] is not None:
+            kwargs = step['kwargs_fn'](batch=batch, pipeline=self)
+        return args, kwargs
 
     def _exec_all_actions(self, batch, actions=None):
+        plan = self._get_plan() if actions is None else self._compile_actions(actions)
+        return self._exec_plan(batch, plan)
+
+    def _exec_plan(self, batch, plan):
         join_batches = None
-        actions = actions or self._actions
 
-        for action in actions:
-            _action = action.copy()
-            if 'args' in action:
-                _action['args'] = self._eval_expr(action['args'], batch=batch)
-            if 'kwargs' in action:
-                _action['kwargs'] = self._eval_expr(action['kwargs'], batch=batch)
+        for step in plan:
+            action = step['action']
+            kind = step['kind']
 
-            if self._profile:
-                start_time = time.time()
-                self._profiler.enable()
+            profiler = self._profiler if self._profile else None
+            if profiler is not None:
+                if 'profile_name' not in step:
+                    step['profile_name'] = self._get_profile_name(action)
+                n_items = len(batch)
+                token = profiler.start()
 
-            if _action.get('#dont_run', False):
+            if kind == 'skip':
                 pass
-            elif _action['name'] in [JOIN_ID, MERGE_ID]:
+            elif kind == 'action':
+                args, kwargs = self._eval_step_args(batch, step)
+                if join_batches is not None:
+                    args = tuple([tuple(join_batches), *args])
+                    join_batches = None
+                batch = self._exec_one_action(batch, action, args, kwargs, step['methods'])
+            elif kind == 'service':
+                args, kwargs = self._eval_step_args(batch, step)
+                step['method'](batch, {**action, 'args': args, 'kwargs': kwargs})
+            elif kind == 'pipeline':
+                batch = self._exec_nested_pipeline(batch, action, step['plan'])
+            elif kind == 'cache':
+                batch = self._exec_cache(batch, action, step['plan'])
+            elif kind == 'join':
                 join_batches = []
-                for pipe in _action['pipelines']:   # pylint: disable=not-an-iterable
-                    if _action['mode'] == 'i':
+                for pipe in action['pipelines']:
+                    if action['mode'] == 'i':
                         jbatch = pipe.create_batch(batch.index)
-                    elif _action['mode'] == 'n':
+                    elif action['mode'] == 'n':
                         jbatch = pipe.next_batch()
                     join_batches.append(jbatch)
 
-                if _action['name'] == MERGE_ID:
-                    if _action['fn'] is None:
-                        batch, _ = batch.merge([batch] + join_batches, components=_action['components'])
+                if action['name'] == MERGE_ID:
+                    if action['fn'] is None:
+                        batch, _ = batch.merge([batch] + join_batches, components=action['components'])
                     else:
-                        batch, _ = _action['fn']([batch] + join_batches)
-                    join_batches = None
-            elif _action['name'] == REBATCH_ID:
-                pass
-            elif _action['name'] == PIPELINE_ID:
-                batch = self._exec_nested_pipeline(batch, _action)
-            elif _action['name'] in ACTIONS:
-                action_fn = getattr(self, ACTIONS[_action['name']])
-                action_fn(batch, _action)
-            else:
-                if join_batches is None:
-                    _action_args = _action['args']
-                else:
-                    _action_args = tuple([tuple(join_batches), *_action['args']])
+                        batch, _ = action['fn']([batch] + join_batches)
                     join_batches = None
 
-                batch = self._exec_one_action(batch, _action, _action_args, _action['kwargs'])
-
-            if self._profile:
-                self._profiler.disable()
-                exec_time = time.time() - start_time
-                self._add_profile_info(batch, action, start_time=start_time, exec_time=exec_time)
-
+            if profiler is not None:
+                profiler.stop(token, step['profile_name'], self._iter_params['_n_iters'], id(batch), n_items)
 
         return batch
 
+    def _get_profile_name(self, action):
+        try:
+            return self.get_action_name(action, add_index=True)
+        except ValueError:
+            # an action of a nested pipeline
+            return self.get_action_name(action)
+
     def _needs_exec(self, batch, action):
         if action['proba'] is None:
             return True
@@ -835,13 +968,35 @@ class Pipeline:
         -------
         a batch - an output from the last action in the pipeline
         """
+        tracer = self._get_tracer()
+        if self._profile:
+            self._profiler.started(batch, self._iter_params['_n_iters'])
         if new_loop:
-            asyncio.set_event_loop(asyncio.new_event_loop())
+            # a prefetch thread reuses its loop instead of leaving a new unclosed loop for each batch
+            try:
+                loop = asyncio.get_event_loop()
+            except RuntimeError:
+                loop = None
+            if loop is None or loop.is_closed() or loop.is_running():
+                asyncio.set_event_loop(asyncio.new_event_loop())
         batch.pipeline = self
-        batch_res = self._exec_all_actions(batch)
+        with tracer.activate(self._iter_params['_n_iters']) if tracer is not None else ExitStack():
+            batch_res = self._exec_all_actions(batch)
         batch_res.pipeline = self
         return batch_res
 
+    def _get_tracer(self):
+        """ Return a profiler if the pipeline is run with ``profile='trace'`` """
+        return self._profiler if self._profile and self._profiler.trace else None
+
+    def _trace_span(self, name, category, batch=None):
+        """ Return a context manager which records a span if the pipeline is traced """
+        tracer = self._get_tracer()
+        if tracer is None:
+            return ExitStack()
+        return tracer.span(name, category, self._iter_params['_n_iters'],
+                           -1 if batch is None else id(batch), 0 if batch is None else len(batch))
+
     def _eval_expr(self, expr, batch=None):
         return eval_expr(expr, batch=batch, pipeline=self)
 
@@ -1043,13 +1198,15 @@ class Pipeline:
     def _exec_train_model(self, batch, action):
         model = self.get_model_by_name(action['model_name'], batch=batch)
         args, kwargs = self._make_model_args(batch, action, model)
-        output = model.train(*args, **kwargs)
+        with self._trace_span('train: ' + str(action['model_name']), 'model', batch):
+            output = model.train(*args, **kwargs)
         self._save_output(batch, model, output, action['save_to'])
 
     def _exec_predict_model(self, batch, action):
         model = self.get_model_by_name(action['model_name'], batch=batch)
         args, kwargs = self._make_model_args(batch, action, model)
-        predictions = model.predict(*args, **kwargs)
+        with self._trace_span('predict: ' + str(action['model_name']), 'model', batch):
+            predictions = model.predict(*args, **kwargs)
         self._save_output(batch, model, predictions, action['save_to'])
 
     def load_model(self, mode, model_class=None, name=None, *args, **kwargs):
@@ -1227,55 +1384,221 @@ class Pipeline:
         return self._add_action(MERGE_ID, _args=dict(pipelines=pipelines, mode='n', fn=fn,
                                                      components=components, batch_class=batch_class))
 
-    def rebatch(self, batch_size, fn=None, components=None, batch_class=None):
-        """ Set the output batch size """
+    def cache(self, components=None, size=None, path=None):
+        """ Cache components of batch items produced by preceding actions
+
+        Items are cached by their ids, so in later epochs preceding actions are executed only for items
+        which have not been cached yet (or have been evicted), while the rest of a batch is taken from the cache.
+        Actions after the cache are executed for all items as usual.
+
+        Note that preceding actions should be deterministic and keep batch items, and only components are cached
+        (custom batch attributes set by preceding actions are not).
+
+        Parameters
+        ----------
+        components : str, sequence of str or None
+            components to cache (other components are not available in batches after the cache).
+            If None, all components are cached.
+        size : int or None
+            the maximum number of items cached in memory (least recently used items are evicted).
+            If None, the number of items is not limited.
+        path : str or None
+            a directory to cache items in on disk (see :class:`~.ChunkedStore`) instead of memory.
+            Items stored there by previous runs (or by other pipelines with the same dataset) are also used.
+
+        Examples
+        --------
+        Load and resize images once and augment them anew in each epoch::
+
+            (dataset.p
+                .load(src=images_path, fmt='image')
+                .resize(shape=(128, 128))
+                .cache()
+                .random_rotate(angle=(-30, 30))
+                .train_model('model', images=B('images'))
+                .run(BATCH_SIZE, n_epochs=10, shuffle=True))
+        """
+        return self._add_action(CACHE_ID, _args=dict(cache_args=dict(components=components, size=size, path=path)))
+
+    def rebatch(self, batch_size, fn=None, components=None, batch_class=None, prefetch=None, target=None):
+        """ Set the output batch size
+
+        Parameters
+        ----------
+        batch_size : int
+            the number of items in output batches.
+        fn : callable or None
+            a function to merge batches (see :meth:`~.Batch.merge`).
+        components : str, tuple or None
+            components of output batches.
+        batch_class : type or None
+            a class of output batches.
+        prefetch : int or None
+            the number of batches the source pipeline (before rebatch) processes in parallel.
+            Then `prefetch` given to `run` or `gen_batch` applies to actions after rebatch.
+            If None, the source pipeline uses `prefetch` and `target` given to `run` or `gen_batch`,
+            while actions after rebatch are executed sequentially.
+        target : {'threads', 'mpc'} or None
+            how the source pipeline prefetches batches. If None, threads are used.
+
+        Examples
+        --------
+        Load and augment small items in 8 processes and train on large batches in a separate thread::
+
+            (pipeline
+                .load(...)
+                .augment(...)
+                .rebatch(256, prefetch=8, target='mpc')
+                .train_model(...)
+                .run(BATCH_SIZE, prefetch=1, n_epochs=1))
+        """
         # pylint:disable=protected-access
         new_p = type(self)(self.dataset)
         return new_p._add_action(REBATCH_ID, _args=dict(batch_size=batch_size, pipeline=self, fn=fn,
-                                                        components=components, batch_class=batch_class))
+                                                        components=components, batch_class=batch_class,
+                                                        prefetch=prefetch, target=target))
+
+    def echo(self, n_echoes, prefetch=None, target=None):
+        """ Pass each batch to the following actions several times
+
+        Actions before `echo` (e.g. loading and decoding) are executed once per batch,
+        while actions after it (e.g. augmentation and training) are executed `n_echoes` times
+        for copies of the batch, so the pipeline yields `n_echoes` batches for each loaded batch.
+
+        Parameters
+        ----------
+        n_echoes : int
+            how many times each batch is passed to the following actions.
+        prefetch : int or None
+            the number of batches the source pipeline (before echo) processes in parallel.
+            Then `prefetch` given to `run` or `gen_batch` applies to actions after echo.
+            If None, the source pipeline uses `prefetch` and `target` given to `run` or `gen_batch`,
+            while actions after echo are executed sequentially.
+        target : {'threads', 'mpc'} or None
+            how the source pipeline prefetches batches. If None, threads are used.
+
+        Notes
+        -----
+        Each echo gets its own copy of batch components, while other batch attributes are shared.
+        `n_iters` and `n_epochs` given to `run` or `gen_batch` refer to the source batches.
+
+        Examples
+        --------
+        Load each batch once and train on 4 differently augmented versions of it::
+
+            (pipeline
+                .load(...)
+                .echo(4, prefetch=4)
+                .random_rotate(angle=(-30, 30))
+                .train_model(...)
+                .run(BATCH_SIZE, n_epochs=1, prefetch=1))
+        """
+        if not isinstance(n_echoes, int) or n_echoes < 1:
+            raise ValueError("n_echoes should be a positive int, but given %s" % n_echoes)
+        # pylint:disable=protected-access
+        new_p = type(self)(self.dataset)
+        return new_p._add_action(ECHO_ID, _args=dict(n_echoes=n_echoes, pipeline=self,
+                                                     prefetch=prefetch, target=target))
 
-    def _put_batches_into_queue(self, gen_batch, bar, bar_desc):
-        while not self._stop_flag:
-            self._prefetch_count.put(1, block=True)
+    def _submit_batch(self, batch):
+        if isinstance(self._executor, ProcessBatchExecutor):
+            return self._executor.submit_batch(batch, self._iter_params)
+        return self._executor.submit(self.execute_for, batch, new_loop=True)
+
+    def _put_batches_into_queue(self, gen_batch, bar, bar_desc, ordered=True):
+        """ Submit batches for processing and pass futures to the consumer
+
+        Futures are put into the batch queue in the order of submission if `ordered`,
+        or as soon as they are completed otherwise.
+        The last queue item is the total number of submitted batches.
+        """
+        stop_event, prefetch_count, batch_queue, stats = \
+            self._stop_event, self._prefetch_count, self._batch_queue, self.prefetch_stats
+
+        def _on_complete(future):
+            stats.update(completed=1)
+            if not ordered:
+                batch_queue.put(future)
+
+        n_submitted = 0
+        while not stop_event.is_set():
+            start_time = time.perf_counter()
+            prefetch_count.put(1, block=True)
+            stats.update(producer_wait=time.perf_counter() - start_time)
+            if stop_event.is_set():
+                break
             try:
-                batch = next(gen_batch)
+                with self._trace_span(BATCH_NAME, 'batch'):
+                    batch = next(gen_batch)
                 if bar:
                     update_bar(bar, bar_desc, pipeline=self, batch=batch)
+                if self._profile:
+                    self._profiler.submitted(batch)
+                future = self._submit_batch(batch)
             except StopIteration:
                 break
-            else:
-                future = self._executor.submit(self.execute_for, batch, new_loop=True)
-                self._prefetch_queue.put(future, block=True)
-        self._prefetch_queue.put(None, block=True)
-
-    def _run_batches_from_queue(self):
-        skip_batch = False
-        while not self._stop_flag:
-            future = self._prefetch_queue.get(block=True)
-            if future is None:
-                self._prefetch_queue.task_done()
-                self._batch_queue.put(None)
-                break
+            except Exception as e:  # pylint: disable=broad-except
+                future = cf.Future()
+                future.set_exception(e)
+                stop_event.set()
+
+            n_submitted += 1
+            stats.update(produced=1)
+            if ordered:
+                batch_queue.put(future)
+            future.add_done_callback(_on_complete)
+        batch_queue.put(n_submitted)
+
+    def _get_batches_from_queue(self):
+        """ Yield processed batches from the batch queue """
+        prefetch_count, batch_queue, stats = self._prefetch_count, self._batch_queue, self.prefetch_stats
+
+        n_received, n_submitted = 0, None
+        while n_submitted is None or n_received < n_submitted:
+            start_time = time.perf_counter()
+            future = batch_queue.get(block=True)
+            if isinstance(future, int):
+                n_submitted = future
+                stats.update(consumer_wait=time.perf_counter() - start_time)
+                continue
+            n_received += 1
 
             try:
-                batch = future.result()
+                with self._trace_span(WAIT_NAME, 'wait'):
+                    batch_res = future.result()
             except SkipBatchException:
-                skip_batch = True
-            except Exception:   # pylint: disable=broad-except
-                exc = future.exception()
-                print("Exception in a thread:", exc)
-                traceback.print_tb(exc.__traceback__)
+                stats.update(skipped=1)
+                prefetch_count.get(block=True)
+                continue
+            except Exception:
+                stats.update(failed=1)
+                raise
             finally:
-                if not skip_batch:
-                    self._batch_queue.put(batch, block=True)
-                    skip_batch = False
-                self._prefetch_queue.task_done()
+                stats.update(consumer_wait=time.perf_counter() - start_time)
+
+            stats.update(consumed=1)
+            yield batch_res
+            prefetch_count.get(block=True)
+
+    def _stop_prefetch(self):
+        """ Stop the producer and batch processing """
+        if self._stop_event is not None:
+            self._stop_event.set()
+        # release the producer if it waits for a free slot
+        self._clear_queue(self._prefetch_count)
+        self._stop_executor(self._executor)
+        self._stop_executor(self._service_executor)
+        self._clear_queue(self._batch_queue)
+        self._executor = None
+        self._service_executor = None
 
     def _clear_queue(self, queue):
         if queue is not None:
-            while not queue.empty():
-                queue.get(block=True)
-                queue.task_done()
+            while True:
+                try:
+                    queue.get(block=False)
+                except q.Empty:
+                    break
 
     def _stop_executor(self, executor):
         if executor is not None:
@@ -1292,6 +1615,7 @@ class Pipeline:
             - 'iter' - restart the batch iterator
             - 'variables' - re-initialize all pipeline variables
             - 'models' - reset all models
+            - 'cache' - clear items cached in memory by :meth:`.cache`
 
         Examples
         --------
@@ -1318,27 +1642,24 @@ class Pipeline:
             what = [what]
 
         if 'iter' in what:
-            self._stop_flag = True
-
-            self._clear_queue(self._prefetch_queue)
-            self._clear_queue(self._batch_queue)
-            self._clear_queue(self._prefetch_count)
-
-            self._stop_executor(self._executor)
-            self._stop_executor(self._service_executor)
+            self._stop_prefetch()
+            self.pools.shutdown()
 
-            self._executor = None
-            self._service_executor = None
+            self._stop_event = None
             self._prefetch_count = None
-            self._prefetch_queue = None
             self._batch_queue = None
             self._rest_batch = None
             self._batch_generator = None
+            self._plan = None
+            self._expr_cache = {}
             self._iter_params = Baseset.get_default_iter_params()
 
         if 'vars' in what or 'variables' in what:
             self._init_all_variables()
 
+        if 'cache' in what:
+            self._caches = {}
+
         if 'models' in what:
             self.models.reset()
 
@@ -1355,6 +1676,17 @@ class Pipeline:
         kwargs.setdefault('iter_params', None)
 
         self._rest_batch = None
+        if _action['fn'] is None:
+            try:
+                first_batch = pipeline.next_batch(*args, **kwargs)
+            except StopIteration:
+                return
+            if Rebatcher.is_supported(first_batch):
+                yield from self._gen_stream_rebatch(pipeline, first_batch, _action, *args, **kwargs)
+                return
+            # a custom merge is used for the whole stream
+            self._rest_batch = first_batch
+
         while True:
             if self._rest_batch is None:
                 cur_len = 0
@@ -1384,6 +1716,49 @@ class Pipeline:
                                                         batch_class=_action['batch_class'])
             yield batch
 
+    def gen_echo(self, *args, **kwargs):
+        """ Generate batches for echo operation """
+        _action = self._actions[0]
+
+        if _action['pipeline'].dataset is None:
+            pipeline = _action['pipeline'] << self._dataset
+        else:
+            pipeline = self.from_pipeline(_action['pipeline'])
+
+        kwargs.setdefault('iter_params', None)
+        n_echoes = _action['n_echoes']
+        for batch in pipeline.gen_batch(*args, **kwargs):
+            _ = batch.data
+            for i in range(n_echoes):
+                # copies are made before the batch itself is passed further, as actions might change it inplace
+                yield batch if i == n_echoes - 1 else self._copy_batch(batch)
+
+    @staticmethod
+    def _copy_batch(batch):
+        """ Return a batch with a copy of data, but with the same index and attributes """
+        # pylint:disable=protected-access
+        new_batch = type(batch)(batch.index, dataset=batch._dataset, pipeline=batch.pipeline,
+                                preloaded=batch._preloaded, copy=batch._copy, **batch.get_attrs())
+        new_batch.components = batch.components
+        new_batch._data = cp.deepcopy(batch._data)
+        return new_batch
+
+    @staticmethod
+    def _gen_stream_rebatch(pipeline, first_batch, action, *args, **kwargs):
+        """ Generate batches for rebatch operation with items copied into output batches only once """
+        rebatcher = Rebatcher(action['batch_size'], components=action['components'],
+                              batch_class=action['batch_class'])
+        batch = first_batch
+        while True:
+            yield from rebatcher.push(batch)
+            try:
+                batch = pipeline.next_batch(*args, **kwargs)
+            except StopIteration:
+                break
+        last_batch = rebatcher.flush()
+        if last_batch is not None:
+            yield last_batch
+
 
     def gen_batch(self, *args, iter_params=None, reset='iter', profile=False, **kwargs):
         """ Generate batches
@@ -1430,9 +1805,18 @@ class Pipeline:
         prefetch : int
             a number of batches to process in advance (default=0)
 
+        ordered : bool
+            whether to yield prefetched batches in the order they are generated (default=True).
+            If False, batches are yielded as soon as they are processed which reduces latency
+            when batch processing time varies.
+
         target : 'threads' or 'mpc'
             batch parallelization engine used for prefetching (default='threads').
-            'mpc' rarely works well due to complicated and slow python's inter-process communications.
+
+            'mpc' runs the pipeline in long-lived worker processes which receive only batch indices
+            and send output batches back with large numeric components placed into shared memory.
+            Note that each worker has its own copy of the pipeline, so variables and models
+            updated in workers are not synchronized with the main process.
 
         reset : list of str, str or bool
             what to reset to start from scratch:
@@ -1441,10 +1825,26 @@ class Pipeline:
             - 'variables' - re-initialize all pipeline variables
             - 'models' - reset all models
 
+        profile : bool, 'detailed' or 'trace'
+            whether to collect wall and CPU time of each action (see :meth:`.show_profile_info`).
+            If 'detailed', :mod:`cProfile` stats for each action are also collected, which slows down execution.
+            If 'trace', generation of batches, items of parallel actions and model calls are also recorded,
+            so that a timeline might be saved with :meth:`.save_trace`.
+
         Yields
         ------
         an instance of the batch class returned by the last action
 
+        Raises
+        ------
+        Any exception raised while generating or processing a batch (except :class:`~.SkipBatchException`)
+        is re-raised in the consumer, whether prefetching is used or not.
+
+        Notes
+        -----
+        Run counters (including prefetch queue depth and producer / consumer wait time)
+        are available in `pipeline.prefetch_stats` (see :class:`~.PrefetchStats`).
+
         Examples
         --------
 
@@ -1463,9 +1863,11 @@ class Pipeline:
         kwargs_value = self._eval_expr(kwargs)
         self.reset(reset)
         self._iter_params = iter_params or self._iter_params or Baseset.get_default_iter_params()
-        self._profile = profile
+        self._profile = bool(profile)
         if profile:
-            self._profiler = Profile()
+            detailed, trace = profile == 'detailed', profile == 'trace'
+            if self._profiler is None or self._profiler.detailed != detailed or self._profiler.trace != trace:
+                self._profiler = PipelineProfiler(detailed=detailed, trace=trace)
 
         return self._gen_batch(*args_value, iter_params=self._iter_params, **kwargs_value)
 
@@ -1475,13 +1877,24 @@ class Pipeline:
         start_time = time.time()
         target = kwargs.pop('target', 'threads')
         prefetch = kwargs.pop('prefetch', 0)
+        ordered = kwargs.pop('ordered', True)
         on_iter = kwargs.pop('on_iter', None)
         bar = kwargs.pop('bar', None)
         bar_desc = kwargs.pop('bar_desc', None)
 
-        if len(self._actions) > 0 and self._actions[0]['name'] == REBATCH_ID:
-            batch_generator = self.gen_rebatch(*args, **kwargs, prefetch=prefetch)
-            prefetch = 0
+        if len(self._actions) > 0 and self._actions[0]['name'] in [REBATCH_ID, ECHO_ID]:
+            name = self.get_action_name(self._actions[0])
+            gen_source = self.gen_rebatch if self._actions[0]['name'] == REBATCH_ID else self.gen_echo
+            source_prefetch = self._actions[0].get('prefetch')
+            if source_prefetch is None:
+                batch_generator = gen_source(*args, **kwargs, prefetch=prefetch)
+                prefetch = 0
+            else:
+                # the source pipeline and actions after rebatch or echo are prefetched separately
+                if prefetch > 0 and target not in ['threads', 't']:
+                    raise ValueError("Batches after %s can be prefetched only with target='threads'" % name)
+                batch_generator = gen_source(*args, **kwargs, prefetch=source_prefetch,
+                                             target=self._actions[0].get('target') or 'threads')
         else:
             batch_generator = self._dataset.gen_batch(*args, **kwargs)
 
@@ -1502,6 +1915,7 @@ class Pipeline:
         if self.before:
             self.before.run()
 
+        stats = self.prefetch_stats = PrefetchStats(prefetch)
         if prefetch > 0:
             # pool cannot have more than 63 workers
             prefetch = min(prefetch, 62)
@@ -1509,46 +1923,54 @@ class Pipeline:
             if target in ['threads', 't']:
                 self._executor = cf.ThreadPoolExecutor(max_workers=prefetch + 1)
             elif target in ['mpc', 'm']:
-                self._executor = cf.ProcessPoolExecutor(max_workers=prefetch + 1)
+                self._executor = ProcessBatchExecutor(self, n_workers=prefetch + 1)
             else:
                 raise ValueError("target should be one of ['threads', 'mpc']")
 
-            self._stop_flag = False
+            self._stop_event = threading.Event()
             self._prefetch_count = q.Queue(maxsize=prefetch + 1)
-            self._prefetch_queue = q.Queue(maxsize=prefetch)
-            self._batch_queue = q.Queue(maxsize=1)
-            self._service_executor = cf.ThreadPoolExecutor(max_workers=2)
-            self._service_executor.submit(self._put_batches_into_queue, batch_generator, bar, bar_desc)
-            self._service_executor.submit(self._run_batches_from_queue)
-
-            while not self._stop_flag:
-                batch_res = self._batch_queue.get(block=True)
-                self._batch_queue.task_done()
-                if batch_res is not None:
+            self._batch_queue = q.Queue()
+            self._service_executor = cf.ThreadPoolExecutor(max_workers=1)
+            self._service_executor.submit(self._put_batches_into_queue, batch_generator, bar, bar_desc, ordered)
+
+            try:
+                for batch_res in self._get_batches_from_queue():
                     yield batch_res
-                    self._prefetch_count.get(block=True)
-                    self._prefetch_count.task_done()
                     if callable(on_iter):
                         on_iter(batch_res)
-                else:
-                    self._stop_flag = True
+            finally:
+                self._stop_prefetch()
+                stats.stop()
         else:
-            is_empty = True
-            for batch in batch_generator:
+            while True:
+                wait_start = time.perf_counter()
+                try:
+                    with self._trace_span(BATCH_NAME, 'batch'):
+                        batch = next(batch_generator)
+                except StopIteration:
+                    break
+                stats.update(produced=1)
                 try:
                     batch_res = self.execute_for(batch)
                     if bar:
                         update_bar(bar, bar_desc, pipeline=self, batch=batch)
                 except SkipBatchException:
-                    pass
-                else:
-                    is_empty = False
-                    yield batch_res
-                    if callable(on_iter):
-                        on_iter(batch_res)
-            if is_empty:
-                warnings.warn("Batch generator is empty. Use pipeline.reset('iter') to restart iteration.",
-                              EmptyBatchSequence, stacklevel=3)
+                    stats.update(completed=1, skipped=1)
+                    continue
+                except Exception:
+                    stats.update(completed=1, failed=1)
+                    raise
+                finally:
+                    stats.update(consumer_wait=time.perf_counter() - wait_start)
+                stats.update(completed=1, consumed=1)
+                yield batch_res
+                if callable(on_iter):
+                    on_iter(batch_res)
+            stats.stop()
+
+        if stats.consumed == 0:
+            warnings.warn("Batch generator is empty. Use pipeline.reset('iter') to restart iteration.",
+                          EmptyBatchSequence, stacklevel=3)
 
         if bar:
             bar.close()
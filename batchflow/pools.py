@@ -0,0 +1,109 @@
+""" Contains a registry of worker pools shared by parallel actions """
+import os
+import atexit
+import threading
+import concurrent.futures as cf
+
+
+_local = threading.local()
+
+def _mark_pool_thread(registry_id):
+    _local.registry_id = registry_id
+
+
+class PoolRegistry:
+    """ Worker pools which are created on first request and reused across actions and batches
+
+    Each pipeline has its own registry (see `pipeline.pools`) which is torn down on ``pipeline.reset('iter')``.
+    Batches outside of a pipeline use a global registry (:data:`DEFAULT_POOLS`).
+
+    Parameters
+    ----------
+    n_workers : int or None
+        a default number of workers in a pool.
+
+    Examples
+    --------
+    ::
+
+        pipeline.pools.n_workers = 8
+    """
+    KINDS = ('threads', 'mpc')
+
+    def __init__(self, n_workers=None):
+        self.n_workers = n_workers
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def get(self, kind='threads', n_workers=None):
+        """ Return a pool with a given number of workers
+
+        Parameters
+        ----------
+        kind : {'threads', 'mpc'}
+            a pool type: threads or processes.
+        n_workers : int or None
+            the number of workers. If None, `self.n_workers` is used.
+
+        Returns
+        -------
+        concurrent.futures.Executor
+        """
+        if kind not in self.KINDS:
+            raise ValueError("kind should be one of %s, but given %s" % (self.KINDS, kind))
+        n_workers = n_workers or self.n_workers
+        key = kind, n_workers
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # a forked process cannot use pools of its parent
+                self._pools = {}
+                self._pid = os.getpid()
+
+            pool = self._pools.get(key)
+            if pool is not None and getattr(pool, '_broken', False):
+                # a process pool gets broken when a worker dies
+                pool.shutdown(wait=False)
+                pool = None
+            if pool is None:
+                if kind == 'threads':
+                    pool = cf.ThreadPoolExecutor(max_workers=n_workers, initializer=_mark_pool_thread,
+                                                 initargs=(id(self),))
+                else:
+                    pool = cf.ProcessPoolExecutor(max_workers=n_workers)
+                self._pools[key] = pool
+        return pool
+
+    def in_pool(self):
+        """ Check whether the current thread is a worker of one of the registry thread pools """
+        return getattr(_local, 'registry_id', None) == id(self)
+
+    def shutdown(self, wait=True):
+        """ Shut down all pools """
+        with self._lock:
+            pools, self._pools = self._pools, {}
+            same_process = self._pid == os.getpid()
+        if same_process:
+            for pool in pools.values():
+                pool.shutdown(wait=wait)
+
+    def __len__(self):
+        return len(self._pools)
+
+    def __getstate__(self):
+        return dict(n_workers=self.n_workers)
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+
+DEFAULT_POOLS = PoolRegistry()
+atexit.register(DEFAULT_POOLS.shutdown)
+
+
+def get_pools(batch):
+    """ Return a pool registry for a batch: the one of its pipeline or the global one """
+    pipeline = getattr(batch, 'pipeline', None)
+    pools = vars(pipeline).get('pools') if hasattr(pipeline, '__dict__') else None
+    return pools if isinstance(pools, PoolRegistry) else DEFAULT_POOLS
@@ -0,0 +1,369 @@
+""" Contains batch prefetching tools """
+import time
+import threading
+import traceback
+import queue as q
+import concurrent.futures as cf
+import multiprocessing as mp
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+    shared_memory = None
+
+import dill
+import numpy as np
+
+
+# arrays smaller than this (in bytes) are sent through a pipe along with a batch
+SHARED_MEMORY_MIN_SIZE = 2 ** 16
+
+
+class SharedArray:
+    """ A descriptor of a numpy array placed into a shared memory block
+
+    The block is created by a sender and unlinked by a receiver once the array is copied out of it.
+    """
+    def __init__(self, array):
+        self.shape = array.shape
+        self.dtype = array.dtype
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        try:
+            np.ndarray(self.shape, dtype=self.dtype, buffer=block.buf)[...] = array
+        except Exception:
+            block.close()
+            block.unlink()
+            raise
+        self.name = block.name
+        block.close()
+
+    def get(self):
+        """ Copy the array out of the shared memory block and release the block """
+        block = shared_memory.SharedMemory(name=self.name)
+        try:
+            array = np.ndarray(self.shape, dtype=self.dtype, buffer=block.buf).copy()
+        finally:
+            block.close()
+            block.unlink()
+        return array
+
+    def release(self):
+        """ Release the shared memory block without reading it """
+        try:
+            block = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return
+        block.close()
+        block.unlink()
+
+
+def _pack_value(value):
+    if shared_memory is not None and isinstance(value, np.ndarray) and not value.dtype.hasobject \
+       and value.nbytes >= SHARED_MEMORY_MIN_SIZE:
+        return SharedArray(value)
+    return value
+
+def _unpack_value(value):
+    return value.get() if isinstance(value, SharedArray) else value
+
+def _release_value(value):
+    if isinstance(value, SharedArray):
+        value.release()
+
+
+def pack_batch(batch):
+    """ Detach data from a batch and serialize the batch so it can be sent to another process
+
+    Large numeric arrays are placed into shared memory, while everything else is pickled.
+    Links to a dataset and a pipeline are not sent.
+
+    Returns
+    -------
+    bytes
+    """
+    # pylint: disable=protected-access
+    if batch.components is None:
+        data = {None: batch.data}
+    else:
+        data = {comp: getattr(batch, comp) for comp in batch.components}
+    data = {comp: _pack_value(value) for comp, value in data.items()}
+
+    batch.pipeline = None
+    batch._dataset = None
+    batch._preloaded = None
+    batch._data = None
+    batch._data_named = None
+    try:
+        return dill.dumps((batch, data))
+    except Exception:
+        for value in data.values():
+            _release_value(value)
+        raise
+
+def unpack_batch(payload, dataset=None, pipeline=None):
+    """ Restore a batch serialized with :func:`pack_batch` """
+    # pylint: disable=protected-access
+    batch, data = dill.loads(payload)
+    data = {comp: _unpack_value(value) for comp, value in data.items()}
+    if batch.components is None:
+        batch._data = data[None]
+    else:
+        batch._data = tuple(data[comp] for comp in batch.components)
+    batch._dataset = dataset
+    batch.pipeline = pipeline
+    return batch
+
+def release_batch(payload):
+    """ Release shared memory held by a serialized batch which is not going to be unpacked """
+    _, data = dill.loads(payload)
+    for value in data.values():
+        _release_value(value)
+
+
+def _pack_exception(exc):
+    try:
+        return dill.dumps(exc)
+    except Exception:   # pylint: disable=broad-except
+        text = ''.join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+        return dill.dumps(RuntimeError(text))
+
+
+def _worker_loop(pipeline, tasks, results, stop):
+    """ Execute a pipeline for batches until a stop signal is received """
+    # pylint: disable=protected-access
+    if isinstance(pipeline, bytes):
+        pipeline = dill.loads(pipeline)
+    while True:
+        task = tasks.get()
+        if task is None or stop.is_set():
+            break
+        task_id, index, attrs, iter_params = task
+        try:
+            pipeline._iter_params.update(iter_params)
+            batch = pipeline._dataset.create_batch(index, **attrs)
+            batch = pipeline.execute_for(batch)
+            results.put((task_id, True, pack_batch(batch)))
+        except Exception as e:  # pylint: disable=broad-except
+            results.put((task_id, False, _pack_exception(e)))
+
+
+class ProcessBatchExecutor:
+    """ Long-lived worker processes which execute a pipeline for batches
+
+    Workers get a copy of the pipeline once at start, and then receive only batch indices.
+    Output batches are sent back with large numeric components placed into shared memory,
+    so they are copied only once (out of a shared memory block) on the receiving end.
+
+    Parameters
+    ----------
+    pipeline : Pipeline
+        a pipeline to execute.
+    n_workers : int
+        the number of worker processes.
+
+    Notes
+    -----
+    Each worker executes actions on its own copy of the pipeline,
+    so variables and models updated within workers are not synchronized with the main process.
+    """
+    def __init__(self, pipeline, n_workers):
+        # pylint: disable=protected-access
+        self.pipeline = pipeline
+        self.dataset = pipeline._dataset
+        ctx = mp.get_context()
+        if shared_memory is not None:
+            # workers should share a resource tracker with the main process,
+            # otherwise shared memory blocks would be unlinked when a worker exits
+            resource_tracker.ensure_running()
+        payload = pipeline if ctx.get_start_method() == 'fork' else dill.dumps(pipeline)
+
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._stop = ctx.Event()
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._task_id = 0
+        self._shutdown = False
+
+        args = payload, self._tasks, self._results, self._stop
+        self._processes = [ctx.Process(target=_worker_loop, args=args, daemon=True) for _ in range(n_workers)]
+        for process in self._processes:
+            process.start()
+
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def submit_batch(self, batch, iter_params=None):
+        """ Schedule pipeline execution for a given batch
+
+        Returns
+        -------
+        concurrent.futures.Future
+            a future which resolves to an output batch
+        """
+        future = cf.Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError('Cannot submit a batch after shutdown')
+            self._task_id += 1
+            task_id = self._task_id
+            self._futures[task_id] = future
+        iter_params = {key: value for key, value in (iter_params or {}).items() if np.isscalar(value)}
+        self._tasks.put((task_id, batch.index, batch.get_attrs(), iter_params))
+        return future
+
+    def _collect(self):
+        while True:
+            try:
+                item = self._results.get(timeout=1)
+            except q.Empty:
+                if self._shutdown:
+                    break
+                if any(not process.is_alive() for process in self._processes):
+                    self._fail_all(RuntimeError('A prefetch worker process died unexpectedly'))
+                    break
+                continue
+            if item is None:
+                break
+
+            task_id, success, payload = item
+            with self._lock:
+                future = self._futures.pop(task_id, None)
+            if future is None:
+                if success:
+                    release_batch(payload)
+                continue
+            try:
+                if success:
+                    future.set_result(unpack_batch(payload, self.dataset, self.pipeline))
+                else:
+                    future.set_exception(dill.loads(payload))
+            except Exception as e:  # pylint: disable=broad-except
+                future.set_exception(e)
+
+    def _fail_all(self, exc):
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    def shutdown(self, wait=True):
+        """ Stop worker processes and cancel pending batches """
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+        self._stop.set()
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=None if wait else 0.1)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        self._collector.join()
+
+        # release blocks of batches which have been processed but not collected
+        while True:
+            try:
+                item = self._results.get(timeout=0.1)
+            except q.Empty:
+                break
+            if item is not None and item[1]:
+                release_batch(item[2])
+
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            future.cancel()
+
+
+class PrefetchStats:
+    """ Live counters of a pipeline run
+
+    Attributes
+    ----------
+    prefetch : int
+        the number of batches processed in advance.
+    produced : int
+        the number of batches sent for processing.
+    completed : int
+        the number of batches which have been processed (including failed and skipped ones).
+    consumed : int
+        the number of batches yielded to the consumer.
+    skipped : int
+        the number of batches skipped with :class:`~.SkipBatchException`.
+    failed : int
+        the number of batches which have raised an exception.
+    producer_wait : float
+        the total time (in seconds) the producer has been waiting for a free prefetch slot.
+        When it is large, the consumer is the bottleneck and `prefetch` can be decreased.
+    consumer_wait : float
+        the total time (in seconds) the consumer has been waiting for the next batch.
+        When it is large, batch processing is the bottleneck and `prefetch` should be increased.
+
+    Examples
+    --------
+    ::
+
+        for batch in pipeline.gen_batch(BATCH_SIZE, prefetch=4):
+            ...
+        print(pipeline.prefetch_stats)
+    """
+    def __init__(self, prefetch=0):
+        self.prefetch = prefetch
+        self.produced = 0
+        self.completed = 0
+        self.consumed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.producer_wait = 0.
+        self.consumer_wait = 0.
+        self._lock = threading.Lock()
+        self._start_time = time.perf_counter()
+        self._end_time = None
+
+    def update(self, **kwargs):
+        """ Increment counters by given values """
+        with self._lock:
+            for name, value in kwargs.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def stop(self):
+        """ Stop the timer """
+        if self._end_time is None:
+            self._end_time = time.perf_counter()
+
+    @property
+    def queue_depth(self):
+        """ int : the number of batches which are sent for processing but not taken by the consumer yet """
+        return self.produced - self.consumed - self.skipped - self.failed
+
+    @property
+    def ready(self):
+        """ int : the number of processed batches which wait for the consumer """
+        return self.completed - self.consumed - self.skipped - self.failed
+
+    @property
+    def elapsed_time(self):
+        """ float : time (in seconds) since the start of the run """
+        end_time = self._end_time if self._end_time is not None else time.perf_counter()
+        return end_time - self._start_time
+
+    @property
+    def batches_per_sec(self):
+        """ float : consumer throughput """
+        elapsed_time = self.elapsed_time
+        return self.consumed / elapsed_time if elapsed_time > 0 else 0.
+
+    def as_dict(self):
+        """ Return all counters as a dict """
+        names = ['prefetch', 'produced', 'completed', 'consumed', 'skipped', 'failed', 'queue_depth', 'ready',
+                 'producer_wait', 'consumer_wait', 'elapsed_time', 'batches_per_sec']
+        with self._lock:
+            return {name: getattr(self, name) for name in names}
+
+    def __repr__(self):
+        items = ', '.join('%s=%s' % (name, round(value, 4) if isinstance(value, float) else value)
+                          for name, value in self.as_dict().items())
+        return '%s(%s)' % (type(self).__name__, items)
@@ -0,0 +1,260 @@
+""" Contains a profiler of pipeline actions """
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from cProfile import Profile
+from pstats import Stats
+
+import numpy as np
+import pandas as pd
+
+
+QUEUE_NAME = '#queue'
+BATCH_NAME = '#batch'
+WAIT_NAME = '#wait'
+
+# kinds of spans: pipeline actions, waiting in a prefetch queue, batch generation,
+# items of parallel actions, model calls and waiting for a prefetched batch
+CATEGORIES = ('action', 'queue', 'batch', 'task', 'model', 'wait')
+
+_get_thread_id = getattr(threading, 'get_native_id', threading.get_ident)
+_active = threading.local()
+
+
+def active_profiler():
+    """ Return a tracing profiler of a pipeline run in the current thread and an iteration number, or None """
+    return getattr(_active, 'context', None)
+
+
+class PipelineProfiler:
+    """ Collects execution times of pipeline actions
+
+    For each action and batch it stores wall and CPU time of the executing thread, and the number of items
+    in the batch. Records are kept in a preallocated array and turned into a dataframe only on demand.
+    When batches are prefetched, time spent by a batch in the queue before execution is recorded
+    as a pseudo-action ``'#queue'``.
+
+    When tracing, the profiler also records generation of batches (``'#batch'``), time the consumer
+    waits for prefetched batches (``'#wait'``), items of parallel actions and model calls.
+    All spans keep thread and process ids, so they can be exported as a timeline with :meth:`.save_trace`.
+
+    Parameters
+    ----------
+    detailed : bool
+        whether to also collect :mod:`cProfile` stats for each action.
+        Note that it slows down execution considerably and so affects timings.
+    trace : bool
+        whether to record spans inside actions and between them.
+    capacity : int
+        the initial number of records.
+
+    Examples
+    --------
+    ::
+
+        pipeline.run(BATCH_SIZE, n_epochs=1, profile=True)
+        pipeline.show_profile_info()
+
+        pipeline.run(BATCH_SIZE, n_epochs=1, profile='detailed')
+        pipeline.show_profile_info(detailed=True)
+
+        pipeline.run(BATCH_SIZE, n_epochs=1, profile='trace')
+        pipeline.save_trace('trace.json')
+    """
+    DTYPE = np.dtype([('iter', np.int64), ('action', np.int32), ('category', np.int8), ('batch_id', np.int64),
+                      ('n_items', np.int64), ('start_time', np.float64), ('total_time', np.float64),
+                      ('cpu_time', np.float64), ('thread', np.int64), ('process', np.int32)])
+    DETAILED_COLUMNS = ['iter', 'total_time', 'pipeline_time', 'ncalls', 'tottime', 'cumtime', 'batch_id', 'start_time']
+
+    def __init__(self, detailed=False, trace=False, capacity=1024):
+        self.detailed = detailed
+        self.trace = trace
+        self._records = np.zeros(capacity, dtype=self.DTYPE)
+        self._size = 0
+        self._names = []
+        self._codes = {}
+        self._detailed_rows = []
+        self._submitted = {}
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __len__(self):
+        return self._size
+
+    def _get_code(self, name):
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self._names)
+            self._names.append(name)
+        return code
+
+    def _add(self, iter_no, name, batch_id, n_items, start_time, total_time, cpu_time, category=0):
+        thread_id = _get_thread_id()
+        with self._lock:
+            if thread_id not in self._threads:
+                self._threads[thread_id] = threading.current_thread().name
+            if self._size == len(self._records):
+                records = np.zeros(2 * len(self._records), dtype=self.DTYPE)
+                records[:self._size] = self._records
+                self._records = records
+            self._records[self._size] = iter_no, self._get_code(name), category, batch_id, n_items, \
+                                        start_time, total_time, cpu_time, thread_id, os.getpid()
+            self._size += 1
+
+    def start(self):
+        """ Start timing an action in the current thread """
+        if self.detailed:
+            profiler = getattr(self._local, 'profiler', None)
+            if profiler is None:
+                # cProfile stats are collected per thread as prefetched batches run concurrently
+                profiler = self._local.profiler = Profile()
+            profiler.enable()
+        return time.perf_counter(), time.thread_time()
+
+    def stop(self, token, name, iter_no, batch_id, n_items):
+        """ Finish timing an action started with :meth:`.start` """
+        wall_time, cpu_time = time.perf_counter(), time.thread_time()
+        start_time, start_cpu = token
+        if self.detailed:
+            profiler = self._local.profiler
+            profiler.disable()
+            self._add_detailed(profiler, name, iter_no, batch_id, start_time, wall_time - start_time)
+        self._add(iter_no, name, batch_id, n_items, start_time, wall_time - start_time, cpu_time - start_cpu)
+
+    def _add_detailed(self, profiler, name, iter_no, batch_id, start_time, total_time):
+        stats = Stats(profiler)
+        profiler.clear()
+        rows = []
+        for key, value in stats.stats.items():
+            for k, v in value[4].items():
+                # action name, method_name, file_name, line_no, callee
+                rows.append((name, '{}::{}::{}::{}'.format(key[2], *k),
+                             iter_no, total_time, stats.total_tt, v[0], v[2], v[3], batch_id, start_time))
+        with self._lock:
+            self._detailed_rows.extend(rows)
+
+    def submitted(self, batch):
+        """ Mark a batch as put into a prefetch queue """
+        self._submitted[id(batch)] = time.perf_counter()
+
+    def started(self, batch, iter_no):
+        """ Record time a batch has been waiting in a prefetch queue """
+        submit_time = self._submitted.pop(id(batch), None)
+        if submit_time is not None:
+            now = time.perf_counter()
+            self._add(iter_no, QUEUE_NAME, id(batch), len(batch), submit_time, now - submit_time, 0.,
+                      CATEGORIES.index('queue'))
+
+    @contextmanager
+    def span(self, name, category, iter_no=-1, batch_id=-1, n_items=0):
+        """ Record a span of a given category (one of :data:`CATEGORIES`) executed in the current thread """
+        start_time, start_cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self._add(iter_no, name, batch_id, n_items, start_time, time.perf_counter() - start_time,
+                      time.thread_time() - start_cpu, CATEGORIES.index(category))
+
+    @contextmanager
+    def activate(self, iter_no):
+        """ Make the profiler available to parallel actions executed in the current thread """
+        previous = getattr(_active, 'context', None)
+        _active.context = self, iter_no
+        try:
+            yield
+        finally:
+            _active.context = previous
+
+    def wrap(self, method, iter_no, batch_id=-1):
+        """ Return a function which records a span for each call of a method of a parallel action """
+        name = getattr(method, '__name__', str(method))
+        @functools.wraps(method)
+        def _traced_method(*args, **kwargs):
+            with self.span(name, 'task', iter_no, batch_id, 1):
+                return method(*args, **kwargs)
+        return _traced_method
+
+    @property
+    def records(self):
+        """ np.ndarray : a structured array of records collected so far """
+        return self._records[:self._size]
+
+    def to_dataframe(self, detailed=False):
+        """ Return collected records as a dataframe indexed by action names
+
+        If `detailed`, cProfile stats are returned indexed by action names and function ids.
+        """
+        if detailed:
+            if not self.detailed:
+                raise ValueError("Detailed stats are collected only with profile='detailed'")
+            with self._lock:
+                rows = list(self._detailed_rows)
+            index = pd.MultiIndex.from_tuples([row[:2] for row in rows], names=['action', 'id'])
+            return pd.DataFrame([row[2:] for row in rows], index=index, columns=self.DETAILED_COLUMNS)
+
+        with self._lock:
+            records = self.records.copy()
+            names = np.array(self._names, dtype=object)
+        df = pd.DataFrame({name: records[name] for name in self.DTYPE.names if name not in ('action', 'category')},
+                          index=pd.Index(names[records['action']] if len(names) else [], name='action'))
+        df.insert(0, 'category', np.array(CATEGORIES, dtype=object)[records['category']])
+        df['items_per_sec'] = df['n_items'] / df['total_time'].where(df['total_time'] > 0)
+        return df
+
+    def to_trace(self):
+        """ Return collected spans as a dict in the Chrome trace event format
+
+        Spans are complete events on tracks of threads they have been executed in.
+        Waiting in a prefetch queue is not bound to a thread, so it is shown as async events.
+        CPU time of a span is included in its args: a thread which is busy much less than its
+        wall time while other threads run is likely waiting for IO or for the GIL.
+        """
+        with self._lock:
+            records = self.records.copy()
+            names = list(self._names)
+            threads = dict(self._threads)
+        origin = records['start_time'].min() if len(records) else 0.
+
+        events = []
+        for pid in np.unique(records['process']):
+            events.append(dict(name='process_name', ph='M', pid=int(pid), args=dict(name='batchflow pipeline')))
+        for pid, tid in set(zip(records['process'].tolist(), records['thread'].tolist())):
+            events.append(dict(name='thread_name', ph='M', pid=pid, tid=tid, args=dict(name=threads.get(tid, ''))))
+
+        queue = CATEGORIES.index('queue')
+        for record in records:
+            category = CATEGORIES[record['category']]
+            ts = (record['start_time'] - origin) * 1e6
+            dur = record['total_time'] * 1e6
+            args = dict(iter=int(record['iter']), batch_id=int(record['batch_id']), n_items=int(record['n_items']))
+            event = dict(name=names[record['action']], cat=category, pid=int(record['process']),
+                         tid=int(record['thread']))
+            if record['category'] == queue:
+                event_id = hex(int(record['batch_id']))
+                events.append(dict(event, ph='b', ts=ts, id=event_id, args=args))
+                events.append(dict(event, ph='e', ts=ts + dur, id=event_id))
+            else:
+                args['cpu_time_ms'] = record['cpu_time'] * 1e3
+                args['cpu_share'] = record['cpu_time'] / record['total_time'] if record['total_time'] > 0 else 0.
+                events.append(dict(event, ph='X', ts=ts, dur=dur, args=args))
+        return dict(traceEvents=events, displayTimeUnit='ms')
+
+    def save_trace(self, path):
+        """ Save collected spans as a JSON file which can be opened in Perfetto UI or `chrome://tracing` """
+        with open(path, 'w') as f:
+            json.dump(self.to_trace(), f)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop('_lock')
+        state.pop('_local')
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._local = threading.local()
@@ -0,0 +1,115 @@
+""" Contains a streaming rebatcher which copies each item once """
+import numpy as np
+
+from .batch import Batch
+from .dsindex import DatasetIndex
+
+
+class Rebatcher:
+    """ Assemble batches of a given size from a stream of batches
+
+    Component items are copied straight into output arrays allocated for a whole batch,
+    so, unlike repeated :meth:`~.Batch.merge` calls, the rest of a batch is never concatenated again.
+
+    Parameters
+    ----------
+    batch_size : int
+        the number of items in output batches.
+    components : str, tuple or None
+        components to put into output batches. If None, all components of input batches are used.
+    batch_class : type or None
+        a class of output batches. If None, the class of input batches is used.
+
+    Examples
+    --------
+    ::
+
+        rebatcher = Rebatcher(64)
+        for batch in batches:
+            for new_batch in rebatcher.push(batch):
+                ...
+        last_batch = rebatcher.flush()
+    """
+    def __init__(self, batch_size, components=None, batch_class=None):
+        self.batch_size = batch_size
+        self.components = (components,) if isinstance(components, str) else components
+        self.batch_class = batch_class
+        self._buffers = None
+        self._filled = 0
+
+    @staticmethod
+    def is_supported(batch):
+        """ Check whether batches of this class might be rebatched without calling a custom `merge` """
+        cls = type(batch)
+        return isinstance(batch, Batch) and cls.merge.__func__ is Batch.merge.__func__ and \
+               cls.merge_component.__func__ is Batch.merge_component.__func__
+
+    def push(self, batch):
+        """ Add a batch to the stream
+
+        Returns
+        -------
+        list of batches
+            batches which have been filled.
+        """
+        if self.components is None:
+            self.components = batch.components or (None,)
+        if self.batch_class is None:
+            self.batch_class = type(batch)
+
+        data = [batch.get(component=comp) for comp in self.components]
+        for comp, value in zip(self.components, data):
+            if value is not None and not isinstance(value, np.ndarray):
+                raise TypeError("Unknown data type", type(value))
+            if value is not None and len(value) != len(batch):
+                raise ValueError('Component {} has {} items, while batch has {}'.format(comp, len(value), len(batch)))
+
+        full_batches = []
+        start = 0
+        while start < len(batch):
+            if self._buffers is None:
+                self._buffers = [None if value is None else np.empty((self.batch_size, *value.shape[1:]), value.dtype)
+                                 for value in data]
+            self._check(data)
+            count = min(len(batch) - start, self.batch_size - self._filled)
+            for buffer, value in zip(self._buffers, data):
+                if buffer is not None:
+                    buffer[self._filled : self._filled + count] = value[start : start + count]
+            self._filled += count
+            start += count
+
+            if self._filled == self.batch_size:
+                full_batches.append(self._make_batch(self._buffers, self.batch_size))
+                self._buffers, self._filled = None, 0
+        return full_batches
+
+    def _check(self, data):
+        """ Check that component items fit into buffers (buffers dtypes are widened if needed) """
+        for i, (comp, buffer, value) in enumerate(zip(self.components, self._buffers, data)):
+            if (buffer is None) != (value is None):
+                raise ValueError('Component {} is None in some batches'.format(comp))
+            if buffer is None:
+                continue
+            if buffer.shape[1:] != value.shape[1:]:
+                raise ValueError('Component {} items have shape {}, while previous items have shape {}'
+                                 .format(comp, value.shape[1:], buffer.shape[1:]))
+            dtype = np.result_type(buffer, value)
+            if dtype != buffer.dtype:
+                new_buffer = np.empty(buffer.shape, dtype)
+                new_buffer[:self._filled] = buffer[:self._filled]
+                self._buffers[i] = new_buffer
+
+    def flush(self):
+        """ Return a batch with the rest of items or None if there are no items left """
+        if self._filled == 0:
+            return None
+        batch = self._make_batch([None if buffer is None else buffer[:self._filled] for buffer in self._buffers],
+                                 self._filled)
+        self._buffers, self._filled = None, 0
+        return batch
+
+    def _make_batch(self, data, size):
+        batch = self.batch_class.from_data(DatasetIndex(size), tuple(data))
+        batch.components = tuple(self.components)
+        _ = batch.data
+        return batch
@@ -6,3 +6,4 @@ from .workers import Worker, PipelineWorker
 from .named_expr import ResearchNamedExpression, REU, RP, RI, RC, RR, RD, REP, RID
 from .research import Research
 from .results import Results
+from .scheduler import Scheduler, ASHA
@@ -0,0 +1,179 @@
+""" Branch actors: experiments of a job executed in separate processes. """
+
+import numpy as np
+import multiprocess as mp
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:
+    shared_memory = resource_tracker = None
+
+
+def check_shared_memory():
+    """ Raise ImportError if shared memory is not supported by the current Python """
+    if shared_memory is None:
+        raise ImportError('Sharing batches between processes requires Python 3.8+')
+
+
+class SharedBatch:
+    """ Copy of a batch with array components placed into one shared memory block.
+
+    Array components are written once by a producer, while consumers in other processes
+    rebuild the batch from :attr:`.descriptor` with :func:`load_batch`.
+    Components which are not numeric arrays (e.g. object arrays) are sent in the descriptor itself.
+
+    Parameters
+    ----------
+    batch : Batch
+        a batch to share.
+
+    Examples
+    --------
+    ::
+
+        with SharedBatch(batch) as shared:
+            conn.send(shared.descriptor)
+            ...  # wait for consumers to finish before the block is released
+    """
+    def __init__(self, batch):
+        check_shared_memory()
+        components = batch.components or (None,)
+        arrays, other, offset = [], {}, 0
+        for comp in components:
+            value = batch.get(component=comp)
+            if isinstance(value, np.ndarray) and not value.dtype.hasobject:
+                arrays.append((comp, value, offset))
+                offset += value.nbytes
+            else:
+                other[comp] = value
+
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for _, value, start in arrays:
+            np.ndarray(value.shape, value.dtype, buffer=self._shm.buf, offset=start)[...] = value
+        self.descriptor = dict(name=self._shm.name, batch_class=type(batch), index=batch.index,
+                               attrs=batch.get_attrs(), components=batch.components,
+                               arrays=[(comp, value.dtype.str, value.shape, start) for comp, value, start in arrays],
+                               other=other)
+
+    def close(self):
+        """ Release the shared memory block """
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def load_batch(descriptor, dataset=None):
+    """ Create a batch from a :class:`SharedBatch` descriptor.
+
+    Components are copied into memory of the current process, so the shared block might be released
+    by the producer as soon as all consumers have loaded the batch.
+    Consumers should share the resource tracker of the producer (see :class:`BranchActor`).
+    """
+    # attaching registers the block with the tracker of the producer once again, which is a no-op,
+    # so the block is unregistered only once when the producer unlinks it
+    shm = shared_memory.SharedMemory(name=descriptor['name'])
+    try:
+        data = dict(descriptor['other'])
+        for comp, dtype, shape, start in descriptor['arrays']:
+            data[comp] = np.ndarray(shape, np.dtype(dtype), buffer=shm.buf, offset=start).copy()
+    finally:
+        shm.close()
+
+    batch = descriptor['batch_class'](descriptor['index'], dataset=dataset, **descriptor['attrs'])
+    if descriptor['components'] is None:
+        batch._data = data[None]                                # pylint: disable=protected-access
+    else:
+        batch.components = tuple(descriptor['components'])
+        batch._data = tuple(data[comp] for comp in descriptor['components'])  # pylint: disable=protected-access
+    return batch
+
+
+class BranchActor:
+    """ Process which owns one experiment of a job and executes its units on request.
+
+    The process is forked from the job process after experiments are created, so it inherits
+    the experiment, its pipelines and the job itself. Batches from root pipelines are passed
+    as :class:`SharedBatch` descriptors, hence root preprocessing is done once in the job process,
+    while branch pipelines do not share the GIL with each other.
+
+    Parameters
+    ----------
+    job : Job
+        a job which the experiment belongs to.
+    index : int
+        an index of the experiment in the job.
+    """
+    def __init__(self, job, index):
+        check_shared_memory()
+        self.job = job
+        self.index = index
+        self.experiment = job.experiments[index]
+        # the tracker is started before forking, so that the actor does not start its own one
+        # which would unlink blocks of the producer when the actor exits
+        resource_tracker.ensure_running()
+        self._conn, child_conn = mp.Pipe()
+        self._process = mp.Process(target=self._loop, args=(child_conn,), daemon=True)
+        self._process.start()
+        child_conn.close()
+
+    @property
+    def pid(self):
+        """ int : an id of the actor process """
+        return self._process.pid
+
+    def send(self, command, *args):
+        """ Ask the actor to execute a command: 'execute_for', 'call', 'put_result', 'dump_result' or 'last_result' """
+        self._conn.send((command, args))
+
+    def recv(self):
+        """ Wait for the actor to finish a command and return an exception raised by it (or None) and its output """
+        return self._conn.recv()
+
+    def close(self):
+        """ Stop the actor process """
+        if self._process.is_alive():
+            self._conn.send(None)
+            self._process.join()
+        self._conn.close()
+
+    def _loop(self, conn):
+        self._conn.close()
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            command, args = message
+            try:
+                output = getattr(self, '_' + command)(*args)
+            except Exception as e: #pylint:disable=broad-except
+                try:
+                    conn.send((e, None))
+                except Exception: #pylint:disable=broad-except
+                    # an exception might hold objects which cannot be pickled
+                    conn.send((RuntimeError(repr(e)), None))
+            else:
+                conn.send((None, output))
+        conn.close()
+
+    def _execute_for(self, name, descriptor):
+        unit = self.experiment[name]
+        dataset = unit.root_pipeline.dataset if unit.root_pipeline is not None else None
+        unit.execute_for(load_batch(descriptor, dataset))
+
+    def _call(self, name, iteration):
+        self.experiment[name](job=self.job, iteration=iteration, experiment=self.experiment)
+
+    def _put_result(self, name, iteration):
+        self.experiment[name].put_result(iteration)
+
+    def _dump_result(self, name, iteration):
+        self.experiment[name].dump_result(self.job.ids[self.index], iteration, name)
+
+    def _last_result(self, name, variable):
+        return self.experiment[name].get_last_result(variable)
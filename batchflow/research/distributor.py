@@ -28,13 +28,20 @@ class _DummyBar:
 
 class Distributor:
     """ Distributor of jobs between workers. """
-    def __init__(self, n_iters, workers, devices, worker_class=None, timeout=5, trials=2, logger=None):
+    def __init__(self, n_iters, workers, devices, worker_class=None, timeout=5, trials=2, logger=None,
+                 scheduler=None, warm=False):
         """
         Parameters
         ----------
         workers : int or list of Worker configs
 
         worker_class : Worker subclass or None
+
+        scheduler : Scheduler or None
+            a scheduler to decide which experiments to stop by metrics sent by workers
+
+        warm : bool
+            whether workers execute all jobs in one subprocess instead of creating it for each job
         """
         self.n_iters = n_iters
         self.workers = workers
@@ -43,6 +50,8 @@ class Distributor:
         self.timeout = timeout
         self.trials = trials
         self.logger = logger
+        self.scheduler = scheduler
+        self.warm = warm
 
         self.logfile = None
         self.errorfile = None
@@ -50,6 +59,7 @@ class Distributor:
         self.finished_jobs = None
         self.answers = None
         self.jobs_queue = None
+        self.control_queues = None
 
     def run(self, jobs_queue, bar=False):
         """ Run disributor and workers.
@@ -82,7 +92,8 @@ class Distributor:
                 worker_name=i,
                 timeout=self.timeout,
                 trials=self.trials,
-                logger=self.logger
+                logger=self.logger,
+                warm=self.warm
                 )
                        for i in range(self.workers)]
         else:
@@ -93,7 +104,8 @@ class Distributor:
                     timeout=self.timeout,
                     trials=self.trials,
                     logger=self.logger,
-                    worker_config=worker_config
+                    worker_config=worker_config,
+                    warm=self.warm
                     )
                 for i, worker_config in enumerate(self.workers)
             ]
@@ -108,9 +120,11 @@ class Distributor:
             else:
                 msg = 'Run {} worker'
             self.logger.info(msg.format(len(workers)))
+            self.control_queues = {worker.worker_name: mp.Queue() for worker in workers}
             for worker in workers:
                 try:
-                    mp.Process(target=worker, args=(self.jobs_queue, self.results)).start()
+                    mp.Process(target=worker, args=(self.jobs_queue, self.results,
+                                                    self.control_queues[worker.worker_name])).start()
                 except Exception as exception: #pylint:disable=broad-except
                     self.logger.error(exception)
             previous_domain_jobs = 0
@@ -132,6 +146,8 @@ class Distributor:
                                 total *= self.n_iters
                             progress.total = total
                         signal = self.results.get()
+                        if self.scheduler is not None and signal.metrics is not None:
+                            self._schedule(signal)
                         if self.n_iters is not None:
                             finished_iterations[signal.job] = signal.iteration
                         if signal.done:
@@ -164,9 +180,22 @@ class Distributor:
         self.logger.info('All workers have finished the work')
         logging.shutdown()
 
+    def _schedule(self, signal):
+        """ Pass metrics from a signal to the scheduler and stop experiments it rejects """
+        aliases = self.jobs_queue.aliases.get(signal.job)
+        for index, value in enumerate(signal.metrics):
+            if value is None or signal.exception[index] is not None or (signal.job, index) in self.scheduler.stopped:
+                continue
+            alias = aliases[index] if aliases is not None else None
+            if not self.scheduler.on_result((signal.job, index), signal.iteration + 1, value, alias):
+                self.logger.info('Scheduler stops experiment {} of job {} at iteration {}'
+                                 .format(index, signal.job, signal.iteration + 1))
+                self.control_queues[signal.worker].put((signal.job, index))
+
 class Signal:
     """ Class for feedback from jobs and workers """
-    def __init__(self, worker, job, iteration, n_iters, trial, done, exception, exec_actions=None, dump_actions=None):
+    def __init__(self, worker, job, iteration, n_iters, trial, done, exception, exec_actions=None, dump_actions=None,
+                 metrics=None):
         self.worker = worker
         self.job = job
         self.iteration = iteration
@@ -176,6 +205,7 @@ class Signal:
         self.exception = exception
         self.exec_actions = exec_actions
         self.dump_actions = dump_actions
+        self.metrics = metrics
 
     def __repr__(self):
         return str(self.__dict__)
@@ -6,11 +6,17 @@ from copy import copy, deepcopy
 import dill
 from ..named_expr import eval_expr
 from .. import Config, Pipeline, V, L
+from ..chunked import blosc
+from .results import dump_results, open_results
 
 class PipelineStopIteration(StopIteration):
     """ Special pipeline StopIteration exception """
     pass
 
+class ExperimentStopped(StopIteration):
+    """ Experiment was stopped by a scheduler """
+    pass
+
 class Executable:
     """ Function or pipeline
 
@@ -68,6 +74,7 @@ class Executable:
         self.last_update_time = None
 
         self._function = None
+        self._store = None
 
     def add_callable(self, function, *args, name='callable', execute=1, dump='last', returns=None,
                      on_root=False, logging=False, **kwargs):
@@ -185,6 +192,9 @@ class Executable:
         self.research_path = path
 
     def dump_config(self):
+        """ Pickle config into the `configs` folder unless it is kept in the config catalog of the research """
+        if blosc is not None:
+            return
         with open(os.path.join(self.research_path, 'configs', self.config.alias(as_string=True)), 'wb') as file:
             dill.dump(self.config, file)
 
@@ -271,15 +281,24 @@ class Executable:
                     self.result[variable].append(value)
             self.result['iteration'].append(iteration)
 
+    def get_last_result(self, variable=None):
+        """ Return the last value of a variable (by default, the first one) put into results or None """
+        if variable is None:
+            if len(self.variables) == 0:
+                return None
+            variable = self.variables[0]
+        values = self.result.get(variable)
+        return values[-1] if values else None
+
     def dump_result(self, task_id, iteration, filename):
         """ Dump pipeline results """
         if len(self.variables) > 0:
-            if not os.path.exists(os.path.join(self.research_path, self.experiment_path, task_id)):
-                os.makedirs(os.path.join(self.research_path, self.experiment_path, task_id))
+            path = os.path.join(self.research_path, self.experiment_path)
+            if blosc is not None and self._store is None:
+                # the storage is kept open, so that its metadata is not read for each dump
+                self._store = open_results(path, filename)
             self.result['sample_index'] = [task_id] * len(self.result['iteration'])
-            path = os.path.join(self.research_path, self.experiment_path, task_id, filename + '_' + str(iteration))
-            with open(path, 'wb') as file:
-                dill.dump(self.result, file)
+            dump_results(path, filename, iteration, self.result, self._store)
         self._clear_result()
 
     def create_folder(self):
@@ -6,15 +6,22 @@ import random
 
 from ..named_expr import eval_expr
 from .. import inbatch_parallel
+from .actors import BranchActor, SharedBatch
+from .executable import ExperimentStopped
 
 class Job:
     """ Contains one job. """
-    def __init__(self, executable_units, n_iters, configs, branches, research_path):
+    def __init__(self, executable_units, n_iters, configs, branches, research_path, branch_processes=False,
+                 metric=None):
         """
         Parameters
         ----------
         config : dict or Config
             config of experiment
+        branch_processes : bool
+            whether to execute experiments in separate processes (see :class:`~.BranchActor`)
+        metric : tuple or None
+            a unit name and a variable which values are sent to a scheduler
         """
         self.experiments = []
         self.executable_units = executable_units
@@ -22,6 +29,9 @@ class Job:
         self.configs = configs
         self.branches = branches
         self.research_path = research_path
+        self.branch_processes = branch_processes
+        self.metric = metric
+        self.actors = None
         self.worker_config = {}
         self.ids = [str(random.getrandbits(32)) for _ in self.configs]
 
@@ -60,6 +70,41 @@ class Job:
             self.experiments.append(units)
             self.exceptions.append(None)
         self.clear_stopped_list()
+        if self.branch_processes:
+            self.actors = [BranchActor(self, index) for index in range(len(self.experiments))]
+
+    def close(self):
+        """ Stop branch processes """
+        if self.actors is not None:
+            for actor in self.actors:
+                actor.close()
+            self.actors = None
+
+    def _send_to_actors(self, actions, command, *args, outputs=False):
+        """ Execute a command in processes of experiments which have actions and return their exceptions
+        (or outputs of the command if `outputs` is True) """
+        for actor, execute in zip(self.actors, actions):
+            if execute is not None:
+                actor.send(command, *args)
+        answers = [actor.recv() if execute is not None else (None, None)
+                   for actor, execute in zip(self.actors, actions)]
+        return [output if outputs else exception for exception, output in answers]
+
+    def stop_experiment(self, index):
+        """ Stop an experiment as if it has raised StopIteration """
+        if self.exceptions[index] is None:
+            self.exceptions[index] = ExperimentStopped('Experiment {} was stopped by scheduler'.format(index))
+            self.stopped[index] = True
+
+    def get_metrics(self, name, actions):
+        """ Return the last values of the scheduler metric for experiments executed at the current iteration """
+        if self.metric is None or self.metric[0] != name:
+            return None
+        variable = self.metric[1]
+        if self.actors is not None:
+            return self._send_to_actors(actions, 'last_result', name, variable, outputs=True)
+        return [experiment[name].get_last_result(variable) if execute is not None else None
+                for experiment, execute in zip(self.experiments, actions)]
 
     def clear_stopped_list(self):
         """ Clear list of stopped experiments for the current iteration """
@@ -104,8 +149,17 @@ class Job:
             if exception is not None:
                 self.exceptions[i] = exception
 
+    def _parallel_run(self, iteration, name, batch, actions):
+        if self.actors is not None:
+            # a root batch is written to shared memory once and read by all branch processes
+            with SharedBatch(batch) as shared:
+                exceptions = self._send_to_actors(actions, 'execute_for', name, shared.descriptor)
+            self.last_update_time.value = time.time()
+            return exceptions
+        return self._parallel_run_threads(iteration, name, batch, actions)
+
     @inbatch_parallel(init='_parallel_init_run', post='_parallel_post')
-    def _parallel_run(self, item, execute, iteration, name, batch, actions):
+    def _parallel_run_threads(self, item, execute, iteration, name, batch, actions):
         _ = name, actions, iteration
         if execute is not None:
             item.execute_for(batch)
@@ -116,9 +170,16 @@ class Job:
         #to_run = self._experiments_to_run(iteration, name)
         return [[experiment[name], execute] for experiment, execute in zip(self.experiments, actions)]
 
-    @inbatch_parallel(init='_parallel_init_call', post='_parallel_post')
-    def parallel_call(self, experiment, execute, iteration, name, actions):
+    def parallel_call(self, iteration, name, actions):
         """ Parallel call of the unit 'name' """
+        if self.actors is not None:
+            exceptions = self._send_to_actors(actions, 'call', name, iteration)
+            self.last_update_time.value = time.time()
+            return exceptions
+        return self._parallel_call_threads(iteration, name, actions)
+
+    @inbatch_parallel(init='_parallel_init_call', post='_parallel_post')
+    def _parallel_call_threads(self, experiment, execute, iteration, name, actions):
         _ = actions
         if execute is not None:
             experiment[name](job=self, iteration=iteration, experiment=experiment)
@@ -143,10 +204,24 @@ class Job:
 
     def put_all_results(self, iteration, name, actions):
         """ Add values of pipeline variables to results """
+        if self.actors is not None:
+            self.update_exceptions(self._send_to_actors(actions, 'put_result', name, iteration))
+            return
         for experiment, execute in zip(self.experiments, actions):
             if execute is not None:
                 experiment[name].put_result(iteration)
 
+    def dump_all_results(self, iteration, name, actions):
+        """ Dump results of experiments and return exceptions raised in branch processes """
+        if self.actors is not None:
+            exceptions = self._send_to_actors(actions, 'dump_result', name, iteration)
+            self.update_exceptions(exceptions)
+            return exceptions
+        for i, (experiment, execute) in enumerate(zip(self.experiments, actions)):
+            if execute is not None:
+                experiment[name].dump_result(self.ids[i], iteration, name)
+        return [None] * len(self.experiments)
+
     def get_actions(self, iteration, name, action='execute'):
         """ Experiments that should be executed """
         res = []
@@ -13,11 +13,12 @@ import numpy as np
 import pandas as pd
 import multiprocess as mp
 
-from .results import Results
+from .results import Results, dump_configs
 from .distributor import Distributor
 from .workers import PipelineWorker
 from .domain import Domain, Option, ConfigAlias
 from .job import Job
+from .actors import check_shared_memory
 from .logger import BaseLogger, FileLogger, PrintLogger, TelegramLogger
 from .utils import get_metrics
 from .executable import Executable
@@ -38,6 +39,8 @@ class Research:
         self.domain = None
         self.n_iters = None
         self.timeout = 5
+        self.branch_processes = False
+        self.warm_workers = False
         self.n_configs = None
         self.n_reps = None
         self.n_configs = None
@@ -48,6 +51,7 @@ class Research:
         self._update_config = None
         # update parameters for domain. None or dict with keys (function, each)
         self._update_domain = None
+        self.scheduler = None
         self.n_updates = 0
 
     def add_pipeline(self, root, branch=None, dataset=None, variables=None,
@@ -252,6 +256,20 @@ class Research:
         self.n_updates = n_updates
         return self
 
+    def add_scheduler(self, scheduler):
+        """ Add a scheduler which stops unpromising experiments early.
+
+        Parameters
+        ----------
+        scheduler : Scheduler
+            a scheduler (e.g. :class:`~.ASHA`) which receives values of its metric each time
+            the corresponding unit is executed and decides which experiments to stop.
+            Stopped experiments are finished as if they have raised StopIteration,
+            so their workers take next configs from the domain at once.
+        """
+        self.scheduler = scheduler
+        return self
+
     def update_config(self, function, parameters=None, cache=0):
         """ Add function to update config from domain.
 
@@ -313,7 +331,8 @@ class Research:
         return Results(self.name, *args, **kwargs)
 
     def run(self, n_iters=None, workers=1, branches=1, name=None,
-            bar=False, devices=None, worker_class=None, timeout=5, trials=2):
+            bar=False, devices=None, worker_class=None, timeout=5, trials=2, branch_processes=False,
+            warm_workers=False):
         """ Run research.
 
         Parameters
@@ -352,6 +371,18 @@ class Research:
             each job will be killed if it doesn't answer more then that time in minutes
         trials : int
             trials to execute job
+        branch_processes : bool
+            If False, branches of a job are executed in threads of the job process.
+
+            If True, each branch is executed in its own process, while batches from `root` are prepared
+            once in the job process and passed to branches through shared memory. Thus branches
+            do not compete for the GIL. Callables executed on root are not supported in this mode.
+        warm_workers : bool
+            If False, each worker creates a new subprocess for each job.
+
+            If True, each worker executes jobs one after another in the same subprocess, which is
+            restarted only after a crash or a timeout. It saves time of process creation and imports
+            (e.g. of a deep learning framework) when there are many short jobs.
 
         **How does it work**
 
@@ -374,10 +405,17 @@ class Research:
             self.worker_class = worker_class or PipelineWorker
             self.timeout = timeout
             self.trials = trials
+            self.branch_processes = branch_processes
+            self.warm_workers = warm_workers
 
         self.name = name or self.name
         self.bar = bar
 
+        if self.branch_processes:
+            check_shared_memory()
+            if any(unit.on_root for unit in self.executables.values()):
+                raise ValueError('Callables executed on root are not supported with branch_processes=True')
+
         if self.domain is None:
             self.init_domain()
 
@@ -395,10 +433,11 @@ class Research:
         print("Research {} is starting...".format(self.name))
 
         jobs_queue = DynamicQueue(self.branches, self.domain, self.n_iters, self.executables,
-                                  self.name, self._update_config, self._update_domain, self.n_updates)
+                                  self.name, self._update_config, self._update_domain, self.n_updates,
+                                  self.branch_processes, self.scheduler.metric if self.scheduler is not None else None)
         self.logger.eval_kwargs(path=self.name)
         distr = Distributor(self.n_iters, self.workers, self.devices, self.worker_class, self.timeout,
-                            self.trials, self.logger)
+                            self.trials, self.logger, self.scheduler, self.warm_workers)
         distr.run(jobs_queue, bar=self.bar)
 
         return self
@@ -501,12 +540,16 @@ class Research:
 
 class DynamicQueue:
     """ Queue of tasks that can be changed depending on previous results. """
-    def __init__(self, branches, domain, n_iters, executables, research_path, update_config, update_domain, n_updates):
+    def __init__(self, branches, domain, n_iters, executables, research_path, update_config, update_domain, n_updates,
+                 branch_processes=False, metric=None):
         self.branches = branches
         self.domain = domain
         self.n_iters = n_iters
         self.executables = executables
         self.research_path = research_path
+        self.branch_processes = branch_processes
+        self.metric = metric
+        self.aliases = {}
 
         if update_config is not None and update_config['cache'] > 0:
             update_config['function'] = lru_cache(maxsize=update_config['cache'])(update_config['function'])
@@ -589,9 +632,16 @@ class DynamicQueue:
                 if len(branch_tasks) > 0:
                     configs.append(branch_tasks)
                 break
+        # configs are added to the catalog here as experiments are created by several workers
+        dump_configs(self.research_path, [config_from_domain + config_from_func
+                                          for branch_tasks in configs
+                                          for config_from_domain, config_from_func in branch_tasks])
         for i, config in enumerate(configs):
+            self.aliases[self.generated_jobs + i] = [(config_from_domain + config_from_func).alias(as_string=True)
+                                                     for config_from_domain, config_from_func in config]
             self.put((self.generated_jobs + i,
-                      Job(self.executables, self.n_iters, config, self.branches, self.research_path)))
+                      Job(self.executables, self.n_iters, config, self.branches, self.research_path,
+                          self.branch_processes, self.metric)))
 
         n_tasks = len(configs)
         self.generated_jobs += n_tasks
@@ -1,12 +1,112 @@
 """ Research results class """
 
 import os
+from copy import deepcopy
 from collections import OrderedDict
 import glob
 import json
 import dill
+import numpy as np
 import pandas as pd
 
+from ..chunked import ChunkedStore, blosc
+
+
+# results of a unit are appended to a columnar storage in a folder `<unit><STORE_SUFFIX>` of an experiment folder
+STORE_SUFFIX = '.chunked'
+# configs of all experiments are appended to a columnar storage in a folder of a research
+CATALOG_NAME = 'configs' + STORE_SUFFIX
+
+
+def _to_column(values):
+    """ Make an array from values of a variable: a plain array for scalars or an object array otherwise """
+    if all(np.ndim(value) == 0 and value is not None for value in values):
+        column = np.asarray(values)
+        if column.dtype.kind in 'biufcU':
+            return column
+    column = np.empty(len(values), dtype=object)
+    for i, value in enumerate(values):
+        column[i] = value
+    return column
+
+
+def _equal(first, second):
+    """ Compare option values which might be lists or arrays """
+    try:
+        return bool(np.all(first == second))
+    except ValueError:
+        return False
+
+
+def open_results(path, unit):
+    """ Open a storage of results of a unit in an experiment folder for appending
+
+    Records of new chunks are logged (see :class:`~.ChunkedStore`), so a storage which is kept open
+    between dumps appends each of them in constant time.
+    """
+    return ChunkedStore(os.path.join(path, unit + STORE_SUFFIX), mode='a', log_meta=True)
+
+
+def dump_results(path, unit, iteration, result, store=None):
+    """ Append results of a unit to an experiment folder
+
+    Rows are appended to a :class:`~.ChunkedStore` if blosc is installed,
+    otherwise they are pickled into a new file for each dump.
+
+    Parameters
+    ----------
+    path : str
+        an experiment folder.
+    unit : str
+        a unit name.
+    iteration : int
+        the number of iterations done.
+    result : dict
+        variable names as keys and lists of values as values, including `iteration` and `sample_index`.
+    store : ChunkedStore or None
+        a storage opened with :func:`open_results` to reuse. If None, it is opened for this dump only.
+    """
+    if blosc is None:
+        sample_path = os.path.join(path, result['sample_index'][0])
+        if not os.path.exists(sample_path):
+            os.makedirs(sample_path)
+        with open(os.path.join(sample_path, unit + '_' + str(iteration)), 'wb') as file:
+            dill.dump(result, file)
+        return
+
+    n_rows = len(result['iteration'])
+    columns = {name: _to_column(list(values) + [None] * (n_rows - len(values)))
+               for name, values in result.items()}
+    store = store or open_results(path, unit)
+    # each dump is kept in one chunk
+    store.chunk_size = max(n_rows, 1)
+    store.append(columns)
+
+
+def dump_configs(path, configs):
+    """ Append configs of experiments to the config catalog of a research
+
+    The catalog is a :class:`~.ChunkedStore` with columns `alias` (a name of an experiment folder),
+    `repetition`, `update` and `config`. If blosc is not installed, nothing is dumped
+    and each experiment pickles its config into the `configs` folder instead.
+
+    Parameters
+    ----------
+    path : str
+        a research folder.
+    configs : list of ConfigAlias
+        configs of experiments.
+    """
+    if blosc is None or len(configs) == 0:
+        return
+    values = [dict(config.config().items()) for config in configs]
+    columns = dict(alias=_to_column([config.alias(as_string=True) for config in configs]),
+                   repetition=_to_column([value.get('repetition') for value in values]),
+                   update=_to_column([value.get('update') for value in values]),
+                   config=_to_column(configs))
+    ChunkedStore(os.path.join(path, CATALOG_NAME), mode='a', chunk_size=len(configs)).append(columns)
+
+
 class Results:
     """ Class for dealing with results of research
 
@@ -81,9 +181,17 @@ class Results:
     def __init__(self, path, *args, **kwargs):
         self.path = path
         self.description = self._get_description()
+        self.catalog = self._load_catalog()
         self.configs = None
         self.df = self._load(*args, **kwargs)
 
+    def load(self, *args, **kwargs):
+        """ Load another slice of results (see :class:`.Results` for parameters)
+
+        The config catalog read at initialization is reused, so only results of matching configs are read.
+        """
+        return self._load(*args, **kwargs)
+
     def _get_list(self, value):
         if not isinstance(value, list):
             value = [value]
@@ -132,31 +240,80 @@ class Results:
             if len(value) < max_len:
                 value.extend([pd.np.nan] * (max_len - len(value)))
 
+    def _load_catalog(self):
+        """ Return a dataframe with a row for each experiment: its alias, repetition, update and config
+
+        Configs are read from the config catalog of a research or, for researches without it,
+        from separate files. Values and aliases of config options are kept in :attr:`.values`
+        and :attr:`.aliases` dataframes with the same index, so that configs are filtered with vectorized lookups.
+        """
+        catalog_path = os.path.join(self.path, CATALOG_NAME)
+        if os.path.exists(os.path.join(catalog_path, ChunkedStore.META_FILE)):
+            configs = list(ChunkedStore(catalog_path, mode='r').read_chunks(components=['config'])['config'])
+        else:
+            configs = []
+            for filename in sorted(glob.glob(os.path.join(self.path, 'configs', '*'))):
+                with open(filename, 'rb') as f:
+                    configs.append(dill.load(f))
+
+        values = [dict(config.config().items()) for config in configs]
+        catalog = pd.DataFrame({'alias': [config.alias(as_string=True) for config in configs],
+                                'repetition': [value.get('repetition') for value in values],
+                                'update': [value.get('update') for value in values],
+                                'config': pd.Series(configs, dtype=object)})
+        keep = ~catalog['alias'].duplicated().values
+        catalog = catalog[keep].reset_index(drop=True)
+        self.values = pd.DataFrame([value for value, kept in zip(values, keep) if kept], index=catalog.index)
+        self.aliases = pd.DataFrame([config.alias() for config in catalog['config']], index=catalog.index)
+        return catalog
+
     def _filter_configs(self, config=None, alias=None, repetition=None):
-        result = None
+        """ Return configs from the catalog which match given option values or aliases and repetition """
         if config is None and alias is None and repetition is None:
             raise ValueError('At least one of parameters config, alias and repetition must be not None')
-        result = []
+
+        mask = np.ones(len(self.catalog), dtype=bool)
         if repetition is not None:
-            repetition = {'repetition': repetition}
+            mask &= (self.catalog['repetition'] == repetition).values
+        frame, items = (self.values, config) if config is not None else (self.aliases, alias or dict())
+        for key, value in items.items():
+            if key not in frame:
+                return []
+            if pd.api.types.is_scalar(value):
+                mask &= (frame[key] == value).values
+            else:
+                # pandas compares list-like values elementwise, while options might be lists themselves
+                mask &= np.array([_equal(item, value) for item in frame[key]], dtype=bool)
+        return list(self.catalog['config'][mask])
+
+    def _load_store(self, path, iterations, variables, sample_index=None):
+        """ Read rows of requested iterations and samples from a columnar storage of a unit """
+        store = ChunkedStore(path, mode='r')
+        iterations = [item for item in iterations if item is not None]
+        if len(iterations) > 0:
+            chunks = store.find_chunks('iteration', min(iterations), max(iterations))
         else:
-            repetition = dict()
+            chunks = list(range(len(store.meta['chunks'])))
+        if len(chunks) == 0:
+            return None
 
-        if config is None and alias is None:
-            config = dict()
+        index = store.read_chunks(chunks, ['iteration', 'sample_index'])
+        mask = np.ones(len(index['iteration']), dtype=bool)
+        if len(iterations) > 0:
+            mask &= np.isin(index['iteration'], iterations)
+        if sample_index is not None:
+            mask &= index['sample_index'].astype(str) == str(sample_index)
+        if not mask.any():
+            return None
 
-        for supconfig in self.configs:
-            if config is not None:
-                config.update(repetition)
-                _config = supconfig.config()
-                if all(item in _config.items() for item in config.items()):
-                    result.append(supconfig)
-            else:
-                _config = supconfig.alias()
-                alias.update(repetition)
-                if all(item in _config.items() for item in alias.items()):
-                    result.append(supconfig)
-        self.configs = result
+        stored = [variable for variable in variables if variable in store.components]
+        data = store.read_chunks(chunks, stored)
+        res = OrderedDict()
+        for variable in variables:
+            res[variable] = list(data[variable][mask]) if variable in data else [np.nan] * int(mask.sum())
+        res['iteration'] = list(index['iteration'][mask])
+        res['sample_index'] = list(index['sample_index'][mask])
+        return res
 
     def _get_description(self):
         with open(os.path.join(self.path, 'description', 'research.json'), 'r') as file:
@@ -164,10 +321,7 @@ class Results:
 
     def _load(self, names=None, variables=None, iterations=None, repetition=None, sample_index=None,
               configs=None, aliases=None, use_alias=True, concat_config=False, drop_columns=True, **kwargs):
-        self.configs = []
-        for filename in glob.glob(os.path.join(self.path, 'configs', '*')):
-            with open(filename, 'rb') as f:
-                self.configs.append(dill.load(f))
+        self.configs = list(self.catalog['config'])
 
         if len(kwargs) > 0:
             if configs is None:
@@ -176,11 +330,11 @@ class Results:
                 configs.update(kwargs)
 
         if configs is not None:
-            self._filter_configs(config=configs, repetition=repetition)
+            self.configs = self._filter_configs(config=configs, repetition=repetition)
         elif aliases is not None:
-            self._filter_configs(alias=aliases, repetition=repetition)
+            self.configs = self._filter_configs(alias=aliases, repetition=repetition)
         elif repetition is not None:
-            self._filter_configs(repetition=repetition)
+            self.configs = self._filter_configs(repetition=repetition)
 
         if names is None:
             names = list(self.description['executables'].keys())
@@ -197,38 +351,50 @@ class Results:
 
         all_results = []
         for config_alias in self.configs:
+            # configs are kept in the catalog, while options are popped out of them below
+            config_alias = deepcopy(config_alias)
             alias_str = config_alias.alias(as_string=True)
             _repetition = config_alias.pop_config('repetition')
             _update = config_alias.pop_config('update')
             path = os.path.join(self.path, 'results', alias_str)
 
             for unit in names:
-                sample_folders = glob.glob(os.path.join(glob.escape(path), sample_index or '*'))
-                for sample_folder in sample_folders:
-                    files = glob.glob(glob.escape(os.path.join(sample_folder, unit)) + '_[0-9]*')
-                    files = self._sort_files(files, iterations)
-                    if len(files) != 0:
-                        res = []
-                        for filename, iterations_to_load in files.items():
-                            with open(filename, 'rb') as file:
-                                res.append(self._slice_file(dill.load(file), iterations_to_load, variables))
-                        res = self._concat(res, variables)
-                        self._fix_length(res)
-
-                        config_alias.pop_config('_dummy')
-                        if concat_config:
-                            res['config'] = config_alias.alias(as_string=True)
-                        if use_alias:
-                            if not concat_config or not drop_columns:
-                                res.update(config_alias.alias(as_string=False))
-                        else:
-                            res.update(config_alias.config())
-                        res.update({'repetition': _repetition.config()['repetition']})
-                        res.update({'update': _update.config()['update']})
-                        all_results.append(
-                            pd.DataFrame({
-                                'name': unit,
-                                **res
-                            })
-                            )
+                unit_results = []
+                store_path = os.path.join(path, unit + STORE_SUFFIX)
+                if os.path.exists(os.path.join(store_path, ChunkedStore.META_FILE)):
+                    res = self._load_store(store_path, iterations, variables, sample_index)
+                    if res is not None:
+                        unit_results.append(res)
+                else:
+                    # results dumped as separate files
+                    sample_folders = glob.glob(os.path.join(glob.escape(path), sample_index or '*'))
+                    for sample_folder in sample_folders:
+                        files = glob.glob(glob.escape(os.path.join(sample_folder, unit)) + '_[0-9]*')
+                        files = self._sort_files(files, iterations)
+                        if len(files) != 0:
+                            res = []
+                            for filename, iterations_to_load in files.items():
+                                with open(filename, 'rb') as file:
+                                    res.append(self._slice_file(dill.load(file), iterations_to_load, variables))
+                            res = self._concat(res, variables)
+                            self._fix_length(res)
+                            unit_results.append(res)
+
+                for res in unit_results:
+                    config_alias.pop_config('_dummy')
+                    if concat_config:
+                        res['config'] = config_alias.alias(as_string=True)
+                    if use_alias:
+                        if not concat_config or not drop_columns:
+                            res.update(config_alias.alias(as_string=False))
+                    else:
+                        res.update(config_alias.config())
+                    res.update({'repetition': _repetition.config()['repetition']})
+                    res.update({'update': _update.config()['update']})
+                    all_results.append(
+                        pd.DataFrame({
+                            'name': unit,
+                            **res
+                        })
+                        )
         return pd.concat(all_results, sort=False).reset_index(drop=True) if len(all_results) > 0 else pd.DataFrame(None)
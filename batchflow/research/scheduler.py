@@ -0,0 +1,140 @@
+""" Schedulers which stop unpromising experiments of research early. """
+
+import numpy as np
+import pandas as pd
+
+
+class Scheduler:
+    """ Base scheduler: collects metrics streamed from running experiments and lets all of them continue.
+
+    Values of a metric are sent by workers each time the unit is executed, so the decision
+    is made while experiments are running and no worker waits for others.
+
+    Parameters
+    ----------
+    metric : str
+        a variable of a pipeline or an output of a callable to watch in the form ``'unit_name/variable'``.
+        For a callable with one output ``'unit_name'`` might be used. Its values should be scalars.
+    mode : 'max' or 'min'
+        whether higher or lower values of the metric are better.
+
+    Attributes
+    ----------
+    results : pandas.DataFrame
+        all received values with columns `job`, `experiment`, `alias`, `iteration` and `value`.
+    """
+    def __init__(self, metric, mode='max'):
+        if mode not in ('max', 'min'):
+            raise ValueError("mode should be 'max' or 'min', but given %s" % mode)
+        unit, _, variable = metric.partition('/')
+        self.metric = unit, variable or None
+        self.mode = mode
+        self._history = []
+        self.stopped = set()
+
+    def _sign(self, value):
+        return value if self.mode == 'max' else -value
+
+    def on_result(self, experiment, iteration, value, alias=None):
+        """ Receive a value of the metric
+
+        Parameters
+        ----------
+        experiment : tuple
+            an experiment id: an index of a job and an index of an experiment in the job.
+        iteration : int
+            the number of iterations done by the experiment.
+        value : float
+            a value of the metric.
+        alias : str or None
+            an alias of the experiment config.
+
+        Returns
+        -------
+        bool
+            whether the experiment should continue.
+        """
+        self._history.append((*experiment, alias, iteration, value))
+        if experiment in self.stopped:
+            return False
+        if not self.should_continue(experiment, iteration, value):
+            self.stopped.add(experiment)
+            return False
+        return True
+
+    def should_continue(self, experiment, iteration, value):
+        """ Decide whether an experiment should continue after a new value of the metric """
+        _ = experiment, iteration, value
+        return True
+
+    @property
+    def results(self):
+        """ pandas.DataFrame : received values of the metric """
+        return pd.DataFrame(self._history, columns=['job', 'experiment', 'alias', 'iteration', 'value'])
+
+    def best(self, n=1):
+        """ Return the last values of the metric for `n` best experiments """
+        last = self.results.groupby(['job', 'experiment']).last()
+        return last.sort_values('value', ascending=self.mode == 'min').head(n)
+
+
+class ASHA(Scheduler):
+    """ Asynchronous successive halving.
+
+    Rungs are placed at ``min_iters * eta ** k`` iterations. When an experiment reaches a rung,
+    its metric is compared with those of experiments which have reached the rung before,
+    and the experiment is stopped unless it is within the top ``1 / eta`` of them.
+    Decisions are made as soon as a value is received, so there are no barriers between rungs:
+    freed workers immediately take the next configs from the domain.
+
+    Parameters
+    ----------
+    metric : str
+        see :class:`.Scheduler`.
+    mode : 'max' or 'min'
+        see :class:`.Scheduler`.
+    min_iters : int
+        the number of iterations at the first rung.
+    eta : int
+        a reduction factor: roughly one of `eta` experiments is promoted to the next rung.
+    max_iters : int or None
+        no rungs are placed after that number of iterations.
+
+    Examples
+    --------
+    ::
+
+        research.add_scheduler(ASHA('test_accuracy', mode='max', min_iters=100, eta=3))
+    """
+    def __init__(self, metric, mode='max', min_iters=1, eta=3, max_iters=None):
+        super().__init__(metric, mode)
+        if eta < 2:
+            raise ValueError('eta should be at least 2, but given %s' % eta)
+        if min_iters < 1:
+            raise ValueError('min_iters should be at least 1, but given %s' % min_iters)
+        self.min_iters = min_iters
+        self.eta = eta
+        self.max_iters = max_iters
+        self._rungs = {}
+
+    def _get_rungs(self, iteration):
+        """ Return rungs reached at a given iteration """
+        rung, rungs = self.min_iters, []
+        while rung <= iteration and (self.max_iters is None or rung < self.max_iters):
+            rungs.append(rung)
+            rung *= self.eta
+        return rungs
+
+    def should_continue(self, experiment, iteration, value):
+        value = self._sign(value)
+        for rung in self._get_rungs(iteration):
+            recorded = self._rungs.setdefault(rung, {})
+            if experiment in recorded:
+                continue
+            recorded[experiment] = value
+            values = np.array(list(recorded.values()), dtype=float)
+            if len(values) >= self.eta:
+                cutoff = np.nanpercentile(values, 100 * (1 - 1 / self.eta))
+                if np.isnan(value) or value < cutoff:
+                    return False
+        return True
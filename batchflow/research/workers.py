@@ -10,12 +10,22 @@ import psutil
 from .distributor import Signal
 from .executable import PipelineStopIteration
 
+class _PipeFeedback:
+    """ Send signals from a job over a pipe with the interface of a queue """
+    def __init__(self, conn):
+        self.conn = conn
+
+    def put(self, signal):
+        self.conn.send(signal)
+
+
 class Worker:
     """ Worker that creates subprocess to execute job.
     Worker get queue of jobs, pop one job and execute it in subprocess. That subprocess
     call init, main and post class methods.
     """
-    def __init__(self, devices, worker_name=None, worker_config=None, timeout=5, trials=2, logger=None):
+    def __init__(self, devices, worker_name=None, worker_config=None, timeout=5, trials=2, logger=None,
+                 warm=False):
         """
         Parameters
         ----------
@@ -29,6 +39,11 @@ class Worker:
 
         worker_config : dict or str
             additional config for pipelines in worker
+        warm : bool
+            If False, a new subprocess is created for each job.
+
+            If True, one subprocess executes jobs one after another, so that imports and initialization
+            are done once. It is restarted only after a crash or a timeout.
         args, kwargs
             will be used in init, post and main
         """
@@ -45,16 +60,20 @@ class Worker:
         self.timeout = timeout
         self.trials = trials
         self.logger = logger
+        self.warm = warm
 
         self.job = None
         self.finished_iterations = None
         self.queue = None
         self.feedback_queue = None
+        self.control_queue = None
         self.trial = 3
         self.worker = None
         self.device_configs = None
 
         self.last_update_time = None
+        self._process = None
+        self._conn = None
 
     def init(self):
         """ Run before main. """
@@ -66,7 +85,7 @@ class Worker:
         """ Main part of the worker. """
 
 
-    def __call__(self, queue, results):
+    def __call__(self, queue, results, control=None):
         """ Run worker.
 
         Parameters
@@ -75,9 +94,15 @@ class Worker:
             queue of jobs for worker
         results : multiprocessing.Queue
             queue for feedback
+        control : multiprocessing.Queue or None
+            queue of (job index, experiment index) pairs of experiments to stop
         """
+        self.control_queue = control
         _devices = [item['device'] for item in self.devices]
         self.logger.info('Start {} [id:{}] (devices: {})'.format(self.worker_name, os.getpid(), _devices))
+        if self.warm:
+            self._run_warm(queue, results)
+            return
 
         try:
             job = queue.get()
@@ -126,7 +151,7 @@ class Worker:
                             break
                 except Exception as exception: #pylint:disable=broad-except
                     self.logger.error(exception)
-                    final_signal.exception = exception
+                    final_signal.trial, final_signal.exception = trial, exception
                     results.put(copy(final_signal))
                 if final_signal.done:
                     results.put(copy(final_signal))
@@ -141,31 +166,131 @@ class Worker:
 
 
     def _run_task(self, queue, feedback_queue, trial, last_update_time):
-        exception = None
-        try:
-            self.feedback_queue = feedback_queue
-            self.trial = trial
-            self.last_update_time = last_update_time
+        self.feedback_queue = feedback_queue
+        self.trial = trial
+        self.last_update_time = last_update_time
 
-            feedback_queue.put(os.getpid())
-            self.job = queue.get()
+        feedback_queue.put(os.getpid())
+        self.job = queue.get()
+        self.feedback_queue.put(self._execute_job())
+        queue.task_done()
 
+    def _execute_job(self):
+        """ Execute `self.job` and return the final signal """
+        exception = None
+        try:
             self.logger.info(
                 'Job {} was started in subprocess [id:{}] by {}'.format(self.job[0], os.getpid(), self.worker_name)
             )
             self.init()
             self.main()
-            self.post()
         except Exception as e: #pylint:disable=broad-except
             exception = e
             self.logger.error(exception)
+        finally:
+            # a failed job is closed as well, otherwise its branch processes outlive it in a warm subprocess
+            try:
+                self.post()
+            except Exception as e: #pylint:disable=broad-except
+                exception = exception or e
+                self.logger.error(e)
         self.logger.info('Job {} [{}] was finished by {}'.format(self.job[0], os.getpid(), self.worker_name))
-        signal = Signal(worker=self.worker_name, job=self.job[0], iteration=self.finished_iterations,
-                        n_iters=self.job[1].n_iters, trial=self.trial, done=True,
-                        exception=[exception]*len(self.job[1].experiments))
-        self.feedback_queue.put(signal)
+        return Signal(worker=self.worker_name, job=self.job[0], iteration=self.finished_iterations,
+                      n_iters=self.job[1].n_iters, trial=self.trial, done=True,
+                      exception=[exception]*len(self.job[1].experiments))
+
+    def _run_warm(self, queue, results):
+        """ Execute jobs in one subprocess which is restarted only after a crash or a timeout """
+        job = queue.get()
+        while job is not None:
+            self.logger.info(self.worker_name + ' is sending Job ' + str(job[0]) + ' to its subprocess')
+            final_signal = Signal(worker=self.worker_name, job=job[0], iteration=0, n_iters=job[1].n_iters,
+                                  trial=0, done=False, exception=None)
+            for trial in range(self.trials):
+                try:
+                    if self._process is None or not self._process.is_alive():
+                        self._start_process()
+                    self._conn.send((job, trial))
+                    final_signal = self._supervise(job, trial, results)
+                except Exception as exception: #pylint:disable=broad-except
+                    # e.g. a job cannot be pickled or a subprocess cannot be started
+                    self.logger.error(exception)
+                    final_signal.trial, final_signal.exception = trial, exception
+                    results.put(copy(final_signal))
+                if final_signal.done:
+                    break
+                self._stop_process(terminate=True)
+            if not final_signal.done:
+                final_signal.exception = RuntimeError('Job {} failed {} times in {}'
+                                                      .format(job[0], self.trials, self.worker_name))
+                final_signal.done = True
+            results.put(copy(final_signal))
+            queue.task_done()
+            job = queue.get()
+        self._stop_process()
         queue.task_done()
 
+    def _start_process(self):
+        self.last_update_time = mp.Value('d', time.time())
+        self._conn, child_conn = mp.Pipe()
+        self._process = mp.Process(target=self._serve, args=(child_conn, self.last_update_time))
+        self._process.start()
+        child_conn.close()
+        self.logger.info('{} has started subprocess [id:{}]'.format(self.worker_name, self._process.pid))
+
+    def _stop_process(self, terminate=False):
+        if self._process is not None:
+            if terminate:
+                self._process.terminate()
+            elif self._process.is_alive():
+                self._conn.send(None)
+            self._process.join()
+            self._conn.close()
+            self._process, self._conn = None, None
+
+    def _serve(self, conn, last_update_time):
+        """ Execute jobs received from the worker until None is received """
+        self._conn.close()
+        self.feedback_queue = _PipeFeedback(conn)
+        self.last_update_time = last_update_time
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            self.job, self.trial = message
+            conn.send(self._execute_job())
+        conn.close()
+
+    def _supervise(self, job, trial, results):
+        """ Pass signals of a job to `results` until it is done, crashed or timed out, and return the last one """
+        pid = self._process.pid
+        final_signal = Signal(worker=self.worker_name, job=job[0], iteration=0, n_iters=job[1].n_iters,
+                              trial=trial, done=False, exception=None)
+        self.last_update_time.value = time.time()
+        while True:
+            # the pipe is waited for until the job is considered to be timed out, so that nothing is polled
+            remaining = self.last_update_time.value + 60 * self.timeout - time.time()
+            try:
+                signal = self._conn.recv() if remaining > 0 and self._conn.poll(remaining) else None
+            except EOFError:
+                message = 'Job {} [{}] crashed in {}'.format(job[0], pid, self.worker_name)
+                self.logger.info(message)
+                final_signal.exception = RuntimeError(message)
+                results.put(copy(final_signal))
+                return final_signal
+            if signal is None:
+                if (time.time() - self.last_update_time.value) / 60 > self.timeout:
+                    message = 'Job {} [{}] failed in {}'.format(job[0], pid, self.worker_name)
+                    self.logger.info(message)
+                    final_signal.exception = TimeoutError(message)
+                    results.put(copy(final_signal))
+                    return final_signal
+                continue
+            final_signal = signal
+            if signal.done:
+                return final_signal
+            results.put(copy(final_signal))
+
 
 class PipelineWorker(Worker):
     """ Worker that run pipelines. """
@@ -182,7 +307,22 @@ class PipelineWorker(Worker):
 
     def post(self):
         """ Run after job execution. """
-        pass #pylint:disable=unnecessary-pass
+        _, job = self.job
+        job.close()
+
+    def _receive_stops(self, idx_job, job):
+        """ Stop experiments of the current job which were stopped by a scheduler """
+        if self.control_queue is None:
+            return
+        while True:
+            try:
+                stopped_job, index = self.control_queue.get_nowait()
+            except EmptyException:
+                break
+            if stopped_job == idx_job:
+                self.logger.info("J {} [{}]: experiment [{}] was stopped by scheduler"
+                                 .format(idx_job, os.getpid(), index))
+                job.stop_experiment(index)
 
     def _execute_on_root(self, base_unit, iteration):
         _, job = self.job
@@ -196,6 +336,7 @@ class PipelineWorker(Worker):
         self.finished_iterations = iteration
         while (job.n_iters is None or iteration < job.n_iters) and job.alive_experiments() > 0:
             job.clear_stopped_list() # list with flags for each experiment
+            self._receive_stops(idx_job, job)
             for unit_name, base_unit in job.executable_units.items():
                 exec_actions = job.get_actions(iteration, unit_name) # for each experiment is None if experiment mustn't
                                                                      # be executed for that iteration and dict else
@@ -237,21 +378,28 @@ class PipelineWorker(Worker):
                             self.logger.info(message)
                         job.stopped[i] = True
 
+                metrics = job.get_metrics(unit_name, exec_actions)
+
                 # dump results
                 dump_actions = job.get_actions(iteration, unit_name, action='dump')
-                for i, experiment in enumerate(job.experiments):
-                    if dump_actions[i] is not None:
+                for i, action in enumerate(dump_actions):
+                    if action is not None:
                         messages.append("J {} [{}] I {}: dump '{}' [{}]"
                                         .format(idx_job, os.getpid(), iteration+1, unit_name, i))
-                        experiment[unit_name].dump_result(job.ids[i], iteration+1, unit_name)
+                dump_exceptions = job.dump_all_results(iteration+1, unit_name, dump_actions)
+                for i, exception in enumerate(dump_exceptions):
+                    if exception is not None:
+                        self.logger.info("J {} [{}] I {}: '{}' [{}]: dump failed with exception {}"
+                                         .format(idx_job, os.getpid(), iteration+1, unit_name, i, repr(exception)))
+                        self.logger.error(exception)
 
                 if base_unit.logging:
                     for message in messages:
                         self.logger.info(message)
                 job.update_exceptions(exceptions)
-                signal = Signal(worker=self.worker, job=idx_job, iteration=iteration, n_iters=job.n_iters,
+                signal = Signal(worker=self.worker_name, job=idx_job, iteration=iteration, n_iters=job.n_iters,
                                 trial=self.trial, done=False, exception=job.exceptions, exec_actions=exec_actions,
-                                dump_actions=dump_actions)
+                                dump_actions=dump_actions, metrics=metrics)
                 self.feedback_queue.put(signal)
             iteration += 1
             self.finished_iterations = iteration
@@ -0,0 +1,75 @@
+""" Test concurrent reading of files """
+# pylint: disable=missing-docstring, redefined-outer-name
+import threading
+
+import dill
+import numpy as np
+import pytest
+
+from batchflow import Batch, FilesIndex
+from batchflow.aio import read_files
+from batchflow.pools import PoolRegistry
+
+
+N_ITEMS = 10
+
+
+@pytest.fixture
+def files(tmp_path):
+    paths = []
+    for i in range(N_ITEMS):
+        path = tmp_path / ('%d.bin' % i)
+        path.write_bytes(bytes([i]) * (i + 1))
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize('max_in_flight', [None, 1, 3])
+def test_read_files(files, max_in_flight):
+    contents = read_files(files, max_in_flight)
+    assert contents == [bytes([i]) * (i + 1) for i in range(N_ITEMS)]
+
+
+def test_read_files_in_flight(files, monkeypatch):
+    import batchflow.aio as aio     # pylint: disable=import-outside-toplevel
+    lock, state = threading.Lock(), dict(current=0, max=0)
+    read_bytes = aio._read_bytes    # pylint: disable=protected-access
+
+    def _read_bytes(path):
+        with lock:
+            state['current'] += 1
+            state['max'] = max(state['max'], state['current'])
+        try:
+            return read_bytes(path)
+        finally:
+            with lock:
+                state['current'] -= 1
+    monkeypatch.setattr(aio, '_read_bytes', _read_bytes)
+
+    read_files(files, max_in_flight=2, pools=PoolRegistry())
+    assert 1 <= state['max'] <= 2
+
+
+def test_read_files_missing(files):
+    with pytest.raises(OSError):
+        read_files(files + [files[0] + '.missing'])
+
+
+@pytest.mark.parametrize('read_async', [False, True])
+def test_load_blosc(tmp_path, read_async):
+    blosc = pytest.importorskip('blosc')
+
+    class MyBatch(Batch):
+        components = ('images', 'labels')
+
+    data = np.random.rand(N_ITEMS, 3, 2), np.arange(N_ITEMS)
+    for i in range(N_ITEMS):
+        (tmp_path / str(i)).mkdir()
+        item = dict(images=data[0][i], labels=data[1][i])
+        (tmp_path / str(i) / 'data.blosc').write_bytes(blosc.compress(dill.dumps(item)))
+    index = FilesIndex(path=str(tmp_path / '*'), dirs=True, sort=True)
+    positions = [int(ix) for ix in index.indices]
+
+    batch = MyBatch(index).load(fmt='blosc', src='data.blosc', read_async=read_async)
+    assert np.allclose(batch.images, data[0][positions])
+    assert (batch.labels == data[1][positions]).all()
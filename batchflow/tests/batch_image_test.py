@@ -0,0 +1,153 @@
+""" Test dense versions of ImagesBatch transforms and image loading """
+# pylint: disable=missing-docstring, redefined-outer-name
+import numpy as np
+import PIL.Image
+import pytest
+
+from batchflow import Dataset, FilesIndex, ImagesBatch, P, R
+
+
+N_ITEMS = 6
+
+TRANSFORMS = [
+    ('flip', dict(mode='lr')),
+    ('flip', dict(mode='ud')),
+    ('invert', dict()),
+    ('invert', dict(channels=[0, 2])),
+    ('clip', dict(low=30, high=200)),
+    ('clip', dict(low=(10, 20, 30), high=(100, 150, 200))),
+    ('add', dict(term=100)),
+    ('add', dict(term=100, clip=True, preserve_type=True)),
+    ('multiply', dict(multiplier=1.7)),
+    ('crop', dict(origin='center', shape=(6, 4))),
+    ('crop', dict(origin=(5, 2), shape=(6, 4))),
+    ('crop', dict(origin=(5, 2), shape=(6, 4), crop_boundaries=True)),
+    ('posterize', dict(bits=3)),
+]
+
+
+@pytest.fixture
+def dataset():
+    images = np.random.randint(0, 256, size=(N_ITEMS, 8, 10, 3), dtype=np.uint8)
+    return Dataset(N_ITEMS, batch_class=ImagesBatch, preloaded=(images, np.arange(N_ITEMS), images.copy()))
+
+
+def to_items(images, pil=True):
+    result = np.empty(len(images), dtype=object)
+    result[:] = [PIL.Image.fromarray(image) if pil else image for image in images]
+    return result
+
+
+@pytest.mark.parametrize('name, kwargs', TRANSFORMS)
+def test_dense_transforms(dataset, name, kwargs):
+    batch = dataset.create_batch(dataset.indices).load(src=dataset.data)
+    images = batch.images.copy()
+    getattr(batch, name)(**kwargs)
+    assert isinstance(batch.images, np.ndarray) and batch.images.ndim == 4
+
+    # a per-item transform works with PIL images, while add and multiply process arrays as is
+    items = dataset.create_batch(dataset.indices).load(src=dataset.data)
+    items.images = to_items(images, pil=name not in ['add', 'multiply'])
+    getattr(items, name)(**kwargs)
+    expected = np.stack([np.asarray(image) for image in items.images])
+    if expected.ndim == 3:
+        expected = expected[..., np.newaxis]
+
+    assert batch.images.shape == expected.shape
+    assert batch.images.dtype == expected.dtype
+    assert np.allclose(batch.images, expected)
+
+
+def test_proba(dataset):
+    batch = dataset.create_batch(dataset.indices).load(src=dataset.data)
+    images = batch.images.copy()
+    batch.flip(p=.5, dst='masks')
+
+    flipped = (batch.masks == images[:, :, ::-1]).all(axis=(1, 2, 3))
+    untouched = (batch.masks == images).all(axis=(1, 2, 3))
+    assert (flipped | untouched).all()
+    assert (batch.images == images).all()
+
+
+def test_salt(dataset):
+    batch = dataset.create_batch(dataset.indices).load(src=dataset.data)
+    images = batch.images.copy()
+    batch.salt(p_noise=.5, color=255)
+    changed = (batch.images != images).any(axis=-1)
+    assert (batch.images[changed] == 255).all()
+    assert changed.any()
+
+
+def test_fallback(dataset):
+    batch = dataset.create_batch(dataset.indices).load(src=dataset.data)
+    images = batch.images.copy()
+
+    # a per-item argument requires a per-item transform
+    batch.add(term=P(R('choice', [0, 1])), preserve_type=True)
+    assert set(np.unique((batch.images.astype(int) - images) % 256)) <= {0, 1}
+
+    batch.images = to_items(images)
+    batch.flip()
+    assert batch.images.dtype == object
+    assert (np.stack([np.asarray(image) for image in batch.images]) == images[:, :, ::-1]).all()
+
+
+@pytest.fixture
+def image_files(tmp_path):
+    images = np.random.randint(0, 256, size=(N_ITEMS, 8, 10, 3), dtype=np.uint8)
+    for i, image in enumerate(images):
+        PIL.Image.fromarray(image).save(str(tmp_path / ('%d.png' % i)))
+    index = FilesIndex(path=str(tmp_path / '*.png'), no_ext=True, sort=True)
+    return index, images[[int(ix) for ix in index.indices]]
+
+
+def test_load_pil(image_files):
+    index, images = image_files
+    batch = ImagesBatch(index).load(fmt='image', dst='images')
+    assert batch.images.dtype == object
+    assert all(isinstance(image, PIL.Image.Image) for image in batch.images)
+    assert (np.stack([np.asarray(image) for image in batch.images]) == images).all()
+
+
+def test_load_dense(image_files):
+    index, images = image_files
+    batch = ImagesBatch(index).load(fmt='image', dst='images', dense=True)
+    assert batch.images.shape == images.shape and batch.images.dtype == np.uint8
+    assert (batch.images == images).all()
+
+    batch = ImagesBatch(index).load(fmt='image', dst='images', mode='L')
+    assert batch.images[0].mode == 'L'
+    batch = ImagesBatch(index).load(fmt='image', dst='images', dense=True, mode='L')
+    assert batch.images.shape == (*images.shape[:3], 1)
+
+
+@pytest.mark.parametrize('crop', [False, True])
+def test_load_dense_shape(image_files, crop):
+    index, images = image_files
+    batch = ImagesBatch(index).load(fmt='image', dst='images', shape=(4, 6), crop=crop)
+    assert batch.images.shape == (N_ITEMS, 4, 6, 3)
+    if crop:
+        assert (batch.images == images[:, 2:6, 2:8]).all()
+
+
+def test_load_dense_errors(image_files, tmp_path):
+    index, _ = image_files
+    PIL.Image.new('RGB', (3, 3)).save(str(tmp_path / '1.png'))
+    with pytest.raises(ValueError, match='Image 1 has shape'):
+        ImagesBatch(index).load(fmt='image', dst='images', dense=True)
+
+    with open(str(tmp_path / '2.png'), 'wb') as f:
+        f.write(b'not an image')
+    with pytest.raises(PIL.UnidentifiedImageError, match='2.png'):
+        ImagesBatch(index).load(fmt='image', dst='images', shape=(4, 6))
+
+    (tmp_path / '3.png').unlink()
+    with pytest.raises(FileNotFoundError, match='3.png'):
+        ImagesBatch(index.create_subset(index.indices[3:])).load(fmt='image', dst='images', shape=(4, 6))
+
+
+@pytest.mark.parametrize('dense', [False, True])
+def test_load_read_async(image_files, dense):
+    index, images = image_files
+    batch = ImagesBatch(index).load(fmt='image', dst='images', dense=dense, read_async=True, max_in_flight=2)
+    assert (np.stack([np.asarray(image) for image in batch.images]) == images).all()
@@ -0,0 +1,132 @@
+""" Test cache action """
+# pylint: disable=missing-docstring, redefined-outer-name
+import numpy as np
+import pytest
+
+from batchflow import Dataset, Pipeline, Batch, action, B, V
+
+
+N_ITEMS = 40
+BATCH_SIZE = 8
+
+
+class MyBatch(Batch):
+    components = ('images', 'labels')
+
+    @action
+    def make(self):
+        self.images = np.stack([np.full((2, 2), ix, dtype=np.float32) for ix in self.indices])
+        self.labels = np.array(self.indices) % 3
+        return self
+
+
+class SourceBatch(Batch):
+    @action
+    def convert(self, batch_class=MyBatch):
+        return batch_class(self.index).make()
+
+
+@pytest.fixture
+def pipeline():
+    def _pipeline(**kwargs):
+        return (Pipeline()
+                .init_variable('made', 0)
+                .make()
+                .update(V('made'), V('made') + B('size'))
+                .cache(**kwargs)
+                .call(lambda batch: setattr(batch, 'images', batch.images + 1000))
+                ) << Dataset(N_ITEMS, batch_class=MyBatch)
+    return _pipeline
+
+
+def check_batch(batch):
+    assert (batch.images[:, 0, 0] == np.array(batch.indices) + 1000).all()
+    assert (batch.labels == np.array(batch.indices) % 3).all()
+
+
+@pytest.mark.parametrize('kwargs', [dict(), dict(path=True)])
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_cache(pipeline, tmp_path, kwargs, prefetch):
+    if kwargs.get('path'):
+        kwargs['path'] = str(tmp_path / 'cache')
+    pipeline = pipeline(**kwargs)
+    for _ in range(3):
+        for batch in pipeline.gen_batch(BATCH_SIZE, n_epochs=1, shuffle=True, prefetch=prefetch):
+            check_batch(batch)
+    assert pipeline.v('made') == N_ITEMS
+
+
+def test_cache_lru(pipeline):
+    pipeline = pipeline(size=N_ITEMS // 2)
+    pipeline.run(BATCH_SIZE, n_epochs=1, shuffle=False)
+    assert pipeline.v('made') == N_ITEMS
+
+    # the second half of items is still cached
+    batch = pipeline.next_batch(BATCH_SIZE * 3, shuffle=False, n_epochs=None, reset='iter')
+    check_batch(batch)
+    assert pipeline.v('made') == N_ITEMS + N_ITEMS // 2
+    check_batch(pipeline.next_batch(BATCH_SIZE, shuffle=False, n_epochs=None))
+
+def test_cache_reset(pipeline):
+    pipeline = pipeline()
+    pipeline.run(BATCH_SIZE, n_epochs=1)
+    pipeline.run(BATCH_SIZE, n_epochs=1, reset=['iter', 'cache'])
+    assert pipeline.v('made') == 2 * N_ITEMS
+
+
+def test_cache_inplace():
+    pipeline = (Pipeline()
+                .make()
+                .cache()
+                .call(lambda batch: batch.images.__imul__(2))
+                ) << Dataset(N_ITEMS, batch_class=MyBatch)
+    for _ in range(2):
+        for batch in pipeline.gen_batch(BATCH_SIZE, n_epochs=1):
+            assert (batch.images[:, 0, 0] == 2 * np.array(batch.indices)).all()
+
+
+def test_cache_reopen(pipeline, tmp_path):
+    path = str(tmp_path / 'cache')
+    pipeline(path=path).run(BATCH_SIZE, n_epochs=1)
+
+    # a new pipeline reuses items stored on disk without executing actions before the cache
+    new_pipeline = pipeline(path=path)
+    for batch in new_pipeline.gen_batch(BATCH_SIZE, n_epochs=1, shuffle=True):
+        assert isinstance(batch, MyBatch)
+        check_batch(batch)
+    assert new_pipeline.v('made') == 0
+
+
+def convert_pipeline(path, batch_class):
+    return (Pipeline()
+            .init_variable('made', 0)
+            .convert(batch_class)
+            .update(V('made'), V('made') + B('size'))
+            .cache(path=path)
+            ) << Dataset(N_ITEMS, batch_class=SourceBatch)
+
+
+def test_cache_reopen_batch_class(tmp_path):
+    path = str(tmp_path / 'cache')
+    convert_pipeline(path, MyBatch).run(BATCH_SIZE, n_epochs=1)
+
+    # a class of batches created before the cache is stored on disk
+    new_pipeline = convert_pipeline(path, MyBatch)
+    batch = new_pipeline.next_batch(BATCH_SIZE, n_epochs=1)
+    assert type(batch) is MyBatch                                  # pylint: disable=unidiomatic-typecheck
+    assert new_pipeline.v('made') == 0
+
+
+def test_cache_reopen_unknown_class(tmp_path):
+    class LocalBatch(MyBatch):
+        pass
+
+    path = str(tmp_path / 'cache')
+    convert_pipeline(path, LocalBatch).run(BATCH_SIZE, n_epochs=1)
+
+    # a class which cannot be imported is found out by executing actions before the cache
+    new_pipeline = convert_pipeline(path, LocalBatch)
+    for batch in new_pipeline.gen_batch(BATCH_SIZE, n_epochs=1):
+        assert type(batch) is LocalBatch                           # pylint: disable=unidiomatic-typecheck
+        assert (batch.images[:, 0, 0] == batch.indices).all()
+    assert new_pipeline.v('made') == BATCH_SIZE
@@ -0,0 +1,146 @@
+""" Test columnar chunked storage """
+# pylint: disable=missing-docstring, redefined-outer-name
+import os
+
+import numpy as np
+import pytest
+
+from batchflow import Dataset, Batch, ChunkedStore
+from batchflow.chunked import open_store
+
+
+N_ITEMS = 50
+
+
+class MyBatch(Batch):
+    components = 'images', 'labels', 'names'
+
+
+@pytest.fixture
+def data():
+    images = np.random.random((N_ITEMS, 3, 4)).astype(np.float32)
+    labels = np.arange(N_ITEMS)
+    names = np.empty(N_ITEMS, dtype=object)
+    names[:] = [['item', i] for i in range(N_ITEMS)]
+    return images, labels, names
+
+
+@pytest.fixture
+def dataset(data):
+    return Dataset(N_ITEMS, batch_class=MyBatch, preloaded=data)
+
+
+def test_store(data, tmp_path):
+    images, labels, names = data
+    store = ChunkedStore(str(tmp_path), mode='w', chunk_size=8)
+    store.append(dict(images=images[:20], labels=labels[:20], names=names[:20]))
+    store.append(dict(images=images[20:], labels=labels[20:], names=names[20:]))
+    ids = ['id%02d' % i for i in range(N_ITEMS)]
+    ChunkedStore(str(tmp_path / 'str_ids'), chunk_size=8, mode='a').append(dict(labels=labels), ids=ids)
+    assert len(store) == N_ITEMS
+    assert store.components == ('images', 'labels', 'names')
+
+    store = ChunkedStore(str(tmp_path))
+    ids = [45, 3, 17, 3, 30]
+    items = store.read(ids)
+    assert (items['images'] == images[ids]).all()
+    assert (items['labels'] == labels[ids]).all()
+    assert list(items['names']) == [['item', i] for i in ids]
+
+    assert (store.read(components='labels')['labels'] == labels).all()
+
+    with pytest.raises(KeyError):
+        store.read([N_ITEMS])
+
+    store = ChunkedStore(str(tmp_path / 'str_ids'))
+    assert (store.read(['id07', 'id45', 'id03'])['labels'] == [7, 45, 3]).all()
+    with pytest.raises(ValueError):
+        ChunkedStore(str(tmp_path), mode='a').append(dict(images=images))
+
+
+def test_read_chunks(data, tmp_path):
+    images, labels, names = data
+    store = ChunkedStore(str(tmp_path), mode='w', chunk_size=10)
+    store.append(dict(images=images, labels=labels, names=names))
+
+    chunks = store.find_chunks('labels', 15, 32)
+    assert chunks == [1, 2, 3]
+    assert store.find_chunks('names', 15, 32) == list(range(5))
+    items = store.read_chunks(chunks, ['labels', 'names'])
+    assert (items['labels'] == labels[10:40]).all()
+    assert list(items['names']) == list(names[10:40])
+    assert (store.read_chunks()['images'] == images).all()
+
+
+def test_log_meta(tmp_path):
+    path = str(tmp_path)
+    store = ChunkedStore(path, mode='w', chunk_size=2, log_meta=True)
+    n_merged = []
+    for start in range(0, 20, 2):
+        store.append(dict(labels=np.arange(start, start + 2)))
+        if start == 0:
+            reader = open_store(path)
+        n_merged.append(len(ChunkedStore(path).meta['chunks']) - store._n_logged)  # pylint: disable=protected-access
+        # readers see logged chunks as well
+        assert (open_store(path).read_chunks()['labels'] == np.arange(start + 2)).all()
+    assert open_store(path) is not reader
+    # the log is merged into the metadata when it would get longer than the metadata
+    assert n_merged == [1, 1, 3, 3, 3, 3, 7, 7, 7, 7]
+
+    # a record which was partially written by a crashed writer is skipped and the log is merged on the next append
+    with open(os.path.join(path, ChunkedStore.LOG_FILE), 'a') as f:
+        f.write('{"no": 10, "chu')
+    store = ChunkedStore(path, mode='a', chunk_size=2, log_meta=True)
+    assert len(store) == 20
+    store.append(dict(labels=np.arange(20, 22)))
+    assert not os.path.exists(os.path.join(path, ChunkedStore.LOG_FILE))
+    assert (ChunkedStore(path).read_chunks()['labels'] == np.arange(22)).all()
+
+    ChunkedStore(path, mode='w')
+    assert os.listdir(path) == []
+
+
+def test_open_store(tmp_path):
+    path = str(tmp_path / 'store')
+    # a storage which is not written yet is shared too
+    store = open_store(path, mode='a')
+    assert open_store(path, mode='a') is store
+    store.append(dict(labels=np.arange(2)))
+    assert open_store(path, mode='a') is store
+
+    # a storage changed by someone else is reopened
+    ChunkedStore(path, mode='a').append(dict(labels=np.arange(2, 4)))
+    assert len(open_store(path, mode='a')) == 4
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_dump_load(dataset, data, tmp_path, prefetch):
+    path = str(tmp_path)
+    dataset.p.dump(dst=path, fmt='chunked').run(7, n_epochs=1, shuffle=True, prefetch=prefetch)
+
+    images, labels, _ = data
+    pipeline = dataset.p.load(src=path, fmt='chunked')
+    n_items = 0
+    for batch in pipeline.gen_batch(6, n_epochs=1, shuffle=True):
+        pos = batch.indices
+        assert (batch.images == images[pos]).all()
+        assert (batch.labels == labels[pos]).all()
+        assert list(batch.names) == [['item', i] for i in pos]
+        n_items += len(batch)
+    assert n_items == N_ITEMS
+
+    batch = Dataset(dataset.index, batch_class=MyBatch).create_batch(dataset.indices[:5])
+    batch.load(src=path, fmt='chunked', dst='labels')
+    assert (batch.labels == labels[:5]).all()
+    assert batch.images is None
+
+
+def test_load_pools(dataset, tmp_path):
+    path = str(tmp_path)
+    dataset.p.dump(dst=path, fmt='chunked').run(7, n_epochs=1)
+
+    # chunks are decompressed with the pools of the pipeline
+    pipeline = dataset.p.load(src=path, fmt='chunked')
+    batch = pipeline.next_batch(10, shuffle=False, n_epochs=1)
+    assert (batch.labels == np.arange(10)).all()
+    assert len(pipeline.pools) == 1
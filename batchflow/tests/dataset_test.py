@@ -42,6 +42,11 @@ class TestDataset:
             dataset.create_subset(wrong_index)
             assert 'IndexError' in str(error)
 
+    def test_create_subset_longer_string_index(self):
+        dataset = Dataset(DatasetIndex(np.array(['abc', 'xyz'])), Batch)
+        with pytest.raises(IndexError):
+            dataset.create_subset(np.array(['abcd'], dtype=object))
+
     def test_create_batch(self, dataset):
         target_index = DatasetIndex(5)
         new_batch = dataset.create_batch(target_index)
@@ -106,3 +111,24 @@ class TestDataset:
         assert not hasattr(dataset, 'cv3')
         assert not hasattr(dataset.train, 'cv3')
         assert not hasattr(dataset.test, 'cv3')
+
+    def test_cv_folds(self):
+        dataset = Dataset(DatasetIndex(np.arange(100, 200)), Batch)
+        dataset.cv_split(n_splits=3, shuffle=42)
+        assert 'cv0' not in vars(dataset)
+
+        tests = []
+        for i in range(3):
+            fold = dataset.cv(i)
+            assert fold.train is dataset.train.cv(i)
+            assert fold.test is dataset.test.cv(i)
+            assert not np.isin(fold.train.indices, fold.test.indices).any()
+            assert len(fold.train) + len(fold.test) == len(dataset)
+            tests.append(fold.test.indices)
+        assert (np.sort(np.concatenate(tests)) == dataset.indices).all()
+
+    def test_create_subset_by_pos(self, dataset):
+        subset = dataset.create_subset([5, 2, 7], pos=True)
+        assert (subset.indices == dataset.indices[[5, 2, 7]]).all()
+        assert subset.index.get_pos(7) == 2
+        assert dataset.index.get_pos(7) == 7
@@ -44,3 +44,36 @@ def test_create_batch_child():
         pass
     dsi = ChildSet(5)
     assert isinstance(dsi.create_batch(range(5)), ChildSet)
+
+@pytest.mark.parametrize('index', [np.arange(5),
+                                   np.arange(10, 30, 4),
+                                   np.array([4, 17, 2, 9, 11]),
+                                   np.array([.5, .1, .3]),
+                                   np.array(['b', 'e', 'a', 'd', 'c']),
+                                   np.array(['x', 'y', 'z'], dtype=object)])
+def test_get_pos(index):
+    dsi = DatasetIndex(index)
+    order = np.random.permutation(len(index))
+    assert (dsi.get_pos(index[order]) == order).all()
+    assert dsi.get_pos(index[2]) == 2
+    assert dsi.get_pos(list(index[order])).tolist() == order.tolist()
+    assert dsi.get_pos(slice(index[1], index[-1])) == slice(1, len(index) - 1, None)
+    assert len(dsi.get_pos([])) == 0
+
+def test_get_pos_missing():
+    dsi = DatasetIndex(np.arange(10, 30, 4))
+    with pytest.raises(KeyError):
+        dsi.get_pos([10, 12])
+    with pytest.raises(KeyError):
+        dsi.get_pos(30)
+    with pytest.raises(KeyError):
+        DatasetIndex(['a', 'b']).get_pos(['c'])
+
+def test_get_pos_longer_strings():
+    dsi = DatasetIndex(np.array(['abc', 'xyz']))
+    # object and wider string queries are not truncated to the width of the index
+    with pytest.raises(KeyError):
+        dsi.get_pos(np.array(['abcd'], dtype=object))
+    with pytest.raises(KeyError):
+        dsi.get_pos(np.array(['xyzw']))
+    assert dsi.get_pos(np.array(['xyz', 'abc'], dtype=object)).tolist() == [1, 0]
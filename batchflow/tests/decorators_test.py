@@ -0,0 +1,72 @@
+""" Test inbatch_parallel chunked execution """
+# pylint: disable=missing-docstring, redefined-outer-name
+import numpy as np
+import pytest
+
+from batchflow import Dataset, Batch, action, inbatch_parallel
+
+
+DATASET_SIZE = 50
+
+
+class MyBatch(Batch):
+    components = 'images', 'labels'
+
+    def _assemble_res(self, all_res, *args, **kwargs):
+        _ = args, kwargs
+        self.res = all_res
+        return self
+
+    @action
+    @inbatch_parallel(init='indices', post='_assemble_res')
+    def square(self, ix, power=2):
+        if ix == 13:
+            raise ValueError('Failed')
+        return ix ** power
+
+    @action
+    @inbatch_parallel(init='indices', post='_assemble_res', chunk_size='auto')
+    def square_auto(self, ix):
+        return ix ** 2
+
+    @action
+    @inbatch_parallel(init='indices', post='_assemble_res', target='mpc')
+    def square_mpc(self, *args, **kwargs):
+        _ = args, kwargs
+        return _square
+
+
+def _square(_, ix, power=2):
+    return ix ** power
+
+
+@pytest.fixture
+def batch():
+    images = np.arange(DATASET_SIZE, dtype=np.float32)
+    dataset = Dataset(DATASET_SIZE, batch_class=MyBatch, preloaded=(images, images.copy()))
+    return dataset.create_batch(dataset.indices)
+
+
+@pytest.mark.parametrize('chunk_size', [None, 1, 7, 50, 100, 'auto'])
+def test_chunks(batch, chunk_size):
+    batch.square(power=3, chunk_size=chunk_size, n_workers=3)
+    assert len(batch.res) == DATASET_SIZE
+    assert isinstance(batch.res[13], ValueError)
+    assert [res for ix, res in enumerate(batch.res) if ix != 13] == [ix ** 3 for ix in range(DATASET_SIZE) if ix != 13]
+
+
+def test_decorator_chunk_size(batch):
+    batch.square_auto(n_workers=2)
+    assert batch.res == [ix ** 2 for ix in range(DATASET_SIZE)]
+
+
+@pytest.mark.parametrize('chunk_size', [None, 'auto'])
+def test_mpc_chunks(batch, chunk_size):
+    batch.square_mpc(power=3, chunk_size=chunk_size, n_workers=2)
+    assert batch.res == [ix ** 3 for ix in range(DATASET_SIZE)]
+
+
+@pytest.mark.parametrize('chunk_size', [0, 'all'])
+def test_wrong_chunk_size(batch, chunk_size):
+    with pytest.raises(ValueError):
+        batch.square(chunk_size=chunk_size)
@@ -0,0 +1,55 @@
+""" Test echo action """
+# pylint: disable=missing-docstring
+import numpy as np
+import pytest
+
+from batchflow import Dataset, Pipeline, Batch, action
+
+
+N_ITEMS = 30
+BATCH_SIZE = 7
+
+
+class MyBatch(Batch):
+    components = ('images',)
+
+    @action
+    def make(self):
+        self.images = np.array(self.indices, dtype=np.float32)[:, None] * np.ones((1, 3))
+        return self
+
+    @action
+    def augment(self):
+        self.images += np.random.rand(len(self), 1)
+        return self
+
+
+@pytest.mark.parametrize('n_echoes', [1, 3])
+@pytest.mark.parametrize('prefetch, echo_prefetch', [(0, None), (2, None), (0, 2), (2, 2)])
+def test_echo(n_echoes, prefetch, echo_prefetch):
+    made = []
+    pipeline = (Pipeline()
+                .make()
+                .call(lambda batch: made.append(len(batch)))
+                .echo(n_echoes, prefetch=echo_prefetch)
+                .augment()
+                ) << Dataset(N_ITEMS, batch_class=MyBatch)
+
+    batches = list(pipeline.gen_batch(BATCH_SIZE, n_epochs=1, prefetch=prefetch))
+    assert len(batches) == n_echoes * int(np.ceil(N_ITEMS / BATCH_SIZE))
+    assert sum(made) == N_ITEMS
+
+    for i in range(0, len(batches), n_echoes):
+        echoes = batches[i : i + n_echoes]
+        for batch in echoes:
+            assert (batch.indices == echoes[0].indices).all()
+            diff = batch.images - np.array(batch.indices)[:, None]
+            assert ((diff >= 0) & (diff < 1)).all()
+        if n_echoes > 1:
+            # each echo is augmented separately
+            assert not np.allclose(echoes[0].images, echoes[1].images)
+
+
+def test_echo_wrong_number():
+    with pytest.raises(ValueError):
+        Pipeline().echo(0)
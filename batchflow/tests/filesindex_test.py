@@ -3,6 +3,8 @@
 # pylint: disable=protected-access
 # pylint: disable=redefined-outer-name
 import os
+import glob
+import pickle
 import shutil
 
 from contextlib import ExitStack as does_not_raise
@@ -98,3 +100,44 @@ def test_create_subset(files_setup, index):
     assert isinstance(new_findex.indices, np.ndarray)
     assert os.path.dirname(full_path) == path
     assert os.path.basename(full_path) == file_name
+
+@pytest.mark.parametrize('pattern, dirs', [('*', False), ('*', True), ('*/*', False), ('**', False),
+                                           ('**/file_1*', False), ('**/*folder', True), ('f*/file_?.txt', False)])
+def test_build_as_glob(files_setup, pattern, dirs):
+    path, _, _ = files_setup
+    pattern = os.path.join(path, pattern)
+    check = os.path.isdir if dirs else os.path.isfile
+    expected = sorted(fname for fname in glob.glob(pattern, recursive=True) if check(fname))
+
+    findex = FilesIndex(path=pattern, dirs=dirs, sort=True) if len(set(map(os.path.basename, expected))) == \
+        len(expected) else None
+    if findex is None:
+        with pytest.raises(ValueError):
+            FilesIndex(path=pattern, dirs=dirs)
+    else:
+        assert sorted(findex.get_fullpath(ix) for ix in findex.indices) == expected
+
+def test_save_load(files_setup, tmp_path):
+    path, _, _ = files_setup
+    findex = FilesIndex(path=[os.path.join(path, 'folder'), os.path.join(path, 'other_folder')], dirs=True)
+    assert len(findex) == 2
+    findex = FilesIndex(path=os.path.join(path, 'other_folder', '*'), no_ext=True, sort=True)
+    subset = findex.create_subset(findex.indices[[2, 0]])
+    fname = str(tmp_path / 'index.npz')
+    subset.save(fname)
+
+    loaded = FilesIndex.load(fname)
+    assert (loaded.indices == subset.indices).all()
+    assert [loaded.get_fullpath(ix) for ix in loaded.indices] == [subset.get_fullpath(ix) for ix in subset.indices]
+    assert loaded.get_fullpath('file_0') == os.path.join(path, 'other_folder', 'file_0.txt')
+    assert len(loaded.paths.names) == len(b'file_0.txtfile_2.txt')
+
+    unpickled = pickle.loads(pickle.dumps(subset))
+    assert unpickled.get_fullpath('file_2') == subset.get_fullpath('file_2')
+
+def test_create_subset_by_pos(files_setup):
+    path, _, _ = files_setup
+    findex = FilesIndex(path=os.path.join(path, '*'), sort=True)
+    new_findex = findex.create_subset([2, 0], pos=True)
+    assert list(new_findex.indices) == ['file_2.txt', 'file_0.txt']
+    assert new_findex.get_fullpath('file_2.txt') == findex.get_fullpath('file_2.txt')
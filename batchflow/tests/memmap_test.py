@@ -0,0 +1,74 @@
+""" Test memory-mapped data sources """
+# pylint: disable=missing-docstring, redefined-outer-name
+import pickle
+
+import numpy as np
+import pytest
+
+from batchflow import Dataset, Batch, DatasetIndex, MemmapSource
+
+
+N_ITEMS = 30
+
+
+class MyBatch(Batch):
+    components = 'images', 'labels'
+
+
+@pytest.fixture
+def data():
+    images = np.random.random((N_ITEMS, 4, 5)).astype(np.float32)
+    labels = np.arange(N_ITEMS) * 10
+    return dict(images=images, labels=labels)
+
+
+@pytest.fixture
+def source(data, tmp_path):
+    MemmapSource.save(str(tmp_path), data)
+    return MemmapSource(str(tmp_path))
+
+
+def test_views(source, data):
+    images = source['images']
+    assert source.components == ('images', 'labels')
+    assert source.n_items == N_ITEMS
+
+    item = images[np.arange(5, 12)]
+    assert np.shares_memory(item, images.array)
+    assert (item == data['images'][5:12]).all()
+
+    item = images[[3, 6, 9]]
+    assert np.shares_memory(item, images.array)
+    assert (item == data['images'][[3, 6, 9]]).all()
+
+    ids = [9, 2, 17, 2, 0]
+    item = images[ids]
+    assert not np.shares_memory(item, images.array)
+    assert (item == data['images'][ids]).all()
+
+    assert (images[4] == data['images'][4]).all()
+    assert (images[[-1]] == data['images'][[-1]]).all()
+
+
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_dataset(source, data, shuffle):
+    dataset = Dataset(source.n_items, batch_class=MyBatch, preloaded=source)
+    labels = []
+    for batch in dataset.gen_batch(7, n_epochs=1, shuffle=shuffle):
+        assert (batch.images == data['images'][batch.indices]).all()
+        assert (batch.labels == data['labels'][batch.indices]).all()
+        if not shuffle:
+            assert np.shares_memory(batch.images, source['images'].array)
+        labels.extend(batch.labels)
+    assert sorted(labels) == list(data['labels'])
+
+
+def test_index(data, tmp_path):
+    path = str(tmp_path / 'labels.raw')
+    data['labels'].astype(np.int32).tofile(path)
+    index = DatasetIndex(['item%d' % i for i in range(N_ITEMS)])
+    source = MemmapSource(dict(labels=dict(path=path, dtype=np.int32, shape=(N_ITEMS,))), index=index)
+    assert (source['labels'][['item4', 'item2']] == [40, 20]).all()
+
+    restored = pickle.loads(pickle.dumps(source))
+    assert (restored['labels'][['item4', 'item5']] == [40, 50]).all()
@@ -6,6 +6,7 @@ import pytest
 
 sys.path.append('..')
 from batchflow import B, C, D, F, L, V, R, P, I, Dataset, Pipeline
+from batchflow.named_expr import eval_expr, prepare_expr
 
 
 @pytest.mark.parametrize('named_expr', [
@@ -105,3 +106,70 @@ def test_d(size, n_splits):
             pipeline.run(1)
 
             assert pipeline.v('indices') == result[:start] + result[end:]
+
+
+def test_mixed_args():
+    """ Check that constant arguments are passed as is, while named expressions are evaluated for each batch """
+    shape = [28, 28]
+    calls = []
+    pipeline = (Dataset(10).pipeline({'option': 3})
+        .call(lambda batch, *args, **kwargs: calls.append((args, kwargs)),
+              shape, [B('indices')[0], 1], c={'opt': C('option')}, d=(1, 2))
+    )
+    pipeline.run(1, n_epochs=1)
+
+    assert len(calls) == 10
+    assert all(args[0] == shape and args[0] is not shape for args, _ in calls)
+    assert [args[1] for args, _ in calls] == [[i, 1] for i in range(10)]
+    assert all(kwargs == {'c': {'opt': 3}, 'd': (1, 2)} for _, kwargs in calls)
+
+
+def test_mutable_args():
+    """ Check that actions which change their arguments in place do not affect other batches and runs """
+    items = [0]
+    options = [1]
+    calls = []
+    pipeline = (Dataset(6).pipeline()
+        .call(lambda batch, values, config: (values.extend(batch.indices), config['opt'].append(config['size']),
+                                             calls.append((list(values), list(config['opt'])))),
+              items, config={'opt': options, 'size': B('size')})
+    )
+    for _ in range(2):
+        pipeline.run(2, n_epochs=1)
+    assert items == [0] and options == [1]
+    assert calls == [([0, 0, 1], [1, 2]), ([0, 2, 3], [1, 2]), ([0, 4, 5], [1, 2])] * 2
+
+
+def test_constant_containers():
+    pipeline = Dataset(10).pipeline({'option': 3})
+    const = [1, (2, 3), {'a': [4]}]
+    assert eval_expr(const, pipeline=pipeline) is const
+    assert prepare_expr(const) is None
+
+    expr = [1, (2, C('option')), {'a': [4]}, const]
+    value = eval_expr(expr, pipeline=pipeline)
+    assert value == [1, (2, 3), {'a': [4]}, const]
+    assert value[2] is expr[2] and value[3] is const
+
+    value = prepare_expr(expr)(pipeline=pipeline)
+    assert value == [1, (2, 3), {'a': [4]}, const]
+    assert value[2] is expr[2] and value[3] is const
+
+
+def test_config_memoization():
+    """ Config options are memoized within a run, but config updates are tracked """
+    values = []
+    pipeline = (Dataset(10).pipeline({'option': 3, 'var_option': V('var')})
+        .init_variable('var', 0)
+        .update(V('var'), V('var') + 1)
+        .call(lambda batch, *args: values.append(args),
+              C('option') * 2 + 1, C('var_option'), C('counter', default=0))
+        .update(C('counter'), C('counter', default=0) + 1)
+    )
+    pipeline.run(2, n_epochs=1)
+    assert values == [(7, i + 1, i) for i in range(5)]
+
+    values.clear()
+    pipeline.set_config({'option': 4})
+    pipeline.run(2, n_epochs=1)
+    assert values == [(9, 6 + i, 5 + i) for i in range(5)]
@@ -0,0 +1,97 @@
+""" Test worker pools shared by parallel actions """
+# pylint: disable=missing-docstring, redefined-outer-name
+import threading
+
+import numpy as np
+import pytest
+
+from batchflow import Dataset, Batch, action, inbatch_parallel
+from batchflow.pools import PoolRegistry, DEFAULT_POOLS
+
+
+DATASET_SIZE = 16
+
+
+class MyBatch(Batch):
+    components = 'images', 'labels'
+
+    @action
+    @inbatch_parallel(init='indices', post='_assemble_threads', target='threads')
+    def where(self, ix):
+        _ = ix
+        return threading.current_thread().ident
+
+    def _assemble_threads(self, all_res, *args, **kwargs):
+        _ = args, kwargs
+        self.threads = set(all_res)
+        return self
+
+    @action
+    @inbatch_parallel(init='indices', post='_assemble_nested', target='threads')
+    def nested(self, ix):
+        _ = ix
+        return self.inner()
+
+    @inbatch_parallel(init='indices', post='_assemble_inner', target='threads')
+    def inner(self, ix):
+        return ix
+
+    def _assemble_inner(self, all_res, *args, **kwargs):
+        _ = args, kwargs
+        return list(all_res)
+
+    def _assemble_nested(self, all_res, *args, **kwargs):
+        _ = args, kwargs
+        self.nested_res = list(all_res)
+        return self
+
+
+@pytest.fixture
+def dataset():
+    images = np.arange(DATASET_SIZE, dtype=np.float32)
+    return Dataset(DATASET_SIZE, batch_class=MyBatch, preloaded=(images, images.copy()))
+
+
+def test_pipeline_pools(dataset):
+    pipeline = dataset.p.where(n_workers=2)
+    threads = set()
+    for batch in pipeline.gen_batch(4, n_epochs=1):
+        threads |= batch.threads
+
+    # the same pool serves all batches
+    assert len(pipeline.pools) == 1
+    assert len(threads) <= 2
+
+    pipeline.reset('iter')
+    assert len(pipeline.pools) == 0
+
+
+def test_default_pools(dataset):
+    batch = dataset.create_batch(dataset.indices[:4]).load(src=dataset.data)
+    batch.where(n_workers=3)
+    assert ('threads', 3) in vars(DEFAULT_POOLS)['_pools']
+
+
+def test_nested(dataset):
+    pipeline = dataset.p.nested(n_workers=2)
+    batch = pipeline.next_batch(4)
+    assert batch.nested_res == [list(batch.indices)] * 4
+    pipeline.reset('iter')
+
+
+def test_registry():
+    pools = PoolRegistry(n_workers=3)
+    executor = pools.get('threads')
+    assert pools.get('threads', 3) is executor
+    assert pools.get('threads', 2) is not executor
+    assert len(pools) == 2
+    assert not pools.in_pool()
+    assert executor.submit(pools.in_pool).result()
+
+    with pytest.raises(ValueError):
+        pools.get('gpu')
+
+    pools.shutdown()
+    assert len(pools) == 0
+    assert pools.get('threads') is not executor
+    pools.shutdown()
@@ -0,0 +1,111 @@
+""" Test batch prefetching """
+# pylint: disable=missing-docstring, redefined-outer-name
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from batchflow import Dataset, Batch, action, SkipBatchException
+
+
+DATASET_SIZE = 40
+
+
+class MyBatch(Batch):
+    components = 'images', 'labels', 'names'
+
+    @action
+    def double(self):
+        self.images = self.images * 2
+        self.pid = os.getpid()
+        return self
+
+    @action
+    def fail(self, index):
+        if index in self.indices:
+            raise ValueError("Failed on %d" % index)
+        return self
+
+    @action
+    def skip(self, indices):
+        if np.isin(self.indices, indices).any():
+            raise SkipBatchException
+        return self
+
+    @action
+    def wait_for(self, event, index):
+        # the first batch is finished only after a batch with a given index
+        if self.indices[0] == 0:
+            event.wait(10)
+        elif index in self.indices:
+            event.set()
+        return self
+
+
+@pytest.fixture
+def dataset():
+    images = np.arange(DATASET_SIZE * 32 * 32, dtype=np.float32).reshape(DATASET_SIZE, 32, 32)
+    labels = np.arange(DATASET_SIZE)
+    names = np.array(['item%d' % i for i in range(DATASET_SIZE)], dtype=object)
+    return Dataset(DATASET_SIZE, batch_class=MyBatch, preloaded=(images, labels, names))
+
+
+@pytest.mark.parametrize('batch_size', [1, 8, 30])
+def test_mpc_prefetch(dataset, batch_size):
+    pipeline = dataset.p.double()
+    images = dataset.data.images
+
+    indices = []
+    for batch in pipeline.gen_batch(batch_size, n_epochs=1, prefetch=2, target='mpc'):
+        assert batch.pid != os.getpid()
+        assert (batch.images == images[batch.indices] * 2).all()
+        assert (batch.labels == batch.indices).all()
+        assert list(batch.names) == ['item%d' % i for i in batch.indices]
+        assert batch.pipeline is pipeline
+        indices.extend(batch.indices)
+
+    assert indices == list(range(DATASET_SIZE))
+
+
+@pytest.mark.parametrize('target', ['threads', 'mpc'])
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_exception(dataset, target, prefetch):
+    pipeline = dataset.p.fail(21)
+    indices = []
+    with pytest.raises(ValueError, match="Failed on 21"):
+        for batch in pipeline.gen_batch(4, n_epochs=1, prefetch=prefetch, target=target):
+            indices.extend(batch.indices)
+    assert indices == list(range(20))
+    assert pipeline.prefetch_stats.failed == 1
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+def test_skip(dataset, prefetch):
+    pipeline = dataset.p.skip(np.arange(4, 32))
+    batches = list(pipeline.gen_batch(2, n_epochs=1, prefetch=prefetch))
+    assert len(batches) == 6
+    stats = pipeline.prefetch_stats
+    assert (stats.produced, stats.consumed, stats.skipped) == (20, 6, 14)
+    assert stats.queue_depth == 0
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_ordered(dataset, ordered):
+    event = threading.Event()
+    pipeline = dataset.p.wait_for(event, 5)
+    indices = []
+    for batch in pipeline.gen_batch(1, n_epochs=1, prefetch=8, ordered=ordered):
+        indices.extend(batch.indices)
+
+    assert event.is_set()
+    assert sorted(indices) == list(range(DATASET_SIZE))
+    if ordered:
+        assert indices == list(range(DATASET_SIZE))
+    else:
+        assert indices.index(5) < indices.index(0)
+
+    stats = pipeline.prefetch_stats.as_dict()
+    assert stats['consumed'] == stats['produced'] == stats['completed'] == DATASET_SIZE
+    assert stats['batches_per_sec'] > 0
+    assert stats['producer_wait'] >= 0 and stats['consumer_wait'] >= 0
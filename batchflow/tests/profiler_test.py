@@ -0,0 +1,84 @@
+""" Test pipeline profiling """
+# pylint: disable=missing-docstring, redefined-outer-name
+import json
+
+import numpy as np
+import pytest
+
+from batchflow import Dataset, Pipeline, Batch, action, inbatch_parallel
+
+
+N_ITEMS = 60
+BATCH_SIZE = 5
+
+
+@pytest.fixture
+def pipeline():
+    dataset = Dataset(N_ITEMS, batch_class=Batch)
+    return (Pipeline()
+            .call(lambda batch: sum(range(1000)))
+            .call(lambda batch: None)
+            ) << dataset
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_profile(pipeline, prefetch):
+    pipeline.run(BATCH_SIZE, n_epochs=1, profile=True, prefetch=prefetch)
+    n_batches = N_ITEMS // BATCH_SIZE
+
+    info = pipeline.profile_info
+    assert len(info.loc['call #0']) == n_batches
+    assert (info.loc['call #0', 'n_items'] == BATCH_SIZE).all()
+    assert ('#queue' in info.index) == (prefetch > 0)
+
+    result = pipeline.show_profile_info()
+    assert set(result.index) >= {'call #0', 'call #1'}
+    assert np.isclose(result.loc['call #0', ('total_time', 'sum')], info.loc['call #0', 'total_time'].sum())
+    assert len(pipeline.show_profile_info(per_iter=True)) > 0
+
+    with pytest.raises(ValueError):
+        pipeline.show_profile_info(detailed=True)
+
+    # profiling is off in the next run
+    pipeline.run(BATCH_SIZE, n_epochs=1)
+    assert len(pipeline.profile_info) == len(info)
+
+
+def test_profile_detailed(pipeline):
+    pipeline.run(BATCH_SIZE, n_epochs=1, profile='detailed')
+
+    result = pipeline.show_profile_info(detailed=True)
+    assert set(result.index.get_level_values('action')) == {'call #0', 'call #1'}
+    assert any('builtins.sum' in name for name in result.loc['call #0'].index)
+    assert len(pipeline.show_profile_info(detailed=False)) == 2
+
+
+class ParallelBatch(Batch):
+    @action
+    @inbatch_parallel(init='indices')
+    def work(self, ix):
+        _ = ix
+        return sum(range(1000))
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_trace(tmp_path, prefetch):
+    dataset = Dataset(N_ITEMS, batch_class=ParallelBatch)
+    pipeline = Pipeline().work() << dataset
+    pipeline.run(BATCH_SIZE, n_epochs=1, profile='trace', prefetch=prefetch)
+
+    info = pipeline.profile_info
+    assert (info.loc['work', 'category'] == 'task').sum() == N_ITEMS
+    assert (info.loc['#batch', 'category'] == 'batch').all()
+    assert ('#wait' in info.index) == (prefetch > 0)
+
+    path = str(tmp_path / 'trace.json')
+    pipeline.save_trace(path)
+    with open(path) as f:
+        events = json.load(f)['traceEvents']
+    spans = [event for event in events if event['ph'] == 'X']
+    assert {event['cat'] for event in spans} >= {'action', 'task', 'batch'}
+    assert len({event['tid'] for event in spans if event['cat'] == 'task'}) > 1
+    assert all(event['dur'] >= 0 and 'cpu_time_ms' in event['args'] for event in spans)
+    names = {event['args']['name'] for event in events if event['name'] == 'thread_name'}
+    assert len(names) > 1
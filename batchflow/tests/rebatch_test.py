@@ -1,4 +1,6 @@
 """ Test rebatch action """
+import threading
+
 import numpy as np
 
 import pytest
@@ -69,3 +71,59 @@ def test_merge(merge_factor):
     assert merged.dummy.shape[0] == b.dummy.shape[0] * merge_factor
     assert merged.dummy.shape[1] == b.dummy.shape[1]
     assert rest is None
+
+
+class CustomMergeBatch(MyBatch):
+    """ batch with an overridden merge, which rebatch should call instead of a fast path """
+    merged = 0
+
+    @classmethod
+    def merge(cls, batches, batch_size=None, components=None, batch_class=None):
+        """ count calls and merge as usual """
+        cls.merged += 1
+        return super().merge(batches, batch_size=batch_size, components=components, batch_class=batch_class)
+
+
+@pytest.mark.parametrize('batch_class', [MyBatch, CustomMergeBatch])
+@pytest.mark.parametrize('batch_size, rebatch_size', [(7, 10), (10, 3)])
+def test_rebatch_items(batch_class, batch_size, rebatch_size):
+    """ checks that items keep their order and dtype after rebatch """
+    data = (np.arange(DATASET_SIZE * 2, dtype=np.float32).reshape(DATASET_SIZE, 2),)
+    dataset = Dataset(index=DATASET_SIZE, batch_class=batch_class, preloaded=data)
+
+    items = []
+    p = (Pipeline()
+         .rebatch(rebatch_size)
+         .call(lambda batch: items.append(batch.dummy))
+         ) << dataset
+    p.run(batch_size=batch_size, n_epochs=1)
+
+    assert all(item.dtype == np.float32 for item in items)
+    assert (np.concatenate(items) == data[0]).all()
+    assert (getattr(batch_class, 'merged', 0) > 0) == (batch_class is CustomMergeBatch)
+
+
+@pytest.mark.parametrize('prefetch, rebatch_prefetch', [(0, 2), (1, 2), (2, 0)])
+def test_rebatch_prefetch(prefetch, rebatch_prefetch):
+    """ checks that the source pipeline and actions after rebatch are executed in separate threads """
+    data = (np.arange(DATASET_SIZE * 2).reshape(DATASET_SIZE, 2),)
+    dataset = Dataset(index=DATASET_SIZE, batch_class=MyBatch, preloaded=data)
+    threads = {'before': set(), 'after': set()}
+    lengths = []
+
+    def save_thread(batch, dump):
+        threads[dump].add(threading.get_ident())
+        if dump == 'after':
+            lengths.append(len(batch))
+
+    p = (Pipeline()
+         .call(save_thread, 'before')
+         .rebatch(17, prefetch=rebatch_prefetch)
+         .call(save_thread, 'after')
+         ) << dataset
+    p.run(batch_size=5, n_epochs=1, prefetch=prefetch)
+
+    check_batch_lengths(lengths, 17)
+    main_thread = threading.get_ident()
+    assert (main_thread in threads['before']) == (rebatch_prefetch == 0 and prefetch == 0)
+    assert (main_thread in threads['after']) == (prefetch == 0)
@@ -0,0 +1,223 @@
+""" Test sharing root batches with branch processes of research """
+# pylint: disable=missing-docstring, redefined-outer-name, attribute-defined-outside-init
+import os
+import sys
+import logging
+import subprocess
+
+import numpy as np
+import pytest
+
+pytest.importorskip('batchflow.research')
+shared_memory = pytest.importorskip('multiprocessing.shared_memory')
+
+from batchflow import Batch, DatasetIndex, Dataset, Pipeline                 # pylint: disable=wrong-import-position
+from batchflow.research import Research                                     # pylint: disable=wrong-import-position
+from batchflow.research import actors                                       # pylint: disable=wrong-import-position
+from batchflow.research.actors import SharedBatch, BranchActor, load_batch    # pylint: disable=wrong-import-position
+from batchflow.research.job import Job                                      # pylint: disable=wrong-import-position
+from batchflow.research.workers import PipelineWorker                       # pylint: disable=wrong-import-position
+
+
+class MyBatch(Batch):
+    components = ('images', 'labels', 'names')
+
+
+@pytest.fixture
+def batch():
+    batch = MyBatch(DatasetIndex(np.arange(10, 14)))
+    batch.images = np.arange(4 * 6, dtype=np.float32).reshape(4, 2, 3)
+    batch.labels = np.array([1, 0, 1, 1], dtype=np.int8)
+    batch.names = np.array(['a', 'bb', None, 'd'], dtype=object)
+    return batch
+
+
+def check_batch(new_batch, batch):
+    assert isinstance(new_batch, MyBatch)
+    assert (new_batch.indices == batch.indices).all()
+    for comp in MyBatch.components:
+        value = getattr(new_batch, comp)
+        assert value.dtype == getattr(batch, comp).dtype
+        assert (value == getattr(batch, comp)).all()
+
+
+def test_shared_batch(batch):
+    with SharedBatch(batch) as shared:
+        new_batch = load_batch(shared.descriptor)
+        name = shared.descriptor['name']
+    check_batch(new_batch, batch)
+
+    # components are copied, so the batch outlives the shared block
+    new_batch.images[0] = -1
+    assert batch.images[0, 0, 0] == 0
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+class Unit:
+    root_pipeline = None
+
+    def __init__(self):
+        self.result = []
+
+    def execute_for(self, batch):
+        if batch.labels.sum() == 0:
+            raise ValueError('Empty labels')
+        self.result.append((os.getpid(), float(batch.images.sum())))
+
+    def put_result(self, iteration):
+        _ = iteration
+
+    def dump_result(self, task_id, iteration, name):
+        raise OSError('Cannot dump {} {} {}'.format(task_id, iteration, name))
+
+    def get_last_result(self, variable=None):
+        _ = variable
+        return self.result[-1] if self.result else None
+
+
+class FakeJob:
+    def __init__(self, n_experiments):
+        self.experiments = [dict(unit=Unit()) for _ in range(n_experiments)]
+        self.ids = [str(i) for i in range(n_experiments)]
+
+
+def test_branch_actors(batch):
+    job = FakeJob(3)
+    actors = [BranchActor(job, i) for i in range(3)]
+    try:
+        with SharedBatch(batch) as shared:
+            for actor in actors:
+                actor.send('execute_for', 'unit', shared.descriptor)
+            assert [actor.recv() for actor in actors] == [(None, None)] * 3
+
+        for actor in actors:
+            actor.send('last_result', 'unit', None)
+        outputs = [actor.recv()[1] for actor in actors]
+        assert len({pid for pid, _ in outputs} | {os.getpid()}) == 4
+        assert all(value == batch.images.sum() for _, value in outputs)
+        # experiments are executed in actor processes only
+        assert all(len(experiment['unit'].result) == 0 for experiment in job.experiments)
+
+        batch.labels = np.zeros(4, dtype=np.int8)
+        with SharedBatch(batch) as shared:
+            actors[0].send('execute_for', 'unit', shared.descriptor)
+            exception, _ = actors[0].recv()
+        assert isinstance(exception, ValueError)
+
+        actors[1].send('dump_result', 'unit', 5)
+        exception, _ = actors[1].recv()
+        assert isinstance(exception, OSError) and 'Cannot dump 1 5 unit' in str(exception)
+    finally:
+        for actor in actors:
+            actor.close()
+
+
+def test_job_dump_exceptions():
+    job = Job(dict(unit=None), n_iters=1, configs=[None, None], branches=2, research_path=None,
+              branch_processes=True)
+    job.experiments = FakeJob(2).experiments
+    job.exceptions = [None, None]
+    job.actors = [BranchActor(job, i) for i in range(2)]
+    try:
+        exceptions = job.dump_all_results(1, 'unit', [None, {}])
+    finally:
+        job.close()
+    assert exceptions[0] is None and isinstance(exceptions[1], OSError)
+    # a failed dump in a branch process stops its experiment
+    assert job.exceptions[0] is None and job.exceptions[1] is exceptions[1]
+
+
+def run_script(script, cwd):
+    """ Run code in a separate interpreter to catch errors printed by its resource tracker """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    process = subprocess.run([sys.executable, '-c', script], cwd=str(cwd), env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, timeout=300)
+    assert process.returncode == 0, process.stderr
+    assert 'Traceback' not in process.stderr and 'leaked' not in process.stderr
+    return process.stdout.strip().splitlines()[-1]
+
+
+ACTORS = """
+import numpy as np
+from batchflow import Batch, DatasetIndex
+from batchflow.research.actors import SharedBatch, BranchActor
+
+class Unit:
+    root_pipeline = None
+    def execute_for(self, batch):
+        self.total = float(batch.data.sum())
+    def get_last_result(self, variable=None):
+        return self.total
+
+class Job:
+    experiments = [dict(unit=Unit()) for _ in range(3)]
+
+actors = [BranchActor(Job, i) for i in range(3)]
+totals = []
+for size in range(1, 6):
+    with SharedBatch(Batch(DatasetIndex(size), preloaded=np.ones(size))) as shared:
+        for actor in actors:
+            actor.send('execute_for', 'unit', shared.descriptor)
+        assert all(actor.recv()[0] is None for actor in actors)
+    for actor in actors:
+        actor.send('last_result', 'unit', None)
+    totals.extend(actor.recv()[1] for actor in actors)
+for actor in actors:
+    actor.close()
+print(totals)
+"""
+
+def test_shared_tracker(tmp_path):
+    # blocks are unlinked by the producer only, and the tracker shared with actors does not complain
+    assert run_script(ACTORS, tmp_path) == str([float(size) for size in range(1, 6) for _ in range(3)])
+
+
+def test_no_shared_memory(monkeypatch, batch):
+    monkeypatch.setattr(actors, 'shared_memory', None)
+    with pytest.raises(ImportError):
+        SharedBatch(batch)
+    with pytest.raises(ImportError):
+        BranchActor(FakeJob(1), 0)
+
+    research = Research().add_pipeline(Pipeline(), Pipeline(), dataset=Dataset(10), name='train')
+    with pytest.raises(ImportError):
+        research.run(n_iters=1, branch_processes=True)
+
+
+class FailingWorker(PipelineWorker):
+    def init(self):
+        job = self.job[1]
+        job.experiments = FakeJob(2).experiments
+        job.actors = [BranchActor(job, i) for i in range(2)]
+        self.actors = job.actors
+
+    def main(self):
+        raise ValueError('Job has failed')
+
+
+def test_failed_job_closes_actors():
+    worker = FailingWorker([None, None], 0, logger=logging.getLogger('test'))
+    worker.job = 0, Job(dict(unit=None), n_iters=1, configs=[None, None], branches=2, research_path=None,
+                        branch_processes=True)
+    signal = worker._execute_job()                                   # pylint: disable=protected-access
+    assert signal.done and all(isinstance(exception, ValueError) for exception in signal.exception)
+    assert worker.job[1].actors is None
+    assert not any(actor._process.is_alive() for actor in worker.actors) # pylint: disable=protected-access
+
+
+RESEARCH = """
+from batchflow import Dataset, Pipeline, B, V, C
+from batchflow.research import Research, Option
+
+branch = (Pipeline().init_variable('sum', 0)
+                    .update(V('sum', mode='w'), V('sum') + C('k') + B.indices.sum().astype(float)))
+research = (Research().init_domain(Option('k', [1, 2, 3, 4]))
+                      .add_pipeline(Pipeline().run_later(4, n_epochs=None, shuffle=False), branch,
+                                    dataset=Dataset(20), variables='sum', name='train'))
+research.run(n_iters=3, workers=1, branches=2, name='research', branch_processes=True, warm_workers=True)
+print(sorted(research.load_results().df['sum'].tolist()))
+"""
+
+def test_warm_branch_processes(tmp_path):
+    assert run_script(RESEARCH, tmp_path) == str([7., 8., 9., 10., 30., 32., 34., 36., 69., 72., 75., 78.])
@@ -0,0 +1,90 @@
+""" Test storage and loading of research results """
+# pylint: disable=missing-docstring, redefined-outer-name
+import os
+import json
+
+import pytest
+
+pytest.importorskip('batchflow.research')
+pytest.importorskip('blosc')
+
+from batchflow import ChunkedStore                                    # pylint: disable=wrong-import-position
+from batchflow.research import ConfigAlias, Results                   # pylint: disable=wrong-import-position
+from batchflow.research.executable import Executable                  # pylint: disable=wrong-import-position
+from batchflow.research.results import dump_configs, dump_results     # pylint: disable=wrong-import-position
+
+
+LAYERS = [[1, 2], [3, 4]]
+
+
+@pytest.fixture
+def research_path(tmp_path):
+    path = str(tmp_path / 'research')
+    os.makedirs(os.path.join(path, 'description'))
+    with open(os.path.join(path, 'description', 'research.json'), 'w') as f:
+        json.dump(dict(executables=dict(train=dict(variables=['loss']))), f)
+
+    configs = [ConfigAlias([('lr', lr), ('layers', layers), ('repetition', rep), ('update', 0)])
+               for lr in [0.1, 0.01] for layers in LAYERS for rep in range(2)]
+    # configs are appended by several calls as jobs are generated
+    dump_configs(path, configs[:3])
+    dump_configs(path, configs[3:])
+
+    for config in configs:
+        experiment_path = os.path.join(path, 'results', config.alias(as_string=True))
+        for start in range(0, 6, 3):
+            iterations = list(range(start, start + 3))
+            dump_results(experiment_path, 'train', start + 3,
+                         dict(loss=[float(i) for i in iterations], iteration=iterations, sample_index=['1'] * 3))
+    return path
+
+
+def test_catalog(research_path):
+    results = Results(research_path)
+    assert len(results.catalog) == 8
+    assert len(results.df) == 8 * 6
+    assert sorted(results.df['iteration'].unique()) == list(range(6))
+
+
+@pytest.mark.parametrize('query, n_configs', [
+    (dict(lr=0.1), 4),
+    (dict(lr=0.1, repetition=1), 2),
+    (dict(configs={'layers': [1, 2]}), 4),
+    (dict(configs={'layers': [1, 2], 'lr': 0.01}), 2),
+    (dict(aliases={'lr': '0.01'}), 4),
+    (dict(repetition=0), 4),
+    (dict(lr=1), 0),
+    (dict(unknown=1), 0),
+])
+def test_load(research_path, query, n_configs):
+    results = Results(research_path)
+    df = results.load(**query)
+    assert len(df) == n_configs * 6
+    if n_configs > 0 and 'lr' in query:
+        assert (df['lr'] == str(query['lr'])).all()
+
+    # the catalog is not changed by loading
+    assert len(results.load()) == 8 * 6
+
+
+def test_load_iterations(research_path):
+    df = Results(research_path).load(iterations=[1, 4], lr=0.1, repetition=0)
+    assert sorted(df['iteration'].tolist()) == [1, 1, 4, 4]
+    assert df['loss'].tolist() == df['iteration'].astype(float).tolist()
+
+
+def test_unit_dumps(tmp_path):
+    unit = Executable()
+    unit.add_callable(lambda: None, name='func', returns='loss')
+    unit.research_path, unit.experiment_path = str(tmp_path), 'experiment'
+    store_path = str(tmp_path / 'experiment' / 'func.chunked')
+
+    for iteration in range(10):
+        unit.put_result(iteration, float(iteration))
+        unit.dump_result('1', iteration + 1, 'func')
+        # each dump is written at once
+        store = ChunkedStore(store_path)
+        assert len(store.meta['chunks']) == iteration + 1
+        assert store.read_chunks()['loss'].tolist() == [float(i) for i in range(iteration + 1)]
+    # while the metadata file is rewritten only for some of them
+    assert os.path.exists(os.path.join(store_path, ChunkedStore.LOG_FILE))
@@ -0,0 +1,91 @@
+""" Test schedulers of research experiments """
+# pylint: disable=missing-docstring, redefined-outer-name
+import logging
+from queue import Queue
+
+import pytest
+
+pytest.importorskip('batchflow.research')
+
+from batchflow.research import ASHA, Scheduler                 # pylint: disable=wrong-import-position
+from batchflow.research.distributor import Distributor, Signal  # pylint: disable=wrong-import-position
+from batchflow.research.executable import ExperimentStopped     # pylint: disable=wrong-import-position
+from batchflow.research.job import Job                          # pylint: disable=wrong-import-position
+
+
+def test_metric():
+    assert Scheduler('test/accuracy').metric == ('test', 'accuracy')
+    assert Scheduler('accuracy').metric == ('accuracy', None)
+    with pytest.raises(ValueError):
+        Scheduler('accuracy', mode='mean')
+
+
+@pytest.mark.parametrize('kwargs', [dict(eta=1), dict(min_iters=0), dict(min_iters=-5)])
+def test_asha_wrong_params(kwargs):
+    with pytest.raises(ValueError):
+        ASHA('accuracy', **kwargs)
+
+
+def test_asha_rungs():
+    scheduler = ASHA('accuracy', min_iters=10, eta=3, max_iters=200)
+    assert scheduler._get_rungs(9) == []                        # pylint: disable=protected-access
+    assert scheduler._get_rungs(10) == [10]                     # pylint: disable=protected-access
+    assert scheduler._get_rungs(100) == [10, 30, 90]            # pylint: disable=protected-access
+    assert scheduler._get_rungs(1000) == [10, 30, 90]           # pylint: disable=protected-access
+
+
+@pytest.mark.parametrize('mode', ['max', 'min'])
+def test_asha_cutoff(mode):
+    scheduler = ASHA('accuracy', mode=mode, min_iters=10, eta=3)
+    sign = 1 if mode == 'max' else -1
+
+    # experiments continue until there are at least `eta` values at a rung
+    assert scheduler.on_result((0, 0), 10, sign * 0.5)
+    assert scheduler.on_result((0, 1), 10, sign * 0.9)
+    # the third value is below the top third
+    assert not scheduler.on_result((0, 2), 10, sign * 0.6)
+    # the best value is promoted
+    assert scheduler.on_result((1, 0), 10, sign * 0.95)
+    assert not scheduler.on_result((1, 1), 10, sign * 0.1)
+
+    # values between rungs do not stop experiments
+    assert scheduler.on_result((0, 1), 20, sign * 0.)
+    assert scheduler.stopped == {(0, 2), (1, 1)}
+    # stopped experiments stay stopped
+    assert not scheduler.on_result((0, 2), 30, sign * 0.2)
+
+    assert len(scheduler.results) == 7
+    assert scheduler.best(1).index.tolist() == [(1, 0)]
+
+
+def test_asha_nan():
+    scheduler = ASHA('loss', mode='min', min_iters=1, eta=2)
+    assert scheduler.on_result((0, 0), 1, 1.)
+    assert not scheduler.on_result((0, 1), 1, float('nan'))
+
+
+def test_stop_experiment():
+    scheduler = ASHA('test/accuracy', min_iters=1, eta=2)
+    distributor = Distributor(1, 1, None, logger=logging.getLogger('test'), scheduler=scheduler)
+    distributor.control_queues = {'Worker 0': Queue()}
+
+    class JobsQueue:
+        aliases = {3: ['a', 'b']}
+    distributor.jobs_queue = JobsQueue()
+
+    signal = Signal(worker='Worker 0', job=3, iteration=0, n_iters=10, trial=0, done=False,
+                    exception=[None, None], metrics=[0.9, 0.1])
+    scheduler.on_result((2, 0), 1, 0.5)
+    distributor._schedule(signal)                                # pylint: disable=protected-access
+    assert distributor.control_queues['Worker 0'].get_nowait() == (3, 1)
+    assert distributor.control_queues['Worker 0'].empty()
+    assert scheduler.results['alias'].tolist()[-2:] == ['a', 'b']
+
+    job = Job(dict(test=None), n_iters=10, configs=[None, None], branches=2, research_path=None)
+    job.experiments = [{}, {}]
+    job.exceptions = [None, None]
+    job.clear_stopped_list()
+    job.stop_experiment(1)
+    assert job.exceptions[0] is None and isinstance(job.exceptions[1], ExperimentStopped)
+    assert job.stopped == [False, True]
+    assert job.alive_experiments() == 1
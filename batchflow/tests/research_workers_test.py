@@ -0,0 +1,75 @@
+""" Test warm workers of research """
+# pylint: disable=missing-docstring, redefined-outer-name, attribute-defined-outside-init
+import os
+import time
+import logging
+from queue import Queue
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('batchflow.research')
+
+from batchflow.research.workers import Worker            # pylint: disable=wrong-import-position
+
+
+class MyWorker(Worker):
+    """ Worker which fails jobs on their first trial as the job asks """
+    def main(self):
+        _, job = self.job
+        if self.trial == 0 and job.fail == 'crash':
+            os._exit(1)                                    # pylint: disable=protected-access
+        if self.trial == 0 and job.fail == 'hang':
+            time.sleep(60)
+        if job.fail == 'error':
+            raise ValueError('Job has failed')
+        # a pid of the subprocess is sent back instead of the number of iterations
+        self.finished_iterations = os.getpid()
+
+
+def make_job(fail=None):
+    return SimpleNamespace(n_iters=1, experiments=[None], fail=fail)
+
+
+def run_worker(jobs, **kwargs):
+    """ Execute jobs with a warm worker and return final signals of jobs """
+    queue, results = Queue(), Queue()
+    for i, job in enumerate(jobs):
+        queue.put((i, job))
+    queue.put(None)
+    worker = MyWorker([{'device': None}], 0, logger=logging.getLogger('test'), warm=True, **kwargs)
+    worker(queue, results)
+
+    signals = []
+    while not results.empty():
+        signals.append(results.get())
+    assert worker._process is None                          # pylint: disable=protected-access
+    return [signal for signal in signals if signal.done]
+
+
+def test_reuse():
+    signals = run_worker([make_job(), make_job(), make_job('error'), make_job()])
+    assert [signal.job for signal in signals] == [0, 1, 2, 3]
+    assert signals[2].exception[0].args == ('Job has failed',)
+    # an exception raised by a job does not restart the subprocess
+    pids = {signal.iteration for signal in signals if signal.job != 2}
+    assert len(pids) == 1 and os.getpid() not in pids
+
+
+@pytest.mark.parametrize('fail, timeout', [('crash', 5), ('hang', 0.01)])
+def test_restart(fail, timeout):
+    signals = run_worker([make_job(), make_job(fail), make_job()], timeout=timeout)
+    assert [signal.job for signal in signals] == [0, 1, 2]
+    assert [signal.trial for signal in signals] == [0, 1, 0]
+    assert all(signal.exception == [None] for signal in signals)
+    # the subprocess is restarted for the second trial and is reused by the next job
+    assert signals[0].iteration != signals[1].iteration == signals[2].iteration
+
+
+def test_unpicklable_job():
+    job = make_job()
+    job.items = (item for item in range(3))
+    signals = run_worker([job, make_job()], trials=2)
+    assert [signal.job for signal in signals] == [0, 1]
+    assert isinstance(signals[0].exception, RuntimeError)
+    assert signals[1].exception == [None]
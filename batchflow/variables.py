@@ -6,6 +6,17 @@ import logging
 from .named_expr import eval_expr
 
 
+def _copy_containers(value):
+    """ Copy nested lists, tuples and dicts so that a variable does not share them with its default """
+    if isinstance(value, (list, tuple)):
+        return type(value)([_copy_containers(item) for item in value])
+    if isinstance(value, dict):
+        _value = type(value)()
+        _value.update((key, _copy_containers(item)) for key, item in value.items())
+        return _value
+    return value
+
+
 class Variable:
     """ Pipeline variable """
     def __init__(self, name, default=None, lock=True, pipeline=None):
@@ -37,6 +48,8 @@ class Variable:
     def initialize(self, pipeline=None):
         """ Initialize a variable value """
         value = eval_expr(self.default, pipeline=pipeline)
+        if value is self.default:
+            value = _copy_containers(value)
         self.set(value)
 
     def lock(self):
@@ -0,0 +1,66 @@
+""" Measure per-action overhead of pipeline execution
+
+A pipeline consists of many tiny actions executed for tiny batches,
+so the run time is dominated by the pipeline machinery rather than actions themselves.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+sys.path.append("../../..")
+from batchflow import Dataset, Batch, action, B, C, V  # pylint: disable=wrong-import-position
+
+
+N_ITEMS = 1000
+N_ACTIONS = 30
+N_RUNS = 5
+
+
+class TinyBatch(Batch):
+    """ A batch with no-op actions """
+    components = 'values',
+
+    @action
+    def add(self, value, shape=None, options=None):
+        """ Do nothing """
+        _ = value, shape, options
+        return self
+
+
+def make_pipeline(dataset):
+    """ Create a pipeline with constant and dynamic arguments """
+    pipeline = (dataset.p
+                .init_variable('step', 1)
+                .update(V('step'), V('step') + 1))
+    for i in range(N_ACTIONS):
+        if i % 3 == 0:
+            pipeline = pipeline.add(1, shape=[28, 28, 3], options=dict(mode='constant', axis=(0, 1)))
+        elif i % 3 == 1:
+            pipeline = pipeline.add(C('value'), shape=[28, 28, 3])
+        else:
+            pipeline = pipeline.add(V('step'), options=dict(scale=B('size')))
+    return pipeline << {'value': 2}
+
+
+def main():
+    """ Run the benchmark """
+    dataset = Dataset(N_ITEMS, batch_class=TinyBatch, preloaded=(np.zeros(N_ITEMS), ))
+    pipeline = make_pipeline(dataset)
+    n_actions = len(pipeline._actions) # pylint: disable=protected-access
+
+    timings = []
+    for _ in range(N_RUNS):
+        start_time = time.perf_counter()
+        pipeline.run(1, n_epochs=1)
+        timings.append(time.perf_counter() - start_time)
+
+    best = min(timings)
+    print('batches: %d, actions per batch: %d' % (N_ITEMS, n_actions))
+    print('best run: %.3f s, per batch: %.1f us, per action: %.2f us' %
+          (best, best / N_ITEMS * 1e6, best / N_ITEMS / n_actions * 1e6))
+
+
+if __name__ == '__main__':
+    main()